@@ -0,0 +1,78 @@
+"""Replay access traces through each eviction policy and compare hit ratios.
+
+Usage:
+    python benchmarks/policy_hit_ratio.py [--size N] [trace ...]
+
+Each trace file holds one key per line. Without trace files, synthetic
+traces are generated: a zipf workload, the same workload interrupted by
+periodic one-off scans, and a loop slightly larger than the cache.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from collections.abc import Iterable
+
+from tarina import LRU
+from tarina.policy import ARC, S3FIFO, TinyLFU, TwoQueue
+
+POLICIES = {"LRU": LRU, "S3-FIFO": S3FIFO, "2Q": TwoQueue, "ARC": ARC, "W-TinyLFU": TinyLFU}
+
+
+def zipf(n: int, universe: int, alpha: float = 1.0, seed: int = 0) -> list[int]:
+    weights = [1 / (rank + 1) ** alpha for rank in range(universe)]
+    return random.Random(seed).choices(range(universe), weights, k=n)
+
+
+def with_scans(trace: list, every: int, length: int) -> list:
+    result = []
+    scan_key = 0
+    for start in range(0, len(trace), every):
+        result.extend(trace[start : start + every])
+        result.extend(("scan", scan_key + i) for i in range(length))
+        scan_key += length
+    return result
+
+
+def synthetic(size: int) -> dict[str, list]:
+    hot = zipf(200_000, size * 10)
+    return {
+        "zipf": hot,
+        "zipf+scan": with_scans(hot, size * 20, size * 4),
+        "loop": list(range(size + size // 10)) * 50,
+    }
+
+
+def load(path: str) -> list[str]:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def replay(cache, trace: Iterable) -> float:
+    missing = object()
+    for key in trace:
+        if cache.get(key, missing) is missing:
+            cache[key] = key
+    stats = cache.get_stats()
+    return stats.hits / ((stats.hits + stats.misses) or 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1000, help="cache capacity")
+    parser.add_argument("traces", nargs="*", help="trace files with one key per line")
+    args = parser.parse_args()
+
+    traces = {path: load(path) for path in args.traces} if args.traces else synthetic(args.size)
+    print(f"{'trace':<16}{'policy':<12}{'hit ratio':>10}{'seconds':>10}")
+    for name, trace in traces.items():
+        for policy, factory in POLICIES.items():
+            start = time.perf_counter()
+            ratio = replay(factory(args.size), trace)
+            print(f"{name:<16}{policy:<12}{ratio:>10.4f}{time.perf_counter() - start:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
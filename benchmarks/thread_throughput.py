@@ -0,0 +1,73 @@
+"""Measure LRU and split throughput as the number of threads grows.
+
+Usage:
+    python benchmarks/thread_throughput.py [--threads 1,2,4,8] [--ops N]
+
+Run it once with a regular build and once with a free-threaded build
+(e.g. python3.13 and python3.13t) to compare them. With the GIL the
+total throughput stays flat as threads are added; without it the C
+extensions should scale with the number of cores.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import threading
+import time
+
+from tarina import LRU, split
+
+TEXT = 'run "some quoted arg" --flag value\\ with\\ escapes ' * 4
+
+
+def lru_worker(cache: LRU, ops: int, seed: int) -> None:
+    rand = random.Random(seed)
+    keys = [rand.randrange(4096) for _ in range(ops)]
+    for key in keys:
+        if cache.get(key) is None:
+            cache[key] = key
+
+
+def split_worker(_, ops: int, seed: int) -> None:
+    for _ in range(ops):
+        split(TEXT, " ")
+
+
+def run(worker, shared, threads: int, ops: int) -> float:
+    barrier = threading.Barrier(threads + 1)
+
+    def target(seed: int) -> None:
+        barrier.wait()
+        worker(shared, ops, seed)
+
+    pool = [threading.Thread(target=target, args=(seed,)) for seed in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return threads * ops / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", default="1,2,4,8", help="comma separated thread counts")
+    parser.add_argument("--ops", type=int, default=100_000, help="operations per thread")
+    args = parser.parse_args()
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"{sys.version.split()[0]} GIL {'enabled' if gil else 'disabled'}, LRU from {LRU.__module__}")
+    print(f"{'benchmark':<12}{'threads':>8}{'ops/s':>14}{'speedup':>10}")
+    for name, worker, shared in (("LRU", lru_worker, LRU(1024)), ("split", split_worker, None)):
+        base = None
+        for threads in map(int, args.threads.split(",")):
+            rate = run(worker, shared, threads, args.ops)
+            base = base or rate
+            print(f"{name:<12}{threads:>8}{rate:>14,.0f}{rate / base:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
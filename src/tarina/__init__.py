@@ -8,13 +8,20 @@ from .guard import is_awaitable as is_awaitable
 from .guard import is_coroutinefunction as is_coroutinefunction
 from .lang import lang as lang
 from .lru import LRU as LRU
+from .lru import LRUStats as LRUStats
+from .lru import ShardedLRU as ShardedLRU
+from .lru import async_cached as async_cached
+from .lru import cached as cached
 from .signature import get_signature as get_signature
 from .signature import signatures as signatures
 from .string import String as String
+from .string import iter_split as iter_split
 from .string import split as split
+from .string import split_many as split_many
 from .string import split_once as split_once
 from .string import split_once_index_only as split_once_index_only
 from .string import split_once_without_escape as split_once_without_escape
+from .string import split_spans as split_spans
 from .tools import gen_subclass as gen_subclass
 from .tools import group_dict as group_dict
 from .tools import init_spec as init_spec
@@ -0,0 +1,69 @@
+"""LRU 的异步操作, 供 C 与纯 Python 两种实现共用"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Awaitable, Hashable
+from typing import Any, Callable
+from weakref import WeakKeyDictionary
+
+_MISSING: Any = object()
+
+# computations in flight per event loop, keyed by the cache identity and the key;
+# a future belongs to its loop, so callers running another loop never share it
+_pending: WeakKeyDictionary[asyncio.AbstractEventLoop, dict[tuple[int, Hashable], asyncio.Future]] = WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def _loop_pending() -> dict[tuple[int, Hashable], asyncio.Future]:
+    loop = asyncio.get_running_loop()
+    pending = _pending.get(loop)
+    if pending is None:
+        with _lock:
+            pending = _pending.setdefault(loop, {})
+    return pending
+
+
+def _done(cache, key: Hashable, pending: dict, ident: tuple[int, Hashable], task: asyncio.Future) -> None:
+    # discard() may have dropped or replaced the task meanwhile
+    if pending.get(ident) is not task:
+        return
+    del pending[ident]
+    if not task.cancelled() and task.exception() is None:
+        cache[key] = task.result()
+
+
+async def aget_or_compute(cache, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """获取键对应的值, 不存在时等待 factory() 的结果并写入
+
+    同一事件循环中, 同一缓存上相同键的并发调用共享同一次 factory 调用;
+    调用失败时结果不会被缓存, 等待中的调用者都会收到同一个异常。取消某个调用者不会取消共享的计算。
+    """
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+    pending = _loop_pending()
+    ident = (id(cache), key)
+    task = pending.get(ident)
+    if task is None:
+        task = pending[ident] = asyncio.ensure_future(factory())
+        task.add_done_callback(lambda t: _done(cache, key, pending, ident, t))
+    return await asyncio.shield(task)
+
+
+def discard(cache, key: Hashable = _MISSING) -> bool:
+    """丢弃缓存在所有事件循环中正在进行的计算 (指定 key 时只丢弃该键的), 其结果不会再写入缓存
+
+    返回是否有计算被丢弃; 计算本身不会被取消, 等待中的调用者仍会收到结果。
+    """
+    with _lock:
+        loops = list(_pending.values())
+    found = False
+    for pending in loops:
+        if key is not _MISSING:
+            found = pending.pop((id(cache), key), None) is not None or found
+            continue
+        for ident in [ident for ident in list(pending) if ident[0] == id(cache)]:
+            found = pending.pop(ident, None) is not None or found
+    return found
@@ -11,6 +11,7 @@ THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR I
 */
 
 #include <Python.h>
+#include <structmember.h>
 
 /*
  * This is a simple implementation of LRU Dict that uses a Python dict and an associated doubly linked
@@ -42,8 +43,18 @@ THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR I
  *  self->first will point to the MRU item and self-last to LRU item. Size of list will not
  *  grow beyond size of LRU dict.
  *
+ *  The list is split into segments, one per priority class, ordered from the pinned items
+ *  down to class 0.  self->heads[s] and self->tails[s] point to the MRU and LRU node of
+ *  segment s, so items always move within their own segment and self->last is the LRU item
+ *  of the lowest class.  Pinned items are never evicted and do not count toward the size
+ *  or weight bounds.
+ *
  */
 
+/* Number of priority classes, the pinned segment comes after them */
+#define LRU_PRIORITIES 8
+#define NODE_SEGMENT(node) ((node)->pinned ? LRU_PRIORITIES : (node)->priority)
+
 #ifndef Py_TYPE
  #define Py_TYPE(ob) (((PyObject*)(ob))->ob_type)
 #endif
@@ -72,6 +83,10 @@ typedef struct _Node {
     PyObject * key;
     struct _Node * prev;
     struct _Node * next;
+    double expires;  /* monotonic deadline in seconds, 0 if the node never expires */
+    Py_ssize_t weight;  /* weight accounted for the node when max_weight is set */
+    int priority;  /* priority class, lower classes are evicted first */
+    int pinned;  /* pinned nodes are never evicted and never expire */
 } Node;
 
 static void
@@ -139,17 +154,222 @@ typedef struct {
     Py_ssize_t size;
     Py_ssize_t hits;
     Py_ssize_t misses;
+    Py_ssize_t inserts;
+    Py_ssize_t updates;
+    Py_ssize_t evictions;
     PyObject *callback;
+    int callback_reason;  /* pass the eviction reason as a third argument */
+    Py_ssize_t batch;  /* buffer evictions and pass them to the callback in lists of up to batch, 0 to call it at once */
+    PyObject *pending;  /* list of buffered evictions, NULL if none */
+    double ttl;  /* default time to live in seconds, 0 if entries never expire */
+    PyObject *weigher;  /* weigher(key, value) -> int, sys.getsizeof(value) if NULL */
+    Py_ssize_t max_weight;  /* 0 if the total weight is not bounded */
+    Py_ssize_t weight;  /* current total weight of all nodes */
+    size_t version;  /* bumped on every change of the linked list, checked by iterators */
+    Node *heads[LRU_PRIORITIES + 1];  /* MRU node of each segment, NULL if it is empty */
+    Node *tails[LRU_PRIORITIES + 1];  /* LRU node of each segment, NULL if it is empty */
+    Py_ssize_t pinned;  /* number of pinned nodes */
 } LRU;
 
+#define LRU_UNPINNED(self) (PyDict_Size((self)->dict) - (self)->pinned)
+
+/* Eviction reasons passed to callbacks registered with reason=True */
+static PyObject *reason_capacity;
+static PyObject *reason_expired;
+
+/* sys.getsizeof, the default weigher */
+static PyObject *sys_getsizeof;
+
+static PyStructSequence_Field lru_stats_fields[] = {
+    {"hits", "lookups that found a live item"},
+    {"misses", "lookups that found no item or an expired one"},
+    {"inserts", "items added under a new key"},
+    {"updates", "items replaced under an existing key"},
+    {"evictions", "items evicted for capacity, weight or expiry"},
+    {NULL, NULL}
+};
+
+static PyStructSequence_Desc lru_stats_desc = {
+    "_lru_c.LRUStats",
+    "Counters of an LRU, as returned by LRU.get_stats()",
+    lru_stats_fields,
+    5
+};
+
+static PyTypeObject LRUStatsType;
+
+static double
+lru_now(void)
+{
+#if PY_VERSION_HEX >= 0x030D0000
+    PyTime_t t;
+    (void)PyTime_MonotonicRaw(&t);
+    return PyTime_AsSecondsDouble(t);
+#else
+    return _PyTime_AsSecondsDouble(_PyTime_GetMonotonicClock());
+#endif
+}
+
+#define NODE_EXPIRED(node) (!(node)->pinned && (node)->expires != 0 && (node)->expires <= lru_now())
+
+/*
+ * Free-threaded builds (PEP 703) have no GIL serialising access to self->dict and the
+ * linked list, so every entry point runs inside a critical section on the LRU object.
+ * Critical sections are reentrant, so callbacks may still use the LRU that evicted the
+ * item.  They compile to a plain block on GIL builds and before 3.13.
+ */
+#ifndef Py_BEGIN_CRITICAL_SECTION
+ #define Py_BEGIN_CRITICAL_SECTION(op) {
+ #define Py_END_CRITICAL_SECTION() }
+#endif
+
+/* Define name##_locked, which calls name inside a critical section on self */
+#define LRU_LOCKED(type, name, params, call)   \
+    static type                                 \
+    name##_locked params                        \
+    {                                           \
+        type result;                            \
+        Py_BEGIN_CRITICAL_SECTION(self);        \
+        result = name call;                     \
+        Py_END_CRITICAL_SECTION();              \
+        return result;                          \
+    }
+
+#define LRU_LOCKED_NOARGS(name) LRU_LOCKED(PyObject *, name, (LRU *self), (self))
+#define LRU_LOCKED_O(name) LRU_LOCKED(PyObject *, name, (LRU *self, PyObject *arg), (self, arg))
+#define LRU_LOCKED_VARARGS(name) LRU_LOCKED(PyObject *, name, (LRU *self, PyObject *args), (self, args))
+#define LRU_LOCKED_KEYWORDS(name) \
+    LRU_LOCKED(PyObject *, name, (LRU *self, PyObject *args, PyObject *kwds), (self, args, kwds))
+
+static int
+parse_ttl(PyObject *obj, double *ttl)
+{
+    if (obj == NULL || obj == Py_None) {
+        *ttl = 0;
+        return 0;
+    }
+    *ttl = PyFloat_AsDouble(obj);
+    if (*ttl == -1 && PyErr_Occurred())
+        return -1;
+    if (!(*ttl > 0)) {
+        PyErr_SetString(PyExc_ValueError, "TTL should be a positive number");
+        return -1;
+    }
+    return 0;
+}
+
+
+static int
+parse_max_weight(PyObject *obj, Py_ssize_t *max_weight)
+{
+    if (obj == NULL || obj == Py_None) {
+        *max_weight = 0;
+        return 0;
+    }
+    *max_weight = PyLong_AsSsize_t(obj);
+    if (*max_weight == -1 && PyErr_Occurred())
+        return -1;
+    if (*max_weight <= 0) {
+        PyErr_SetString(PyExc_ValueError, "Max weight should be a positive number");
+        return -1;
+    }
+    return 0;
+}
+
+static int
+lru_weigh(LRU *self, PyObject *key, PyObject *value, Py_ssize_t *weight)
+{
+    PyObject *result;
+
+    *weight = 0;
+    if (!self->max_weight)
+        return 0;
+    if (self->weigher)
+        result = PyObject_CallFunctionObjArgs(self->weigher, key, value, NULL);
+    else
+        result = PyObject_CallFunctionObjArgs(sys_getsizeof, value, NULL);
+    if (result == NULL)
+        return -1;
+    *weight = PyLong_AsSsize_t(result);
+    Py_DECREF(result);
+    if (*weight == -1 && PyErr_Occurred())
+        return -1;
+    if (*weight < 0) {
+        PyErr_SetString(PyExc_ValueError, "Weight should not be negative");
+        return -1;
+    }
+    if (*weight > self->max_weight) {
+        PyErr_Format(PyExc_ValueError, "Weight %zd exceeds max weight %zd", *weight, self->max_weight);
+        return -1;
+    }
+    return 0;
+}
+
+/* Call callback with the list of buffered evictions, stealing both references.
+ * Returns the number of evictions in batch, or -1 if the callback raised. */
+static Py_ssize_t
+lru_deliver(PyObject *batch, PyObject *callback)
+{
+    PyObject *result;
+    Py_ssize_t count;
+
+    if (batch == NULL) {
+        Py_XDECREF(callback);
+        return 0;
+    }
+    count = PyList_GET_SIZE(batch);
+    if (callback == NULL) {
+        Py_DECREF(batch);
+        return count;
+    }
+    result = PyObject_CallFunctionObjArgs(callback, batch, NULL);
+    Py_DECREF(callback);
+    Py_DECREF(batch);
+    if (result == NULL)
+        return -1;
+    Py_DECREF(result);
+    return count;
+}
+
+/* Pass the buffered evictions to the current callback */
+static Py_ssize_t
+lru_flush(LRU *self)
+{
+    PyObject *batch = self->pending;
+
+    self->pending = NULL;
+    Py_XINCREF(self->callback);
+    return lru_deliver(batch, self->callback);
+}
 
 static PyObject *
-set_callback(LRU *self, PyObject *args)
+set_callback(LRU *self, PyObject *args, PyObject *kwds)
 {
+    static char *kwlist[] = {"callback", "reason", "batch", NULL};
     PyObject *result = NULL;
     PyObject *temp;
-
-    if (PyArg_ParseTuple(args, "O:set_callback", &temp)) {
+    PyObject *batch_obj = Py_None;
+    Py_ssize_t batch = 0;
+    int reason = 0;
+
+    if (PyArg_ParseTupleAndKeywords(args, kwds, "O|pO:set_callback", kwlist, &temp, &reason, &batch_obj)) {
+        if (batch_obj != Py_None) {
+            batch = PyLong_AsSsize_t(batch_obj);
+            if (batch == -1 && PyErr_Occurred())
+                return NULL;
+            if (batch < 1) {
+                PyErr_SetString(PyExc_ValueError, "Batch size should be a positive number");
+                return NULL;
+            }
+        }
+        if (temp != Py_None && !PyCallable_Check(temp)) {
+            PyErr_SetString(PyExc_TypeError, "parameter must be callable");
+            return NULL;
+        }
+        /* Evictions buffered so far still belong to the previous callback */
+        if (lru_flush(self) < 0)
+            return NULL;
+        self->batch = batch;
         if (temp == Py_None) {
             Py_XDECREF(self->callback);
             self->callback = NULL;
@@ -161,6 +381,7 @@ set_callback(LRU *self, PyObject *args)
             Py_XDECREF(self->callback);  /* Dispose of previous callback */
             self->callback = temp;       /* Remember new callback */
         }
+        self->callback_reason = reason;
         Py_RETURN_NONE;
     }
     return result;
@@ -169,6 +390,13 @@ set_callback(LRU *self, PyObject *args)
 static void
 lru_remove_node(LRU *self, Node* node)
 {
+    int s = NODE_SEGMENT(node);
+
+    self->version++;
+    if (self->heads[s] == node)
+        self->heads[s] = node->next && NODE_SEGMENT(node->next) == s ? node->next : NULL;
+    if (self->tails[s] == node)
+        self->tails[s] = node->prev && NODE_SEGMENT(node->prev) == s ? node->prev : NULL;
     if (self->first == node) {
         self->first = node->next;
     }
@@ -184,42 +412,88 @@ lru_remove_node(LRU *self, Node* node)
     node->next = node->prev = NULL;
 }
 
+/* Link node as the MRU node of its segment */
 static void
 lru_add_node_at_head(LRU *self, Node* node)
 {
-    node->prev = NULL;
-    if (!self->first) {
-        self->first = self->last = node;
-        node->next = NULL;
-    } else {
-        node->next = self->first;
-        if (node->next) {
-            node->next->prev = node;
-        }
-        self->first = node;
+    int s = NODE_SEGMENT(node), t;
+    Node *next = self->heads[s];
+
+    self->version++;
+    if (!next) {
+        /* An empty segment goes right before the next non-empty lower one */
+        for (t = s - 1; t >= 0 && !self->heads[t]; t--);
+        next = t >= 0 ? self->heads[t] : NULL;
+        self->tails[s] = node;
     }
+    self->heads[s] = node;
+    node->next = next;
+    node->prev = next ? next->prev : self->last;
+    if (node->prev)
+        node->prev->next = node;
+    else
+        self->first = node;
+    if (next)
+        next->prev = node;
+    else
+        self->last = node;
 }
 
 static void
-lru_delete_last(LRU *self)
+lru_evict_node(LRU *self, Node *n, PyObject *reason)
 {
-    PyObject *arglist;
-    PyObject *result;
-    Node* n = self->last;
-
-    if (!self->last)
-        return;
+    PyObject *result, *callback;
 
-    if (self->callback) {
-
-        arglist = Py_BuildValue("OO", n->key, n->value);
-        result = PyObject_CallObject(self->callback, arglist);
+    /* Unlink first: the callback runs Python code, which may switch to another
+     * thread using this LRU, so the LRU must be consistent before calling it */
+    Py_INCREF(n);
+    self->evictions++;
+    lru_remove_node(self, n);
+    if (n->pinned)
+        self->pinned--;
+    else
+        self->weight -= n->weight;
+    if (PUT_NODE(self->dict, n->key, NULL) < 0)
+        PyErr_Clear();
+
+    if (self->callback && self->batch) {
+        if (self->callback_reason)
+            result = PyTuple_Pack(3, n->key, n->value, reason);
+        else
+            result = PyTuple_Pack(2, n->key, n->value);
+        if (result && !self->pending && !(self->pending = PyList_New(0)))
+            Py_CLEAR(result);
+        if (result == NULL || PyList_Append(self->pending, result) < 0)
+            PyErr_WriteUnraisable(self->callback);
+        Py_XDECREF(result);
+        /* A full buffer is flushed right away to keep it bounded */
+        if (self->pending && PyList_GET_SIZE(self->pending) >= self->batch && lru_flush(self) < 0)
+            PyErr_WriteUnraisable((PyObject *)self);
+    }
+    else if (self->callback) {
+        /* The callback may be replaced while it runs */
+        callback = self->callback;
+        Py_INCREF(callback);
+        if (self->callback_reason)
+            result = PyObject_CallFunctionObjArgs(callback, n->key, n->value, reason, NULL);
+        else
+            result = PyObject_CallFunctionObjArgs(callback, n->key, n->value, NULL);
+        if (result == NULL)
+            PyErr_WriteUnraisable(callback);
         Py_XDECREF(result);
-        Py_DECREF(arglist);
+        Py_DECREF(callback);
     }
+    Py_DECREF(n);
+}
 
-    lru_remove_node(self, n);
-    PUT_NODE(self->dict, n->key, NULL);
+/* Evict the LRU node of the lowest class, return 0 if only pinned nodes are left */
+static int
+lru_delete_last(LRU *self)
+{
+    if (!self->last || self->last->pinned)
+        return 0;
+    lru_evict_node(self, self->last, reason_capacity);
+    return 1;
 }
 
 static Py_ssize_t
@@ -228,14 +502,26 @@ lru_length(LRU *self)
     return PyDict_Size(self->dict);
 }
 
+static int
+LRU_seq_contains(LRU *self, PyObject *key)
+{
+    Node *node = (Node *)PyDict_GetItemWithError(self->dict, key);
+    if (!node)
+        return PyErr_Occurred() ? -1 : 0;
+    if (NODE_EXPIRED(node)) {
+        lru_evict_node(self, node, reason_expired);
+        return 0;
+    }
+    return 1;
+}
+
 static PyObject *
 LRU_contains_key(LRU *self, PyObject *key)
 {
-    if (PyDict_Contains(self->dict, key)) {
-        Py_RETURN_TRUE;
-    } else {
-        Py_RETURN_FALSE;
-    }
+    int res = LRU_seq_contains(self, key);
+    if (res < 0)
+        return NULL;
+    return PyBool_FromLong(res);
 }
 
 static PyObject *
@@ -247,35 +533,49 @@ LRU_contains(LRU *self, PyObject *args)
     return LRU_contains_key(self, key);
 }
 
-static int
-LRU_seq_contains(LRU *self, PyObject *key)
-{
-    return PyDict_Contains(self->dict, key);
-}
-
+/*
+ * Return a new reference to the value of key and make it the MRU item, or NULL
+ * without an exception set if key is missing or expired.
+ */
 static PyObject *
-lru_subscript(LRU *self, register PyObject *key)
+lru_lookup(LRU *self, PyObject *key)
 {
-    Node *node = GET_NODE(self->dict, key);
+    Node *node = (Node *)PyDict_GetItemWithError(self->dict, key);
     if (!node) {
+        if (PyErr_Occurred())
+            return NULL;
         self->misses++;
         return NULL;
     }
 
     assert(PyObject_TypeCheck(node, &NodeType));
 
-    /* We don't need to move the node when it's already self->first. */
-    if (node != self->first) {
+    if (NODE_EXPIRED(node)) {
+        lru_evict_node(self, node, reason_expired);
+        self->misses++;
+        return NULL;
+    }
+
+    /* We don't need to move the node when it's already the head of its segment. */
+    if (node != self->heads[NODE_SEGMENT(node)]) {
         lru_remove_node(self, node);
         lru_add_node_at_head(self, node);
     }
 
     self->hits++;
     Py_INCREF(node->value);
-    Py_DECREF(node);
     return node->value;
 }
 
+static PyObject *
+lru_subscript(LRU *self, register PyObject *key)
+{
+    PyObject *value = lru_lookup(self, key);
+    if (value == NULL && !PyErr_Occurred())
+        PyErr_SetObject(PyExc_KeyError, key);
+    return value;
+}
+
 static PyObject *
 LRU_get(LRU *self, PyObject *args)
 {
@@ -286,10 +586,10 @@ LRU_get(LRU *self, PyObject *args)
     if (!PyArg_ParseTuple(args, "O|O", &key, &instead))
         return NULL;
 
-    result = lru_subscript(self, key);
-    PyErr_Clear();  /* GET_NODE sets an exception on miss. Shut it up. */
+    result = lru_lookup(self, key);
     if (result)
         return result;
+    PyErr_Clear();  /* Unhashable keys are reported as missing. */
 
     if (!instead) {
         Py_RETURN_NONE;
@@ -299,11 +599,18 @@ LRU_get(LRU *self, PyObject *args)
     return instead;
 }
 
+/* Set or delete (value NULL) key, a negative priority keeps the class of an existing item */
 static int
-lru_ass_sub(LRU *self, PyObject *key, PyObject *value)
+lru_set_priority(LRU *self, PyObject *key, PyObject *value, double expires, int priority)
 {
     int res = 0;
-    Node *node = GET_NODE(self->dict, key);
+    Py_ssize_t weight = 0;
+    Node *node;
+
+    if (value && lru_weigh(self, key, value, &weight) < 0)
+        return -1;
+
+    node = GET_NODE(self->dict, key);
     PyErr_Clear();  /* GET_NODE sets an exception on miss. Shut it up. */
 
     if (value) {
@@ -311,8 +618,15 @@ lru_ass_sub(LRU *self, PyObject *key, PyObject *value)
             Py_INCREF(value);
             Py_DECREF(node->value);
             node->value = value;
+            node->expires = expires;
+            if (!node->pinned)
+                self->weight += weight - node->weight;
+            node->weight = weight;
+            self->updates++;
 
             lru_remove_node(self, node);
+            if (priority >= 0)
+                node->priority = priority;
             lru_add_node_at_head(self, node);
 
             res = 0;
@@ -321,24 +635,40 @@ lru_ass_sub(LRU *self, PyObject *key, PyObject *value)
             node->key = key;
             node->value = value;
             node->next = node->prev = NULL;
+            node->expires = expires;
+            node->weight = weight;
+            node->priority = priority > 0 ? priority : 0;
+            node->pinned = 0;
 
             Py_INCREF(key);
             Py_INCREF(value);
 
             res = PUT_NODE(self->dict, key, node);
             if (res == 0) {
-                if (lru_length(self) > self->size) {
+                lru_add_node_at_head(self, node);
+                self->weight += weight;
+                self->inserts++;
+
+                /* The new node is evicted itself if its class is the lowest */
+                if (LRU_UNPINNED(self) > self->size) {
                     lru_delete_last(self);
                 }
-
-                lru_add_node_at_head(self, node);
             }
         }
+        /* Evict from the tail until the total weight fits again, always keeping one item */
+        while (res == 0 && self->weight > self->max_weight && self->max_weight && LRU_UNPINNED(self) > 1) {
+            if (!lru_delete_last(self))
+                break;
+        }
     } else {
         res = PUT_NODE(self->dict, key, NULL);
         if (res == 0) {
             assert(node && PyObject_TypeCheck(node, &NodeType));
             lru_remove_node(self, node);
+            if (node->pinned)
+                self->pinned--;
+            else
+                self->weight -= node->weight;
         }
     }
 
@@ -346,10 +676,191 @@ lru_ass_sub(LRU *self, PyObject *key, PyObject *value)
     return res;
 }
 
+static int
+lru_set(LRU *self, PyObject *key, PyObject *value, double expires)
+{
+    return lru_set_priority(self, key, value, expires, -1);
+}
+
+static int
+lru_ass_sub(LRU *self, PyObject *key, PyObject *value)
+{
+    return lru_set(self, key, value, self->ttl ? lru_now() + self->ttl : 0);
+}
+
+static PyObject *
+LRU_set(LRU *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"key", "value", "ttl", "priority", NULL};
+    PyObject *key, *value, *ttl_obj = NULL, *priority_obj = NULL;
+    double ttl;
+    long priority = -1;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO|OO:set", kwlist, &key, &value, &ttl_obj, &priority_obj))
+        return NULL;
+    if (ttl_obj == NULL || ttl_obj == Py_None)
+        ttl = self->ttl;
+    else if (parse_ttl(ttl_obj, &ttl) < 0)
+        return NULL;
+    if (priority_obj && priority_obj != Py_None) {
+        priority = PyLong_AsLong(priority_obj);
+        if (priority == -1 && PyErr_Occurred())
+            return NULL;
+        if (priority < 0 || priority >= LRU_PRIORITIES) {
+            PyErr_Format(PyExc_ValueError, "Priority should be between 0 and %d", LRU_PRIORITIES - 1);
+            return NULL;
+        }
+    }
+    if (lru_set_priority(self, key, value, ttl ? lru_now() + ttl : 0, (int)priority) < 0)
+        return NULL;
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+LRU_pin(LRU *self, PyObject *key)
+{
+    Node *node = (Node *)GET_NODE(self->dict, key);
+
+    if (node && NODE_EXPIRED(node)) {
+        lru_evict_node(self, node, reason_expired);
+        Py_DECREF(node);
+        PyErr_SetObject(PyExc_KeyError, key);
+        return NULL;
+    }
+    if (node == NULL)
+        return NULL;
+    if (!node->pinned) {
+        lru_remove_node(self, node);
+        node->pinned = 1;
+        lru_add_node_at_head(self, node);
+        self->pinned++;
+        self->weight -= node->weight;
+    }
+    Py_DECREF(node);
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+LRU_unpin(LRU *self, PyObject *key)
+{
+    Node *node = (Node *)GET_NODE(self->dict, key);
+
+    if (node == NULL)
+        return NULL;
+    if (node->pinned) {
+        /* The node goes back to the head of its class and may be evicted right away */
+        lru_remove_node(self, node);
+        node->pinned = 0;
+        lru_add_node_at_head(self, node);
+        self->pinned--;
+        self->weight += node->weight;
+        while (LRU_UNPINNED(self) > self->size && lru_delete_last(self));
+        while (self->max_weight && self->weight > self->max_weight && lru_delete_last(self));
+    }
+    Py_DECREF(node);
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+LRU_expire(LRU *self)
+{
+    PyObject *expired;
+    Node *node;
+    Py_ssize_t i, count = 0;
+    double now = lru_now();
+
+    /* Collect first: callbacks may mutate the list while we evict */
+    expired = PyList_New(0);
+    if (expired == NULL)
+        return NULL;
+    for (node = self->last; node; node = node->prev) {
+        if (!node->pinned && node->expires != 0 && node->expires <= now && PyList_Append(expired, (PyObject *)node) < 0) {
+            Py_DECREF(expired);
+            return NULL;
+        }
+    }
+    for (i = 0; i < PyList_GET_SIZE(expired); i++) {
+        node = (Node *)PyList_GET_ITEM(expired, i);
+        if (PyDict_GetItemWithError(self->dict, node->key) == (PyObject *)node) {
+            lru_evict_node(self, node, reason_expired);
+            count++;
+        }
+        else if (PyErr_Occurred()) {
+            Py_DECREF(expired);
+            return NULL;
+        }
+    }
+    Py_DECREF(expired);
+    return PyLong_FromSsize_t(count);
+}
+
+static PyObject *
+LRU_set_max_weight(LRU *self, PyObject *args)
+{
+    PyObject *obj;
+    Py_ssize_t max_weight;
+    Node *node;
+
+    if (!PyArg_ParseTuple(args, "O:set_max_weight", &obj))
+        return NULL;
+    if (parse_max_weight(obj, &max_weight) < 0)
+        return NULL;
+    if (max_weight && !self->max_weight) {
+        /* Weights were not tracked so far, weigh every node now */
+        self->max_weight = max_weight;
+        self->weight = 0;
+        for (node = self->first; node; node = node->next) {
+            if (lru_weigh(self, node->key, node->value, &node->weight) < 0) {
+                for (node = self->first; node; node = node->next)
+                    node->weight = 0;
+                self->max_weight = 0;
+                self->weight = 0;
+                return NULL;
+            }
+            if (!node->pinned)
+                self->weight += node->weight;
+        }
+    }
+    else if (!max_weight) {
+        for (node = self->first; node; node = node->next)
+            node->weight = 0;
+        self->weight = 0;
+    }
+    self->max_weight = max_weight;
+    while (self->max_weight && self->weight > self->max_weight && lru_delete_last(self));
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+LRU_get_max_weight(LRU *self)
+{
+    if (!self->max_weight)
+        Py_RETURN_NONE;
+    return PyLong_FromSsize_t(self->max_weight);
+}
+
+static PyObject *
+LRU_get_weight(LRU *self)
+{
+    return PyLong_FromSsize_t(self->weight);
+}
+
+static PyObject *
+LRU_get_ttl(LRU *self)
+{
+    if (!self->ttl)
+        Py_RETURN_NONE;
+    return PyFloat_FromDouble(self->ttl);
+}
+
+LRU_LOCKED(PyObject *, lru_subscript, (LRU *self, PyObject *key), (self, key))
+LRU_LOCKED(int, lru_ass_sub, (LRU *self, PyObject *key, PyObject *value), (self, key, value))
+
+/* lru_length needs no lock, PyDict_Size is atomic */
 static PyMappingMethods LRU_as_mapping = {
-    (lenfunc)lru_length,        /*mp_length*/
-    (binaryfunc)lru_subscript,  /*mp_subscript*/
-    (objobjargproc)lru_ass_sub, /*mp_ass_subscript*/
+    (lenfunc)lru_length,               /*mp_length*/
+    (binaryfunc)lru_subscript_locked,  /*mp_subscript*/
+    (objobjargproc)lru_ass_sub_locked, /*mp_ass_subscript*/
 };
 
 static PyObject *
@@ -389,13 +900,16 @@ LRU_update(LRU *self, PyObject *args, PyObject *kwargs)
 	if ((PyArg_ParseTuple(args, "|O", &arg))) {
 		if (arg && PyDict_Check(arg)) {
 			while (PyDict_Next(arg, &pos, &key, &value))
-				lru_ass_sub(self, key, value);
+				if (lru_ass_sub(self, key, value) < 0)
+					return NULL;
 		}
 	}
 
+	pos = 0;
 	if (kwargs != NULL && PyDict_Check(kwargs)) {
 		while (PyDict_Next(kwargs, &pos, &key, &value))
-			lru_ass_sub(self, key, value);
+			if (lru_ass_sub(self, key, value) < 0)
+				return NULL;
 	}
 
 	Py_RETURN_NONE;
@@ -432,56 +946,230 @@ LRU_pop(LRU *self, PyObject *args)
     PyObject *key;
     PyObject *default_obj = NULL;
     PyObject *result;
+    Node *node;
 
     if (!PyArg_ParseTuple(args, "O|O", &key, &default_obj))
         return NULL;
 
-    /* Trying to access the item by key. */
-    result = lru_subscript(self, key);
-
-    if (result)
-        /* result != NULL, delete it from dict by key */
-        lru_ass_sub(self, key, NULL);
-        return result;
+    /* Removing an item is not a lookup, so it is not counted in the stats. */
+    node = GET_NODE(self->dict, key);
+    if (node) {
+        if (!NODE_EXPIRED(node)) {
+            result = node->value;
+            Py_INCREF(result);
+            Py_DECREF(node);
+            if (lru_ass_sub(self, key, NULL) < 0) {
+                Py_DECREF(result);
+                return NULL;
+            }
+            return result;
+        }
+        lru_evict_node(self, node, reason_expired);
+        Py_DECREF(node);
+    }
+    else if (!PyErr_ExceptionMatches(PyExc_KeyError))
+        return NULL;
+    PyErr_Clear();
 
     if (!default_obj) {
         Py_RETURN_NONE;
     }
-    /* result == NULL, i.e. key missing, and default_obj given */
-    PyErr_Clear();
     Py_INCREF(default_obj);
-    result = default_obj;
-    /* Otherwise (key missing, and default_obj not given [i.e. == NULL]), the
-     * call to lru_subscript (at the location marked by "Trying to access the
-     * item by key" in the comments) has already generated the appropriate
-     * exception. */
-
-    return result;
+    return default_obj;
 }
 
 static PyObject *
-LRU_peek_first_item(LRU *self)
+LRU_get_many(LRU *self, PyObject *args)
 {
-    if (self->first) {
-        PyObject *tuple = PyTuple_New(2);
-        Py_INCREF(self->first->key);
-        PyTuple_SET_ITEM(tuple, 0, self->first->key);
-        Py_INCREF(self->first->value);
-        PyTuple_SET_ITEM(tuple, 1, self->first->value);
-        return tuple;
+    PyObject *keys, *seq, *result, *value;
+    PyObject *instead = Py_None;
+    Py_ssize_t i, n;
+
+    if (!PyArg_ParseTuple(args, "O|O:get_many", &keys, &instead))
+        return NULL;
+    seq = PySequence_Fast(keys, "get_many() argument must be iterable");
+    if (seq == NULL)
+        return NULL;
+    n = PySequence_Fast_GET_SIZE(seq);
+    result = PyList_New(n);
+    if (result == NULL)
+        goto error;
+    for (i = 0; i < n; i++) {
+        /* Same lookup as get(): a miss allocates nothing, unhashable keys are reported as missing */
+        value = lru_lookup(self, PySequence_Fast_GET_ITEM(seq, i));
+        if (value == NULL) {
+            PyErr_Clear();
+            Py_INCREF(instead);
+            value = instead;
+        }
+        PyList_SET_ITEM(result, i, value);
     }
-    else Py_RETURN_NONE;
+    Py_DECREF(seq);
+    return result;
+
+error:
+    Py_XDECREF(result);
+    Py_DECREF(seq);
+    return NULL;
 }
 
 static PyObject *
-LRU_peek_last_item(LRU *self)
+LRU_set_many(LRU *self, PyObject *pairs)
 {
-    if (self->last) {
-        PyObject *tuple = PyTuple_New(2);
-        Py_INCREF(self->last->key);
-        PyTuple_SET_ITEM(tuple, 0, self->last->key);
-        Py_INCREF(self->last->value);
-        PyTuple_SET_ITEM(tuple, 1, self->last->value);
+    PyObject *iter, *item, *pair;
+    PyObject *key, *value;
+    Py_ssize_t pos = 0;
+    double expires;
+
+    expires = self->ttl ? lru_now() + self->ttl : 0;
+    if (PyDict_CheckExact(pairs)) {
+        while (PyDict_Next(pairs, &pos, &key, &value))
+            if (lru_set(self, key, value, expires) < 0)
+                return NULL;
+        Py_RETURN_NONE;
+    }
+
+    iter = PyObject_GetIter(pairs);
+    if (iter == NULL)
+        return NULL;
+    while ((item = PyIter_Next(iter)) != NULL) {
+        pair = PySequence_Fast(item, "set_many() items must be (key, value) pairs");
+        Py_DECREF(item);
+        if (pair == NULL)
+            goto error;
+        if (PySequence_Fast_GET_SIZE(pair) != 2) {
+            PyErr_Format(PyExc_ValueError, "set_many() items must be (key, value) pairs, got length %zd",
+                         PySequence_Fast_GET_SIZE(pair));
+            Py_DECREF(pair);
+            goto error;
+        }
+        if (lru_set(self, PySequence_Fast_GET_ITEM(pair, 0), PySequence_Fast_GET_ITEM(pair, 1), expires) < 0) {
+            Py_DECREF(pair);
+            goto error;
+        }
+        Py_DECREF(pair);
+    }
+    Py_DECREF(iter);
+    if (PyErr_Occurred())
+        return NULL;
+    Py_RETURN_NONE;
+
+error:
+    Py_DECREF(iter);
+    return NULL;
+}
+
+static PyObject *
+LRU_pop_many(LRU *self, PyObject *keys)
+{
+    PyObject *seq, *result, *key;
+    Node *node;
+    Py_ssize_t i, n;
+    int res;
+
+    seq = PySequence_Fast(keys, "pop_many() argument must be iterable");
+    if (seq == NULL)
+        return NULL;
+    result = PyDict_New();
+    if (result == NULL)
+        goto error;
+    n = PySequence_Fast_GET_SIZE(seq);
+    for (i = 0; i < n; i++) {
+        key = PySequence_Fast_GET_ITEM(seq, i);
+        node = GET_NODE(self->dict, key);
+        if (node == NULL) {
+            if (!PyErr_ExceptionMatches(PyExc_KeyError))
+                goto error;
+            PyErr_Clear();
+            continue;
+        }
+        if (NODE_EXPIRED(node)) {
+            lru_evict_node(self, node, reason_expired);
+            Py_DECREF(node);
+            continue;
+        }
+        res = PyDict_SetItem(result, key, node->value);
+        Py_DECREF(node);
+        if (res < 0 || lru_ass_sub(self, key, NULL) < 0)
+            goto error;
+    }
+    Py_DECREF(seq);
+    return result;
+
+error:
+    Py_XDECREF(result);
+    Py_DECREF(seq);
+    return NULL;
+}
+
+static PyObject *
+LRU_peek(LRU *self, PyObject *args)
+{
+    PyObject *key, *instead = Py_None;
+    Node *node;
+
+    if (!PyArg_ParseTuple(args, "O|O:peek", &key, &instead))
+        return NULL;
+    node = (Node *)PyDict_GetItemWithError(self->dict, key);
+    if (node && NODE_EXPIRED(node)) {
+        lru_evict_node(self, node, reason_expired);
+        node = NULL;
+    }
+    if (node) {
+        Py_INCREF(node->value);
+        return node->value;
+    }
+    if (PyErr_Occurred())
+        return NULL;
+    Py_INCREF(instead);
+    return instead;
+}
+
+/* unlike peek an expired node is left in place, so iterators over L stay valid */
+static PyObject *
+LRU_peek_ttl(LRU *self, PyObject *key)
+{
+    Node *node = (Node *)PyDict_GetItemWithError(self->dict, key);
+    double remaining;
+
+    if (node == NULL) {
+        if (!PyErr_Occurred())
+            PyErr_SetObject(PyExc_KeyError, key);
+        return NULL;
+    }
+    if (node->pinned || node->expires == 0)
+        Py_RETURN_NONE;
+    remaining = node->expires - lru_now();
+    if (remaining <= 0) {
+        PyErr_SetObject(PyExc_KeyError, key);
+        return NULL;
+    }
+    return PyFloat_FromDouble(remaining);
+}
+
+static PyObject *
+LRU_peek_first_item(LRU *self)
+{
+    if (self->first) {
+        PyObject *tuple = PyTuple_New(2);
+        Py_INCREF(self->first->key);
+        PyTuple_SET_ITEM(tuple, 0, self->first->key);
+        Py_INCREF(self->first->value);
+        PyTuple_SET_ITEM(tuple, 1, self->first->value);
+        return tuple;
+    }
+    else Py_RETURN_NONE;
+}
+
+static PyObject *
+LRU_peek_last_item(LRU *self)
+{
+    if (self->last) {
+        PyObject *tuple = PyTuple_New(2);
+        Py_INCREF(self->last->key);
+        PyTuple_SET_ITEM(tuple, 0, self->last->key);
+        Py_INCREF(self->last->value);
+        PyTuple_SET_ITEM(tuple, 1, self->last->value);
         return tuple;
     }
     else Py_RETURN_NONE;
@@ -539,9 +1227,110 @@ LRU_values(LRU *self)
 }
 
 static PyObject *
-LRU_set_callback(LRU *self, PyObject *args)
+LRU_set_callback(LRU *self, PyObject *args, PyObject *kwds)
+{
+    return set_callback(self, args, kwds);
+}
+
+static PyObject *
+LRU_drain(LRU *self)
+{
+    PyObject *batch, *callback;
+    Py_ssize_t count;
+
+    /* Only the swap is locked, other threads keep using the LRU while the callback runs */
+    Py_BEGIN_CRITICAL_SECTION(self);
+    batch = self->pending;
+    self->pending = NULL;
+    callback = self->callback;
+    Py_XINCREF(callback);
+    Py_END_CRITICAL_SECTION();
+    count = lru_deliver(batch, callback);
+    if (count < 0)
+        return NULL;
+    return PyLong_FromSsize_t(count);
+}
+
+/* Call module.name(target, *args, **kwds), for methods shared with the pure-Python LRU */
+static PyObject *
+lru_delegate(const char *module_name, const char *name, PyObject *target, PyObject *args, PyObject *kwds)
+{
+    PyObject *module, *func, *full_args, *item;
+    PyObject *result = NULL;
+    Py_ssize_t i, n = PyTuple_GET_SIZE(args);
+
+    module = PyImport_ImportModule(module_name);
+    if (module == NULL)
+        return NULL;
+    func = PyObject_GetAttrString(module, name);
+    Py_DECREF(module);
+    if (func == NULL)
+        return NULL;
+    full_args = PyTuple_New(n + 1);
+    if (full_args != NULL) {
+        Py_INCREF(target);
+        PyTuple_SET_ITEM(full_args, 0, target);
+        for (i = 0; i < n; i++) {
+            item = PyTuple_GET_ITEM(args, i);
+            Py_INCREF(item);
+            PyTuple_SET_ITEM(full_args, i + 1, item);
+        }
+        result = PyObject_Call(func, full_args, kwds);
+        Py_DECREF(full_args);
+    }
+    Py_DECREF(func);
+    return result;
+}
+
+static PyObject *
+LRU_dump(LRU *self, PyObject *args, PyObject *kwds)
+{
+    return lru_delegate("tarina._lru_snapshot", "dump", (PyObject *)self, args, kwds);
+}
+
+static PyObject *
+LRU_load(PyObject *cls, PyObject *args, PyObject *kwds)
+{
+    return lru_delegate("tarina._lru_snapshot", "load", cls, args, kwds);
+}
+
+static PyObject *
+LRU_get_or_compute(LRU *self, PyObject *args)
+{
+    PyObject *key, *factory, *value;
+    Node *node;
+
+    if (!PyArg_ParseTuple(args, "OO:get_or_compute", &key, &factory))
+        return NULL;
+    value = lru_lookup(self, key);
+    if (value || PyErr_Occurred())
+        return value;
+    value = PyObject_CallObject(factory, NULL);
+    if (value == NULL)
+        return NULL;
+    /* The factory may release the GIL or suspend the critical section, so another caller can
+       have stored key meanwhile; the stored value wins and every caller returns the same object */
+    node = (Node *)PyDict_GetItemWithError(self->dict, key);
+    if (node && !NODE_EXPIRED(node)) {
+        Py_DECREF(value);
+        Py_INCREF(node->value);
+        return node->value;
+    }
+    if (node == NULL && PyErr_Occurred()) {
+        Py_DECREF(value);
+        return NULL;
+    }
+    if (lru_ass_sub(self, key, value) < 0) {
+        Py_DECREF(value);
+        return NULL;
+    }
+    return value;
+}
+
+static PyObject *
+LRU_aget_or_compute(LRU *self, PyObject *args, PyObject *kwds)
 {
-    return set_callback(self, args);
+    return lru_delegate("tarina._lru_async", "aget_or_compute", (PyObject *)self, args, kwds);
 }
 
 static PyObject *
@@ -561,6 +1350,135 @@ LRU_items(LRU *self)
     return collect(self, get_item);
 }
 
+typedef struct {
+    PyObject_HEAD
+    LRU *lru;
+    Node *node;  /* next node to yield, NULL when exhausted */
+    size_t version;  /* lru->version when the iterator was created */
+    int reverse;  /* walk from the least recently used node */
+    PyObject * (*getterfunc)(Node *);
+} LRUIter;
+
+static void
+lru_iter_dealloc(LRUIter *it)
+{
+    Py_XDECREF(it->node);
+    Py_DECREF(it->lru);
+    PyObject_Del((PyObject*)it);
+}
+
+static PyObject *
+lru_iter_next_unlocked(LRUIter *it)
+{
+    Node *node = it->node;
+    PyObject *result;
+
+    if (node == NULL)
+        return NULL;
+    if (it->version != it->lru->version) {
+        PyErr_SetString(PyExc_RuntimeError, "LRU mutated during iteration");
+        return NULL;
+    }
+    it->node = it->reverse ? node->prev : node->next;
+    Py_XINCREF(it->node);
+    result = it->getterfunc(node);
+    Py_DECREF(node);
+    return result;
+}
+
+static PyObject *
+lru_iter_next(LRUIter *it)
+{
+    PyObject *result;
+
+    /* The iterator state is guarded by the lock of the LRU it walks */
+    Py_BEGIN_CRITICAL_SECTION(it->lru);
+    result = lru_iter_next_unlocked(it);
+    Py_END_CRITICAL_SECTION();
+    return result;
+}
+
+static PyTypeObject LRUIterType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "_lru_c.LRUIterator",       /* tp_name */
+    sizeof(LRUIter),         /* tp_basicsize */
+    0,                       /* tp_itemsize */
+    (destructor)lru_iter_dealloc, /* tp_dealloc */
+    0,                       /* tp_print */
+    0,                       /* tp_getattr */
+    0,                       /* tp_setattr */
+    0,                       /* tp_compare */
+    0,                       /* tp_repr */
+    0,                       /* tp_as_number */
+    0,                       /* tp_as_sequence */
+    0,                       /* tp_as_mapping */
+    0,                       /* tp_hash */
+    0,                       /* tp_call */
+    0,                       /* tp_str */
+    0,                       /* tp_getattro */
+    0,                       /* tp_setattro */
+    0,                       /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT,      /* tp_flags */
+    "Lazy iterator over the linked list of an LRU", /* tp_doc */
+    0,                       /* tp_traverse */
+    0,                       /* tp_clear */
+    0,                       /* tp_richcompare */
+    0,                       /* tp_weaklistoffset */
+    PyObject_SelfIter,       /* tp_iter */
+    (iternextfunc)lru_iter_next, /* tp_iternext */
+    0,                       /* tp_methods */
+    0,                       /* tp_members */
+    0,                       /* tp_getset */
+    0,                       /* tp_base */
+    0,                       /* tp_dict */
+    0,                       /* tp_descr_get */
+    0,                       /* tp_descr_set */
+    0,                       /* tp_dictoffset */
+    0,                       /* tp_init */
+    0,                       /* tp_alloc */
+    0,                       /* tp_new */
+};
+
+static PyObject *
+lru_iter_new(LRU *self, PyObject *args, PyObject *kwds, PyObject * (*getterfunc)(Node *))
+{
+    static char *kwlist[] = {"reverse", NULL};
+    int reverse = 0;
+    LRUIter *it;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|p", kwlist, &reverse))
+        return NULL;
+    it = PyObject_New(LRUIter, &LRUIterType);
+    if (it == NULL)
+        return NULL;
+    Py_INCREF(self);
+    it->lru = self;
+    it->node = reverse ? self->last : self->first;
+    Py_XINCREF(it->node);
+    it->version = self->version;
+    it->reverse = reverse;
+    it->getterfunc = getterfunc;
+    return (PyObject *)it;
+}
+
+static PyObject *
+LRU_iterkeys(LRU *self, PyObject *args, PyObject *kwds)
+{
+    return lru_iter_new(self, args, kwds, get_key);
+}
+
+static PyObject *
+LRU_itervalues(LRU *self, PyObject *args, PyObject *kwds)
+{
+    return lru_iter_new(self, args, kwds, get_value);
+}
+
+static PyObject *
+LRU_iteritems(LRU *self, PyObject *args, PyObject *kwds)
+{
+    return lru_iter_new(self, args, kwds, get_item);
+}
+
 static PyObject *
 LRU_set_size(LRU *self, PyObject *args, PyObject *kwds)
 {
@@ -572,9 +1490,7 @@ LRU_set_size(LRU *self, PyObject *args, PyObject *kwds)
         PyErr_SetString(PyExc_ValueError, "Size should be a positive number");
         return NULL;
     }
-    while (lru_length(self) > newSize) {
-        lru_delete_last(self);
-    }
+    while (LRU_UNPINNED(self) > newSize && lru_delete_last(self));
     self->size = newSize;
     Py_RETURN_NONE;
 }
@@ -591,8 +1507,8 @@ LRU_clear(LRU *self)
     }
     PyDict_Clear(self->dict);
 
-    self->hits = 0;
-    self->misses = 0;
+    self->weight = 0;
+    self->pinned = 0;
     Py_RETURN_NONE;
 }
 
@@ -606,9 +1522,66 @@ LRU_get_size(LRU *self)
 static PyObject *
 LRU_get_stats(LRU *self)
 {
-    return Py_BuildValue("nn", self->hits, self->misses);
+    PyObject *stats = PyStructSequence_New(&LRUStatsType);
+    if (stats == NULL)
+        return NULL;
+    PyStructSequence_SET_ITEM(stats, 0, PyLong_FromSsize_t(self->hits));
+    PyStructSequence_SET_ITEM(stats, 1, PyLong_FromSsize_t(self->misses));
+    PyStructSequence_SET_ITEM(stats, 2, PyLong_FromSsize_t(self->inserts));
+    PyStructSequence_SET_ITEM(stats, 3, PyLong_FromSsize_t(self->updates));
+    PyStructSequence_SET_ITEM(stats, 4, PyLong_FromSsize_t(self->evictions));
+    if (PyErr_Occurred()) {
+        Py_DECREF(stats);
+        return NULL;
+    }
+    return stats;
 }
 
+static PyObject *
+LRU_reset_stats(LRU *self)
+{
+    self->hits = self->misses = 0;
+    self->inserts = self->updates = self->evictions = 0;
+    Py_RETURN_NONE;
+}
+
+
+LRU_LOCKED(int, LRU_seq_contains, (LRU *self, PyObject *key), (self, key))
+LRU_LOCKED_NOARGS(LRU_keys)
+LRU_LOCKED_NOARGS(LRU_values)
+LRU_LOCKED_NOARGS(LRU_items)
+LRU_LOCKED_NOARGS(LRU_get_size)
+LRU_LOCKED_NOARGS(LRU_clear)
+LRU_LOCKED_NOARGS(LRU_get_stats)
+LRU_LOCKED_NOARGS(LRU_reset_stats)
+LRU_LOCKED_NOARGS(LRU_peek_first_item)
+LRU_LOCKED_NOARGS(LRU_peek_last_item)
+LRU_LOCKED_NOARGS(LRU_expire)
+LRU_LOCKED_NOARGS(LRU_get_max_weight)
+LRU_LOCKED_NOARGS(LRU_get_weight)
+LRU_LOCKED_NOARGS(LRU_get_ttl)
+LRU_LOCKED_O(LRU_contains_key)
+LRU_LOCKED_O(LRU_set_many)
+LRU_LOCKED_O(LRU_pop_many)
+LRU_LOCKED_O(LRU_pin)
+LRU_LOCKED_O(LRU_peek_ttl)
+LRU_LOCKED_O(LRU_unpin)
+LRU_LOCKED_VARARGS(LRU_contains)
+LRU_LOCKED_VARARGS(LRU_get)
+LRU_LOCKED_VARARGS(LRU_get_many)
+LRU_LOCKED_VARARGS(LRU_setdefault)
+LRU_LOCKED_VARARGS(LRU_pop)
+LRU_LOCKED_VARARGS(LRU_set_max_weight)
+LRU_LOCKED_VARARGS(LRU_peek)
+LRU_LOCKED_VARARGS(LRU_get_or_compute)
+LRU_LOCKED_KEYWORDS(LRU_iterkeys)
+LRU_LOCKED_KEYWORDS(LRU_itervalues)
+LRU_LOCKED_KEYWORDS(LRU_iteritems)
+LRU_LOCKED_KEYWORDS(LRU_popitem)
+LRU_LOCKED_KEYWORDS(LRU_set_size)
+LRU_LOCKED_KEYWORDS(LRU_update)
+LRU_LOCKED_KEYWORDS(LRU_set_callback)
+LRU_LOCKED_KEYWORDS(LRU_set)
 
 /* Hack to implement "key in lru" */
 static PySequenceMethods lru_as_sequence = {
@@ -619,46 +1592,90 @@ static PySequenceMethods lru_as_sequence = {
     0,                             /* sq_slice */
     0,                             /* sq_ass_item */
     0,                             /* sq_ass_slice */
-    (objobjproc) LRU_seq_contains, /* sq_contains */
+    (objobjproc) LRU_seq_contains_locked, /* sq_contains */
     0,                             /* sq_inplace_concat */
     0,                             /* sq_inplace_repeat */
 };
 
 static PyMethodDef LRU_methods[] = {
-    {"__contains__", (PyCFunction)LRU_contains_key, METH_O | METH_COEXIST,
+    {"__contains__", (PyCFunction)LRU_contains_key_locked, METH_O | METH_COEXIST,
                     PyDoc_STR("L.__contains__(key) -> Check if key is there in L")},
-    {"keys", (PyCFunction)LRU_keys, METH_NOARGS,
+    {"keys", (PyCFunction)LRU_keys_locked, METH_NOARGS,
                     PyDoc_STR("L.keys() -> list of L's keys in MRU order")},
-    {"values", (PyCFunction)LRU_values, METH_NOARGS,
+    {"values", (PyCFunction)LRU_values_locked, METH_NOARGS,
                     PyDoc_STR("L.values() -> list of L's values in MRU order")},
-    {"items", (PyCFunction)LRU_items, METH_NOARGS,
+    {"items", (PyCFunction)LRU_items_locked, METH_NOARGS,
                     PyDoc_STR("L.items() -> list of L's items (key,value) in MRU order")},
-    {"has_key",	(PyCFunction)LRU_contains, METH_VARARGS,
+    {"iterkeys", (PyCFunction)LRU_iterkeys_locked, METH_VARARGS | METH_KEYWORDS,
+                    PyDoc_STR("L.iterkeys(reverse=False) -> lazy iterator over L's keys in MRU order, LRU order if reverse")},
+    {"itervalues", (PyCFunction)LRU_itervalues_locked, METH_VARARGS | METH_KEYWORDS,
+                    PyDoc_STR("L.itervalues(reverse=False) -> lazy iterator over L's values in MRU order, LRU order if reverse")},
+    {"iteritems", (PyCFunction)LRU_iteritems_locked, METH_VARARGS | METH_KEYWORDS,
+                    PyDoc_STR("L.iteritems(reverse=False) -> lazy iterator over L's items in MRU order, LRU order if reverse")},
+    {"has_key",	(PyCFunction)LRU_contains_locked, METH_VARARGS,
                     PyDoc_STR("L.has_key(key) -> Check if key is there in L")},
-    {"get",	(PyCFunction)LRU_get, METH_VARARGS,
+    {"get",	(PyCFunction)LRU_get_locked, METH_VARARGS,
                     PyDoc_STR("L.get(key[, instead]) -> If L has key return its value, otherwise instead")},
-    {"setdefault", (PyCFunction)LRU_setdefault, METH_VARARGS,
+    {"get_or_compute", (PyCFunction)LRU_get_or_compute_locked, METH_VARARGS,
+                    PyDoc_STR("L.get_or_compute(key, factory) -> If L has key return its value, otherwise call factory(), insert the result under key and return it; if key was stored while factory ran, that value is kept and returned instead")},
+    {"aget_or_compute", (PyCFunction)LRU_aget_or_compute, METH_VARARGS | METH_KEYWORDS,
+                    PyDoc_STR("L.aget_or_compute(key, factory) -> coroutine returning the value of key, awaiting factory() on a miss; concurrent calls for the same key share one factory call")},
+    {"get_many", (PyCFunction)LRU_get_many_locked, METH_VARARGS,
+                    PyDoc_STR("L.get_many(keys[, instead]) -> list of the values of keys, instead for missing keys")},
+    {"set_many", (PyCFunction)LRU_set_many_locked, METH_O,
+                    PyDoc_STR("L.set_many(pairs) -> set every (key, value) pair of a dict or an iterable of pairs")},
+    {"pop_many", (PyCFunction)LRU_pop_many_locked, METH_O,
+                    PyDoc_STR("L.pop_many(keys) -> dict of the removed keys and values, missing keys are skipped")},
+    {"setdefault", (PyCFunction)LRU_setdefault_locked, METH_VARARGS,
                     PyDoc_STR("L.setdefault(key, default=None) -> If L has key return its value, otherwise insert key with a value of default and return default")},
-    {"pop", (PyCFunction)LRU_pop, METH_VARARGS,
-                    PyDoc_STR("L.pop(key[, default]) -> If L has key return its value and remove it from L, otherwise return default. If default is not given and key is not in L, a KeyError is raised.")},
-    {"popitem", (PyCFunction)LRU_popitem, METH_VARARGS | METH_KEYWORDS,
+    {"pop", (PyCFunction)LRU_pop_locked, METH_VARARGS,
+                    PyDoc_STR("L.pop(key[, default]) -> If L has key return its value and remove it from L, otherwise return default, or None if default is not given.")},
+    {"popitem", (PyCFunction)LRU_popitem_locked, METH_VARARGS | METH_KEYWORDS,
                     PyDoc_STR("L.popitem([least_recent=True]) -> Returns and removes a (key, value) pair. The pair returned is the least-recently used if least_recent is true, or the most-recently used if false.")},
-    {"set_size", (PyCFunction)LRU_set_size, METH_VARARGS,
+    {"set_size", (PyCFunction)LRU_set_size_locked, METH_VARARGS,
                     PyDoc_STR("L.set_size(size) -> set size of LRU")},
-    {"get_size", (PyCFunction)LRU_get_size, METH_NOARGS,
+    {"get_size", (PyCFunction)LRU_get_size_locked, METH_NOARGS,
                     PyDoc_STR("L.get_size() -> get size of LRU")},
-    {"clear", (PyCFunction)LRU_clear, METH_NOARGS,
+    {"clear", (PyCFunction)LRU_clear_locked, METH_NOARGS,
                     PyDoc_STR("L.clear() -> clear LRU")},
-    {"get_stats", (PyCFunction)LRU_get_stats, METH_NOARGS,
-                    PyDoc_STR("L.get_stats() -> returns a tuple with cache hits and misses")},
-    {"peek_first_item", (PyCFunction)LRU_peek_first_item, METH_NOARGS,
+    {"get_stats", (PyCFunction)LRU_get_stats_locked, METH_NOARGS,
+                    PyDoc_STR("L.get_stats() -> returns LRUStats(hits, misses, inserts, updates, evictions)")},
+    {"reset_stats", (PyCFunction)LRU_reset_stats_locked, METH_NOARGS,
+                    PyDoc_STR("L.reset_stats() -> reset all counters returned by get_stats() to zero")},
+    {"peek", (PyCFunction)LRU_peek_locked, METH_VARARGS,
+                    PyDoc_STR("L.peek(key[, instead]) -> If L has key return its value without changing key order or counters, otherwise instead")},
+    {"peek_ttl", (PyCFunction)LRU_peek_ttl_locked, METH_O,
+                    PyDoc_STR("L.peek_ttl(key) -> seconds until key expires, None if it never does; raises KeyError if key is missing or expired, without evicting it")},
+    {"pin", (PyCFunction)LRU_pin_locked, METH_O,
+                    PyDoc_STR("L.pin(key) -> keep key in L until it is unpinned; pinned keys are never evicted or expired and do not count toward size or max_weight")},
+    {"unpin", (PyCFunction)LRU_unpin_locked, METH_O,
+                    PyDoc_STR("L.unpin(key) -> return a pinned key to its priority class as the most recent item of that class")},
+    {"peek_first_item", (PyCFunction)LRU_peek_first_item_locked, METH_NOARGS,
                     PyDoc_STR("L.peek_first_item() -> returns the MRU item (key,value) without changing key order")},
-    {"peek_last_item", (PyCFunction)LRU_peek_last_item, METH_NOARGS,
+    {"peek_last_item", (PyCFunction)LRU_peek_last_item_locked, METH_NOARGS,
                     PyDoc_STR("L.peek_last_item() -> returns the LRU item (key,value) without changing key order")},
-    {"update", (PyCFunction)LRU_update, METH_VARARGS | METH_KEYWORDS,
+    {"update", (PyCFunction)LRU_update_locked, METH_VARARGS | METH_KEYWORDS,
                     PyDoc_STR("L.update() -> update value for key in LRU")},
-    {"set_callback", (PyCFunction)LRU_set_callback, METH_VARARGS,
-                    PyDoc_STR("L.set_callback(callback) -> set a callback to call when an item is evicted.")},
+    {"dump", (PyCFunction)LRU_dump, METH_VARARGS | METH_KEYWORDS,
+                    PyDoc_STR("L.dump(file, codec=pickle, hottest=None) -> stream L to a path or binary file in recency order, keeping only the hottest entries if given; returns the number of entries written")},
+    {"load", (PyCFunction)LRU_load, METH_VARARGS | METH_KEYWORDS | METH_CLASS,
+                    PyDoc_STR("LRU.load(file, codec=pickle, size=None, **kwargs) -> new LRU restored from a snapshot written by dump(), with the saved capacity unless size is given")},
+    {"set_callback", (PyCFunction)LRU_set_callback_locked, METH_VARARGS | METH_KEYWORDS,
+                    PyDoc_STR("L.set_callback(callback, reason=False, batch=None) -> set a callback to call when an item is evicted. If reason is true, the callback also receives 'capacity' or 'expired'. If batch is given, evictions are buffered and the callback receives lists of up to batch (key, value[, reason]) tuples, from drain() or once the buffer is full.")},
+    {"drain", (PyCFunction)LRU_drain, METH_NOARGS,
+                    PyDoc_STR("L.drain() -> pass the evictions buffered by set_callback(..., batch=n) to the callback as one list and return how many there were")},
+    {"set", (PyCFunction)LRU_set_locked, METH_VARARGS | METH_KEYWORDS,
+                    PyDoc_STR("L.set(key, value, ttl=None, priority=None) -> set value for key, expiring after ttl seconds (default TTL of L if None). Items of a lower priority class (0-7) are evicted first; None keeps the class of an existing key, new keys default to 0")},
+    {"expire", (PyCFunction)LRU_expire_locked, METH_NOARGS,
+                    PyDoc_STR("L.expire() -> remove all expired items and return how many were removed")},
+    {"set_max_weight", (PyCFunction)LRU_set_max_weight_locked, METH_VARARGS,
+                    PyDoc_STR("L.set_max_weight(max_weight) -> set max total weight of LRU, None to only bound the number of items")},
+    {"get_max_weight", (PyCFunction)LRU_get_max_weight_locked, METH_NOARGS,
+                    PyDoc_STR("L.get_max_weight() -> get max total weight of LRU, None if not bounded")},
+    {"get_weight", (PyCFunction)LRU_get_weight_locked, METH_NOARGS,
+                    PyDoc_STR("L.get_weight() -> get current total weight of all items")},
+    {"get_ttl", (PyCFunction)LRU_get_ttl_locked, METH_NOARGS,
+                    PyDoc_STR("L.get_ttl() -> get default TTL of LRU, None if items never expire")},
     {NULL,	NULL},
 };
 
@@ -668,15 +1685,36 @@ LRU_repr(LRU* self)
     return PyObject_Repr(self->dict);
 }
 
+LRU_LOCKED(PyObject *, LRU_repr, (LRU *self), (self))
+
 static int
 LRU_init(LRU *self, PyObject *args, PyObject *kwds)
 {
-    static char *kwlist[] = {"size", "callback", NULL};
+    static char *kwlist[] = {"size", "callback", "ttl", "max_weight", "weigher", NULL};
     PyObject *callback = NULL;
+    PyObject *ttl = NULL;
+    PyObject *max_weight = NULL;
+    PyObject *weigher = NULL;
     self->callback = NULL;
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "n|O", kwlist, &self->size, &callback)) {
+    self->callback_reason = 0;
+    self->batch = 0;
+    self->pending = NULL;
+    self->weigher = NULL;
+    self->weight = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "n|OOOO", kwlist, &self->size, &callback, &ttl, &max_weight, &weigher)) {
+        return -1;
+    }
+    if (parse_ttl(ttl, &self->ttl) < 0 || parse_max_weight(max_weight, &self->max_weight) < 0) {
         return -1;
     }
+    if (weigher && weigher != Py_None) {
+        if (!PyCallable_Check(weigher)) {
+            PyErr_SetString(PyExc_TypeError, "weigher must be callable");
+            return -1;
+        }
+        Py_INCREF(weigher);
+        self->weigher = weigher;
+    }
 
     if (callback && callback != Py_None) {
         if (!PyCallable_Check(callback)) {
@@ -693,8 +1731,12 @@ LRU_init(LRU *self, PyObject *args, PyObject *kwds)
     }
     self->dict = PyDict_New();
     self->first = self->last = NULL;
-    self->hits = 0;
-    self->misses = 0;
+    memset(self->heads, 0, sizeof(self->heads));
+    memset(self->tails, 0, sizeof(self->tails));
+    self->pinned = 0;
+    self->version = 0;
+    self->hits = self->misses = 0;
+    self->inserts = self->updates = self->evictions = 0;
     return 0;
 }
 
@@ -705,16 +1747,25 @@ LRU_dealloc(LRU *self)
         LRU_clear(self);
         Py_DECREF(self->dict);
         Py_XDECREF(self->callback);
+        Py_XDECREF(self->weigher);
+        Py_XDECREF(self->pending);
     }
     PyObject_Del((PyObject*)self);
 }
 
 PyDoc_STRVAR(lru_doc,
-"LRU(size, callback=None) -> new LRU dict that can store up to size elements\n"
+"LRU(size, callback=None, ttl=None, max_weight=None, weigher=None) -> new LRU dict that can store up to size elements\n"
 "An LRU dict behaves like a standard dict, except that it stores only fixed\n"
 "set of elements. Once the size overflows, it evicts least recently used\n"
 "items.  If a callback is set it will call the callback with the evicted key\n"
-" and item.\n\n"
+" and item.\n"
+"If ttl is given, items expire ttl seconds after being set.  Expired items\n"
+"are skipped on access and removed lazily, or in bulk by expire().\n"
+"If max_weight is given, least recently used items are also evicted while the\n"
+"total weight exceeds it.  Weights are computed by weigher(key, value), or by\n"
+"sys.getsizeof(value) if no weigher is given.\n"
+"Items set with a higher priority are only evicted once no lower class is\n"
+"left, and pinned items are not evicted at all.\n\n"
 "Eg:\n"
 ">>> l = LRU(3)\n"
 ">>> for i in range(5):\n"
@@ -734,7 +1785,7 @@ static PyTypeObject LRUType = {
     0,                       /* tp_getattr */
     0,                       /* tp_setattr */
     0,                       /* tp_compare */
-    (reprfunc)LRU_repr,      /* tp_repr */
+    (reprfunc)LRU_repr_locked, /* tp_repr */
     0,                       /* tp_as_number */
     &lru_as_sequence,        /* tp_as_sequence */
     &LRU_as_mapping,         /* tp_as_mapping */
@@ -765,13 +1816,326 @@ static PyTypeObject LRUType = {
     0,                       /* tp_new */
 };
 
+/* Marker separating positional from keyword arguments in keys built by lru_make_key */
+static PyObject *kwd_mark;
+
+/*
+ * Build a cache key from call arguments with the same layout as functools._make_key:
+ * args [, kwd_mark, name1, value1, ...] [, type(arg1), ..., type(value1), ...].
+ * A single int or str argument is its own key.
+ */
+static PyObject *
+lru_make_key(PyObject *args, PyObject *kwds, int typed)
+{
+    PyObject *key, *k, *v;
+    Py_ssize_t nargs = PyTuple_GET_SIZE(args);
+    Py_ssize_t nkwds = kwds ? PyDict_GET_SIZE(kwds) : 0;
+    Py_ssize_t i, j = 0, pos = 0;
+
+    if (!nkwds && !typed) {
+        if (nargs == 1) {
+            k = PyTuple_GET_ITEM(args, 0);
+            if (PyUnicode_CheckExact(k) || PyLong_CheckExact(k)) {
+                Py_INCREF(k);
+                return k;
+            }
+        }
+        Py_INCREF(args);
+        return args;
+    }
+
+    key = PyTuple_New(nargs + (nkwds ? 1 + 2 * nkwds : 0) + (typed ? nargs + nkwds : 0));
+    if (key == NULL)
+        return NULL;
+    for (i = 0; i < nargs; i++) {
+        v = PyTuple_GET_ITEM(args, i);
+        Py_INCREF(v);
+        PyTuple_SET_ITEM(key, j++, v);
+    }
+    if (nkwds) {
+        Py_INCREF(kwd_mark);
+        PyTuple_SET_ITEM(key, j++, kwd_mark);
+        while (PyDict_Next(kwds, &pos, &k, &v)) {
+            Py_INCREF(k);
+            PyTuple_SET_ITEM(key, j++, k);
+            Py_INCREF(v);
+            PyTuple_SET_ITEM(key, j++, v);
+        }
+    }
+    if (typed) {
+        for (i = 0; i < nargs; i++) {
+            v = (PyObject *)Py_TYPE(PyTuple_GET_ITEM(args, i));
+            Py_INCREF(v);
+            PyTuple_SET_ITEM(key, j++, v);
+        }
+        for (pos = 0; nkwds && PyDict_Next(kwds, &pos, &k, &v);) {
+            v = (PyObject *)Py_TYPE(v);
+            Py_INCREF(v);
+            PyTuple_SET_ITEM(key, j++, v);
+        }
+    }
+    return key;
+}
+
+static PyObject *
+make_key(PyObject *module, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"args", "kwargs", "typed", NULL};
+    PyObject *call_args, *call_kwds = NULL;
+    int typed = 0;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O!|Op:make_key", kwlist, &PyTuple_Type, &call_args, &call_kwds, &typed))
+        return NULL;
+    if (call_kwds == Py_None)
+        call_kwds = NULL;
+    if (call_kwds && !PyDict_Check(call_kwds)) {
+        PyErr_SetString(PyExc_TypeError, "kwargs must be a dict");
+        return NULL;
+    }
+    return lru_make_key(call_args, call_kwds, typed);
+}
+
+static PyMethodDef lru_module_methods[] = {
+    {"make_key", (PyCFunction)make_key, METH_VARARGS | METH_KEYWORDS,
+                    PyDoc_STR("make_key(args, kwargs=None, typed=False) -> cache key for a call with args and kwargs, laid out like functools._make_key")},
+    {NULL, NULL},
+};
+
+typedef struct {
+    PyObject_HEAD
+    PyObject *func;
+    LRU *cache;
+    int typed;
+    PyObject *dict;  /* __dict__, filled by functools.update_wrapper */
+    PyObject *weakreflist;
+} Cached;
+
+static PyObject *
+cached_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"func", "size", "typed", "callback", NULL};
+    PyObject *func, *size, *callback = Py_None;
+    int typed = 0;
+    Cached *self;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO|pO:CachedFunction", kwlist, &func, &size, &typed, &callback))
+        return NULL;
+    if (!PyCallable_Check(func)) {
+        PyErr_SetString(PyExc_TypeError, "func must be callable");
+        return NULL;
+    }
+    self = (Cached *)type->tp_alloc(type, 0);
+    if (self == NULL)
+        return NULL;
+    self->cache = (LRU *)PyObject_CallFunctionObjArgs((PyObject *)&LRUType, size, callback, NULL);
+    if (self->cache == NULL) {
+        Py_DECREF(self);
+        return NULL;
+    }
+    Py_INCREF(func);
+    self->func = func;
+    self->typed = typed;
+    return (PyObject *)self;
+}
+
+static int
+cached_traverse(Cached *self, visitproc visit, void *arg)
+{
+    Py_VISIT(self->func);
+    Py_VISIT(self->cache);
+    Py_VISIT(self->dict);
+    return 0;
+}
+
+static int
+cached_clear(Cached *self)
+{
+    Py_CLEAR(self->func);
+    Py_CLEAR(self->cache);
+    Py_CLEAR(self->dict);
+    return 0;
+}
+
+static void
+cached_dealloc(Cached *self)
+{
+    PyObject_GC_UnTrack(self);
+    if (self->weakreflist != NULL)
+        PyObject_ClearWeakRefs((PyObject *)self);
+    cached_clear(self);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static PyObject *
+cached_call(Cached *self, PyObject *args, PyObject *kwds)
+{
+    PyObject *key, *value;
+    int res;
+
+    key = lru_make_key(args, kwds, self->typed);
+    if (key == NULL)
+        return NULL;
+    Py_BEGIN_CRITICAL_SECTION(self->cache);
+    value = lru_lookup(self->cache, key);
+    Py_END_CRITICAL_SECTION();
+    if (value == NULL && !PyErr_Occurred()) {
+        /* func runs unlocked, concurrent misses on the same key may call it more than once */
+        value = PyObject_Call(self->func, args, kwds);
+        if (value != NULL) {
+            Py_BEGIN_CRITICAL_SECTION(self->cache);
+            res = lru_ass_sub(self->cache, key, value);
+            Py_END_CRITICAL_SECTION();
+            if (res < 0)
+                Py_CLEAR(value);
+        }
+    }
+    Py_DECREF(key);
+    return value;
+}
+
+static PyObject *
+cached_descr_get(PyObject *self, PyObject *obj, PyObject *type)
+{
+    if (obj == NULL || obj == Py_None) {
+        Py_INCREF(self);
+        return self;
+    }
+    return PyMethod_New(self, obj);
+}
+
+static PyObject *
+cached_peek(Cached *self, PyObject *args, PyObject *kwds)
+{
+    PyObject *key, *value = Py_None;
+    Node *node;
+
+    key = lru_make_key(args, kwds, self->typed);
+    if (key == NULL)
+        return NULL;
+    Py_BEGIN_CRITICAL_SECTION(self->cache);
+    node = (Node *)PyDict_GetItemWithError(self->cache->dict, key);
+    if (node && !NODE_EXPIRED(node))
+        value = node->value;
+    Py_XINCREF(value);
+    Py_END_CRITICAL_SECTION();
+    Py_DECREF(key);
+    if (PyErr_Occurred()) {
+        Py_DECREF(value);
+        return NULL;
+    }
+    return value;
+}
+
+static PyObject *
+cached_invalidate(Cached *self, PyObject *args, PyObject *kwds)
+{
+    PyObject *key;
+    int res;
+
+    key = lru_make_key(args, kwds, self->typed);
+    if (key == NULL)
+        return NULL;
+    Py_BEGIN_CRITICAL_SECTION(self->cache);
+    res = lru_set(self->cache, key, NULL, 0);
+    Py_END_CRITICAL_SECTION();
+    Py_DECREF(key);
+    if (res < 0) {
+        if (!PyErr_ExceptionMatches(PyExc_KeyError))
+            return NULL;
+        PyErr_Clear();
+        Py_RETURN_FALSE;
+    }
+    Py_RETURN_TRUE;
+}
+
+static PyObject *
+cached_cache_clear(Cached *self)
+{
+    return LRU_clear_locked(self->cache);
+}
+
+static PyObject *
+cached_reduce(Cached *self)
+{
+    /* Pickled by reference like a plain function, through the module attribute it replaced */
+    return PyObject_GetAttrString((PyObject *)self, "__qualname__");
+}
+
+static PyMethodDef cached_methods[] = {
+    {"peek", (PyCFunction)cached_peek, METH_VARARGS | METH_KEYWORDS,
+                    PyDoc_STR("f.peek(*args, **kwargs) -> cached result for the arguments without changing key order or counters, None if not cached")},
+    {"invalidate", (PyCFunction)cached_invalidate, METH_VARARGS | METH_KEYWORDS,
+                    PyDoc_STR("f.invalidate(*args, **kwargs) -> remove the cached result for the arguments, return whether there was one")},
+    {"cache_clear", (PyCFunction)cached_cache_clear, METH_NOARGS,
+                    PyDoc_STR("f.cache_clear() -> remove all cached results")},
+    {"__reduce__", (PyCFunction)cached_reduce, METH_NOARGS, NULL},
+    {NULL, NULL},
+};
+
+static PyMemberDef cached_members[] = {
+    {"cache", T_OBJECT, offsetof(Cached, cache), READONLY, PyDoc_STR("the LRU holding the cached results")},
+    {NULL},
+};
+
+static PyGetSetDef cached_getset[] = {
+    {"__dict__", PyObject_GenericGetDict, PyObject_GenericSetDict, NULL, NULL},
+    {NULL},
+};
+
+PyDoc_STRVAR(cached_doc,
+"CachedFunction(func, size, typed=False, callback=None) -> func memoized in an LRU of the given size\n"
+"Keys are built like functools.lru_cache does; if typed is true, arguments of\n"
+"different types are cached separately.  callback is called with the key and\n"
+"result of every evicted call.\n");
+
+static PyTypeObject CachedType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "_lru_c.CachedFunction",    /* tp_name */
+    sizeof(Cached),          /* tp_basicsize */
+    0,                       /* tp_itemsize */
+    (destructor)cached_dealloc, /* tp_dealloc */
+    0,                       /* tp_print */
+    0,                       /* tp_getattr */
+    0,                       /* tp_setattr */
+    0,                       /* tp_compare */
+    0,                       /* tp_repr */
+    0,                       /* tp_as_number */
+    0,                       /* tp_as_sequence */
+    0,                       /* tp_as_mapping */
+    0,                       /* tp_hash */
+    (ternaryfunc)cached_call, /* tp_call */
+    0,                       /* tp_str */
+    0,                       /* tp_getattro */
+    0,                       /* tp_setattro */
+    0,                       /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC | Py_TPFLAGS_METHOD_DESCRIPTOR, /* tp_flags */
+    cached_doc,              /* tp_doc */
+    (traverseproc)cached_traverse, /* tp_traverse */
+    (inquiry)cached_clear,   /* tp_clear */
+    0,                       /* tp_richcompare */
+    offsetof(Cached, weakreflist), /* tp_weaklistoffset */
+    0,                       /* tp_iter */
+    0,                       /* tp_iternext */
+    cached_methods,          /* tp_methods */
+    cached_members,          /* tp_members */
+    cached_getset,           /* tp_getset */
+    0,                       /* tp_base */
+    0,                       /* tp_dict */
+    cached_descr_get,        /* tp_descr_get */
+    0,                       /* tp_descr_set */
+    offsetof(Cached, dict),  /* tp_dictoffset */
+    0,                       /* tp_init */
+    0,                       /* tp_alloc */
+    cached_new,              /* tp_new */
+};
+
 #if PY_MAJOR_VERSION >= 3
   static struct PyModuleDef moduledef = {
     PyModuleDef_HEAD_INIT,
     "_lru_c",            /* m_name */
     lru_doc,          /* m_doc */
     -1,               /* m_size */
-    NULL,             /* m_methods */
+    lru_module_methods, /* m_methods */
     NULL,             /* m_reload */
     NULL,             /* m_traverse */
     NULL,             /* m_clear */
@@ -792,18 +2156,55 @@ moduleinit(void)
     if (PyType_Ready(&LRUType) < 0)
         return NULL;
 
+    if (PyType_Ready(&LRUIterType) < 0)
+        return NULL;
+
+    if (PyType_Ready(&CachedType) < 0)
+        return NULL;
+
+    if (LRUStatsType.tp_name == NULL && PyStructSequence_InitType2(&LRUStatsType, &lru_stats_desc) < 0)
+        return NULL;
+
     #if PY_MAJOR_VERSION >= 3
         m = PyModule_Create(&moduledef);
     #else
-        m = Py_InitModule3("_lru_c", NULL, lru_doc);
+        m = Py_InitModule3("_lru_c", lru_module_methods, lru_doc);
     #endif
 
     if (m == NULL)
         return NULL;
 
+#ifdef Py_GIL_DISABLED
+    /* Every LRU method locks its own object, so importing the module must not re-enable the GIL */
+    if (PyUnstable_Module_SetGIL(m, Py_MOD_GIL_NOT_USED) < 0) {
+        Py_DECREF(m);
+        return NULL;
+    }
+#endif
+
+    sys_getsizeof = PySys_GetObject("getsizeof");  /* borrowed */
+    if (sys_getsizeof == NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "lost sys.getsizeof");
+        return NULL;
+    }
+    Py_INCREF(sys_getsizeof);
+
+    reason_capacity = PyUnicode_InternFromString("capacity");
+    reason_expired = PyUnicode_InternFromString("expired");
+    if (reason_capacity == NULL || reason_expired == NULL)
+        return NULL;
+
+    kwd_mark = PyObject_CallObject((PyObject *)&PyBaseObject_Type, NULL);
+    if (kwd_mark == NULL)
+        return NULL;
+
     Py_INCREF(&NodeType);
     Py_INCREF(&LRUType);
     PyModule_AddObject(m, "LRU", (PyObject *) &LRUType);
+    Py_INCREF(&LRUStatsType);
+    PyModule_AddObject(m, "LRUStats", (PyObject *) &LRUStatsType);
+    Py_INCREF(&CachedType);
+    PyModule_AddObject(m, "CachedFunction", (PyObject *) &CachedType);
 
     return m;
 }
@@ -1,27 +1,209 @@
 from __future__ import annotations
 
+import pickle
 from collections import OrderedDict
-from collections.abc import Hashable, Iterable
-from typing import Any, Callable, Generic, TypeVar, overload
+from collections.abc import Awaitable, Coroutine, Hashable, Iterable, Iterator, Mapping
+from itertools import chain
+from sys import getsizeof
+from time import monotonic
+from types import MethodType
+from typing import Any, Callable, Generic, NamedTuple, TypeVar, overload
+
+from . import _lru_async, _lru_snapshot
 
 _KT = TypeVar("_KT", bound=Hashable)
 _VT = TypeVar("_VT")
 _T = TypeVar("_T")
 
+REASON_CAPACITY = "capacity"
+REASON_EXPIRED = "expired"
+
+PRIORITIES = 8
+"""number of priority classes, items of a lower class are evicted first"""
+
+_MISSING: Any = object()
+
+
+class LRUStats(NamedTuple):
+    """Counters of an LRU, as returned by `LRU.get_stats`"""
+
+    hits: int
+    """lookups that found a live item"""
+    misses: int
+    """lookups that found no item or an expired one"""
+    inserts: int
+    """items added under a new key"""
+    updates: int
+    """items replaced under an existing key"""
+    evictions: int
+    """items evicted for capacity, weight or expiry"""
+
+
+def _check_ttl(ttl: float | None) -> float:
+    if ttl is None:
+        return 0
+    if not ttl > 0:
+        raise ValueError("TTL should be a positive number")
+    return ttl
 
-class LRU(Generic[_KT, _VT]):
-    __slots__ = ("__max", "__cache", "__size", "__callback")
 
-    def __init__(self, size: int, callback: Callable[[_KT, _VT], Any] | None = None) -> None:
+def _check_max_weight(max_weight: int | None) -> int:
+    if max_weight is None:
+        return 0
+    if max_weight < 1:
+        raise ValueError("Max weight should be a positive number")
+    return max_weight
+
+
+def _check_priority(priority: int | None) -> int | None:
+    if priority is not None and not 0 <= priority < PRIORITIES:
+        raise ValueError(f"Priority should be between 0 and {PRIORITIES - 1}")
+    return priority
+
+
+class LRU(Generic[_KT, _VT]):
+    __slots__ = (
+        "__max",
+        "__cache",
+        "__segments",
+        "__pinned",
+        "__version",
+        "__callback",
+        "__callback_reason",
+        "__batch",
+        "__pending",
+        "__ttl",
+        "__expires",
+        "__weigher",
+        "__max_weight",
+        "__weight",
+        "__weights",
+        "__hits",
+        "__misses",
+        "__inserts",
+        "__updates",
+        "__evictions",
+    )
+
+    def __init__(
+        self,
+        size: int,
+        callback: Callable[[_KT, _VT], Any] | None = None,
+        ttl: float | None = None,
+        max_weight: int | None = None,
+        weigher: Callable[[_KT, _VT], int] | None = None,
+    ) -> None:
         if size < 1:
             raise ValueError("Size should be a positive number")
         self.__max = size
-        self.__cache = OrderedDict()
-        self.__size = 0
+        # key -> index of its segment; segments hold the items of one class each, most recent first,
+        # and the last one holds the pinned items
+        self.__cache: dict[_KT, int] = {}
+        self.__segments: list[OrderedDict[_KT, _VT]] = [OrderedDict() for _ in range(PRIORITIES + 1)]
+        # pinned key -> class it returns to when unpinned
+        self.__pinned: dict[_KT, int] = {}
+        # bumped on every change of the segments, checked by iterators
+        self.__version = 0
         self.__callback = callback
+        self.__callback_reason = False
+        self.__batch = 0
+        self.__pending: list[tuple] = []
+        self.__ttl = _check_ttl(ttl)
+        self.__expires: dict[_KT, float] = {}
+        if weigher is not None and not callable(weigher):
+            raise TypeError("weigher must be callable")
+        self.__weigher = weigher
+        self.__max_weight = _check_max_weight(max_weight)
+        self.__weight = 0
+        self.__weights: dict[_KT, int] = {}
+        self.__hits = self.__misses = 0
+        self.__inserts = self.__updates = self.__evictions = 0
+
+    def __weigh(self, key: _KT, value: _VT) -> int:
+        weight = self.__weigher(key, value) if self.__weigher else getsizeof(value)
+        if weight < 0:
+            raise ValueError("Weight should not be negative")
+        if weight > self.__max_weight:
+            raise ValueError(f"Weight {weight} exceeds max weight {self.__max_weight}")
+        return weight
+
+    def __remove(self, key: _KT) -> _VT:
+        self.__version += 1
+        index = self.__cache.pop(key)
+        self.__expires.pop(key, None)
+        self.__pinned.pop(key, None)
+        if self.__weights:
+            weight = self.__weights.pop(key, 0)
+            if index != PRIORITIES:
+                self.__weight -= weight
+        return self.__segments[index].pop(key)
+
+    def __touch(self, key: _KT) -> _VT:
+        self.__version += 1
+        segment = self.__segments[self.__cache[key]]
+        segment.move_to_end(key, last=False)
+        return segment[key]
+
+    def __unpinned(self) -> int:
+        return len(self.__cache) - len(self.__pinned)
+
+    def __victim(self) -> Any:
+        """The least recent key of the lowest class, `_MISSING` if only pinned items are left."""
+        for segment in self.__segments[:PRIORITIES]:
+            if segment:
+                return next(reversed(segment))
+        return _MISSING
+
+    def __shrink(self, keep_one: bool = False) -> None:
+        """Evict for capacity until the size and max weight bounds hold again."""
+        while self.__unpinned() > self.__max and (key := self.__victim()) is not _MISSING:
+            self.__evict(key, REASON_CAPACITY)
+        while (
+            self.__max_weight
+            and self.__weight > self.__max_weight
+            and self.__unpinned() > keep_one
+            and (key := self.__victim()) is not _MISSING
+        ):
+            self.__evict(key, REASON_CAPACITY)
+
+    def __evict(self, key: _KT, reason: str) -> None:
+        # removed before the callback runs, so the callback sees a consistent LRU
+        value = self.__remove(key)
+        self.__evictions += 1
+        if self.__callback and self.__batch:
+            self.__pending.append((key, value, reason) if self.__callback_reason else (key, value))
+            # a full buffer is flushed right away to keep it bounded
+            if len(self.__pending) >= self.__batch:
+                self.drain()
+        elif self.__callback:
+            if self.__callback_reason:
+                self.__callback(key, value, reason)  # type: ignore
+            else:
+                self.__callback(key, value)
+
+    def __alive(self, key: _KT) -> bool:
+        """Whether key is present and not expired, evicting it if it is expired."""
+        if key not in self.__cache:
+            return False
+        if (
+            self.__expires
+            and (deadline := self.__expires.get(key)) is not None
+            and deadline <= monotonic()
+            and key not in self.__pinned
+        ):
+            self.__evict(key, REASON_EXPIRED)
+            return False
+        return True
 
     def clear(self) -> None:
+        self.__version += 1
         self.__cache.clear()
+        for segment in self.__segments:
+            segment.clear()
+        self.__pinned.clear()
+        self.__expires.clear()
+        self.__weights.clear()
+        self.__weight = 0
 
     @overload
     def get(self, key: _KT) -> _VT | None: ...
@@ -30,31 +212,123 @@ class LRU(Generic[_KT, _VT]):
     def get(self, key: _KT, instead: _VT | _T) -> _VT | _T: ...
 
     def get(self, key: _KT, instead: _VT | _T | None = None) -> _VT | _T | None:
-        if key in self.__cache:
-            self.__cache.move_to_end(key, last=False)
-            return self.__cache[key]
+        try:
+            alive = self.__alive(key)
+        except TypeError:
+            # unhashable keys are reported as missing, like the C extension does
+            return instead
+        if alive:
+            self.__hits += 1
+            return self.__touch(key)
+        self.__misses += 1
         return instead
 
+    @overload
+    def peek(self, key: _KT) -> _VT | None: ...
+
+    @overload
+    def peek(self, key: _KT, instead: _VT | _T) -> _VT | _T: ...
+
+    def peek(self, key: _KT, instead: _VT | _T | None = None) -> _VT | _T | None:
+        return self.__segments[self.__cache[key]][key] if self.__alive(key) else instead
+
+    def get_or_compute(self, key: _KT, factory: Callable[[], _VT]) -> _VT:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            # another caller may have stored key while the factory ran, its value wins
+            if self.__alive(key):
+                return self.__touch(key)
+            self[key] = value
+        return value
+
+    def aget_or_compute(self, key: _KT, factory: Callable[[], Awaitable[_VT]]) -> Coroutine[Any, Any, _VT]:
+        return _lru_async.aget_or_compute(self, key, factory)
+
+    def dump(self, file: Any, codec: Any = pickle, hottest: int | None = None) -> int:
+        return _lru_snapshot.dump(self, file, codec, hottest)
+
+    @classmethod
+    def load(cls, file: Any, codec: Any = pickle, size: int | None = None, **kwargs: Any) -> LRU[Any, Any]:
+        return _lru_snapshot.load(cls, file, codec, size, **kwargs)
+
+    def get_many(self, keys: Iterable[_KT], instead: _T | None = None) -> list[_VT | _T | None]:
+        return [self.get(key, instead) for key in keys]
+
+    def set_many(self, pairs: Mapping[_KT, _VT] | Iterable[tuple[_KT, _VT]]) -> None:
+        expires = monotonic() + self.__ttl if self.__ttl else 0
+        for pair in pairs.items() if isinstance(pairs, Mapping) else pairs:
+            if len(pair) != 2:
+                raise ValueError(f"set_many() items must be (key, value) pairs, got length {len(pair)}")
+            self.__set(pair[0], pair[1], expires)
+
+    def pop_many(self, keys: Iterable[_KT]) -> dict[_KT, _VT]:
+        result = {}
+        for key in keys:
+            if self.__alive(key):
+                result[key] = self.__remove(key)
+        return result
+
     def get_size(self) -> int:
         return self.__max
 
+    def get_max_weight(self) -> int | None:
+        return self.__max_weight or None
+
+    def get_weight(self) -> int:
+        return self.__weight
+
+    def get_stats(self) -> LRUStats:
+        return LRUStats(self.__hits, self.__misses, self.__inserts, self.__updates, self.__evictions)
+
+    def reset_stats(self) -> None:
+        self.__hits = self.__misses = 0
+        self.__inserts = self.__updates = self.__evictions = 0
+
+    def get_ttl(self) -> float | None:
+        return self.__ttl or None
+
     def has_key(self, key: _KT) -> bool:
-        return key in self.__cache
+        return self.__alive(key)
 
     def keys(self) -> list[_KT]:
-        return list(self.__cache.keys())
+        return list(self.iterkeys())
 
     def values(self) -> list[_VT]:
-        return list(self.__cache.values())
+        return list(self.itervalues())
 
     def items(self) -> list[tuple[_KT, _VT]]:
-        return list(self.__cache.items())
+        return list(self.iteritems())
+
+    def __views(self, view: Callable[[OrderedDict], Any], reverse: bool) -> Iterator[Any]:
+        # pinned items first, then the classes from the highest down
+        if reverse:
+            items = chain.from_iterable(reversed(view(segment)) for segment in self.__segments)
+        else:
+            items = chain.from_iterable(view(segment) for segment in reversed(self.__segments))
+        return self.__checked(items, self.__version)
+
+    def __checked(self, items: Iterator[Any], version: int) -> Iterator[Any]:
+        # the segments are chained lazily, so a change to one not reached yet is only seen here
+        for item in items:
+            if self.__version != version:
+                raise RuntimeError("LRU mutated during iteration")
+            yield item
+
+    def iterkeys(self, reverse: bool = False) -> Iterator[_KT]:
+        return self.__views(OrderedDict.keys, reverse)
+
+    def itervalues(self, reverse: bool = False) -> Iterator[_VT]:
+        return self.__views(OrderedDict.values, reverse)
+
+    def iteritems(self, reverse: bool = False) -> Iterator[tuple[_KT, _VT]]:
+        return self.__views(OrderedDict.items, reverse)
 
     def peek_first_item(self) -> tuple[_KT, _VT] | None:
-        return self.items()[0] if self.__cache else None
+        return next(self.iteritems(), None)
 
     def peek_last_item(self) -> tuple[_KT, _VT] | None:
-        return self.items()[-1] if self.__cache else None
+        return next(self.iteritems(reverse=True), None)
 
     @overload
     def pop(self, key: _KT) -> _VT | None: ...
@@ -63,10 +337,58 @@ class LRU(Generic[_KT, _VT]):
     def pop(self, key: _KT, default: _VT | _T) -> _VT | _T: ...
 
     def pop(self, key: _KT, default: _VT | _T | None = None) -> _VT | _T:
-        return self.__cache.pop(key, default)
+        if not self.__alive(key):
+            return default  # type: ignore
+        return self.__remove(key)
 
     def popitem(self, least_recent: bool = True) -> tuple[_KT, _VT]:
-        return self.__cache.popitem(last=least_recent)
+        item = self.peek_last_item() if least_recent else self.peek_first_item()
+        if item is None:
+            raise KeyError("popitem(): LRU dict is empty")
+        self.__remove(item[0])
+        return item
+
+    def set(self, key: _KT, value: _VT, ttl: float | None = None, priority: int | None = None) -> None:
+        ttl = _check_ttl(ttl) or self.__ttl
+        self.__set(key, value, monotonic() + ttl if ttl else 0, _check_priority(priority))
+
+    def peek_ttl(self, key: _KT) -> float | None:
+        # unlike peek an expired item is left in place, so iterators stay valid
+        if key not in self.__cache:
+            raise KeyError(key)
+        deadline = self.__expires.get(key)
+        if deadline is None or key in self.__pinned:
+            return None
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            raise KeyError(key)
+        return remaining
+
+    def pin(self, key: _KT) -> None:
+        if not self.__alive(key):
+            raise KeyError(key)
+        index = self.__cache[key]
+        if index == PRIORITIES:
+            return
+        self.__version += 1
+        value = self.__segments[index].pop(key)
+        self.__pinned[key] = index
+        self.__cache[key] = PRIORITIES
+        self.__segments[PRIORITIES][key] = value
+        self.__segments[PRIORITIES].move_to_end(key, last=False)
+        self.__weight -= self.__weights.get(key, 0)
+
+    def unpin(self, key: _KT) -> None:
+        if key not in self.__cache:
+            raise KeyError(key)
+        if key not in self.__pinned:
+            return
+        self.__version += 1
+        index = self.__cache[key] = self.__pinned.pop(key)
+        self.__segments[index][key] = self.__segments[PRIORITIES].pop(key)
+        self.__segments[index].move_to_end(key, last=False)
+        self.__weight += self.__weights.get(key, 0)
+        self.__shrink()
 
     @overload
     def setdefault(self: LRU[_KT, _T | None], key: _KT) -> _T | None: ...
@@ -75,22 +397,63 @@ class LRU(Generic[_KT, _VT]):
     def setdefault(self, key: _KT, default: _VT) -> _VT: ...
 
     def setdefault(self, key: _KT, default: _VT | None = None):
-        if key in self.__cache:
-            return self.__cache[key]
+        if self.__alive(key):
+            self.__hits += 1
+            return self.__touch(key)
+        self.__misses += 1
         self.__setitem__(key, default)  # type: ignore
         return default
 
-    def set_callback(self, callback: Callable[[_KT, _VT], Any]) -> None:
+    def set_callback(self, callback: Callable[..., Any] | None, reason: bool = False, batch: int | None = None) -> None:
+        if batch is not None and batch < 1:
+            raise ValueError("Batch size should be a positive number")
+        # evictions buffered so far still belong to the previous callback
+        self.drain()
         self.__callback = callback
+        self.__callback_reason = reason
+        self.__batch = batch or 0
+
+    def drain(self) -> int:
+        batch, self.__pending = self.__pending, []
+        if batch and self.__callback:
+            self.__callback(batch)
+        return len(batch)
 
     def set_size(self, size: int) -> None:
+        if size < 1:
+            raise ValueError("Size should be a positive number")
         self.__max = size
-        if self.__max < self.__size:
-            for _ in range(self.__size - self.__max):
-                k, v = self.__cache.popitem(last=True)
-                self.__size -= 1
-                if self.__callback:
-                    self.__callback(k, v)
+        while self.__unpinned() > self.__max and (key := self.__victim()) is not _MISSING:
+            self.__evict(key, REASON_CAPACITY)
+
+    def set_max_weight(self, max_weight: int | None) -> None:
+        max_weight = _check_max_weight(max_weight)
+        if max_weight and not self.__max_weight:
+            # weights were not tracked so far, weigh every item now
+            self.__max_weight = max_weight
+            try:
+                weights = {key: self.__weigh(key, value) for key, value in self.iteritems()}
+            except Exception:
+                self.__max_weight = 0
+                raise
+            self.__weights = weights
+            self.__weight = sum(weight for key, weight in weights.items() if key not in self.__pinned)
+        elif not max_weight:
+            self.__weights.clear()
+            self.__weight = 0
+        self.__max_weight = max_weight
+        while self.__max_weight and self.__weight > self.__max_weight and (key := self.__victim()) is not _MISSING:
+            self.__evict(key, REASON_CAPACITY)
+
+    def expire(self) -> int:
+        now = monotonic()
+        expired = [key for key, deadline in self.__expires.items() if deadline <= now and key not in self.__pinned]
+        count = 0
+        for key in expired:
+            if self.__expires.get(key, now + 1) <= now and key not in self.__pinned:
+                self.__evict(key, REASON_EXPIRED)
+                count += 1
+        return count
 
     @overload
     def update(self, m: Iterable[tuple[_KT, _VT]], /, **kwargs: _VT) -> None: ...
@@ -99,35 +462,115 @@ class LRU(Generic[_KT, _VT]):
     def update(self, **kwargs: _VT) -> None: ...
 
     def update(self, *args, **kwargs):
-        self.__cache.update(*args, **kwargs)
+        for key, value in dict(*args, **kwargs).items():
+            self.__setitem__(key, value)
 
     __contains__ = has_key
 
     def __delitem__(self, key: _KT) -> None:
-        self.__cache.pop(key)
+        self.__remove(key)
 
     def __getitem__(self, item: _KT) -> _VT:
-        if item in self.__cache:
-            self.__cache.move_to_end(item, last=False)
-            return self.__cache[item]
+        if self.__alive(item):
+            self.__hits += 1
+            return self.__touch(item)
+        self.__misses += 1
         raise KeyError(item)
 
     def __len__(self) -> int:
         return len(self.__cache)
 
     def __repr__(self) -> str:
-        return repr(self.__cache)
+        return repr(OrderedDict(self.iteritems()))
+
+    def __set(self, key: _KT, value: _VT, expires: float, priority: int | None = None) -> None:
+        weight = self.__weigh(key, value) if self.__max_weight else 0
+        self.__version += 1
+        if expires:
+            self.__expires[key] = expires
+        elif self.__expires:
+            self.__expires.pop(key, None)
+        index = self.__cache.get(key)
+        if index is not None:
+            self.__updates += 1
+            if priority is not None and key in self.__pinned:
+                self.__pinned[key] = priority
+            elif priority is not None and priority != index:
+                del self.__segments[index][key]
+                index = self.__cache[key] = priority
+        else:
+            self.__inserts += 1
+            index = self.__cache[key] = priority or 0
+        segment = self.__segments[index]
+        segment[key] = value
+        segment.move_to_end(key, last=False)
+        if self.__max_weight:
+            if index != PRIORITIES:
+                self.__weight += weight - self.__weights.get(key, 0)
+            self.__weights[key] = weight
+        # the new item itself is evicted if its class is the lowest, but the weight bound keeps one item
+        if self.__max_weight or len(self.__cache) - len(self.__pinned) > self.__max:
+            self.__shrink(keep_one=True)
 
     def __setitem__(self, key: _KT, value: _VT) -> None:
-        if key in self.__cache:
-            self.__cache.move_to_end(key, last=False)
-            self.__cache[key] = value
-            return
-        self.__cache[key] = value
-        self.__cache.move_to_end(key, last=False)
-        self.__size += 1
-        if self.__max < self.__size:
-            _k, _v = self.__cache.popitem(last=True)
-            self.__size -= 1
-            if self.__callback:
-                self.__callback(_k, _v)
+        self.__set(key, value, monotonic() + self.__ttl if self.__ttl else 0)
+
+
+_KWD_MARK = object()
+_FAST_TYPES = {int, str}
+
+
+def make_key(args: tuple, kwargs: dict | None = None, typed: bool = False) -> Hashable:
+    """Cache key for a call with args and kwargs, laid out like `functools._make_key`"""
+    key = args
+    if kwargs:
+        key += (_KWD_MARK,)
+        for item in kwargs.items():
+            key += item
+    if typed:
+        key += tuple(type(v) for v in args)
+        if kwargs:
+            key += tuple(type(v) for v in kwargs.values())
+    elif len(key) == 1 and type(key[0]) in _FAST_TYPES:
+        return key[0]
+    return key
+
+
+class CachedFunction:
+    """func memoized in an LRU of the given size, see `tarina.lru.cached`"""
+
+    __slots__ = ("__dict__", "__weakref__", "cache", "_func", "_typed")
+
+    def __init__(
+        self, func: Callable[..., Any], size: int, typed: bool = False, callback: Callable[..., Any] | None = None
+    ) -> None:
+        if not callable(func):
+            raise TypeError("func must be callable")
+        self.cache: LRU[Hashable, Any] = LRU(size, callback)
+        self._func = func
+        self._typed = typed
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        key = make_key(args, kwargs, self._typed)
+        value = self.cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = self._func(*args, **kwargs)
+            self.cache[key] = value
+        return value
+
+    def __get__(self, instance: Any, owner: Any = None) -> Any:
+        if instance is None:
+            return self
+        return MethodType(self, instance)
+
+    def peek(self, *args: Any, **kwargs: Any) -> Any:
+        return self.cache.peek(make_key(args, kwargs, self._typed))
+
+    def invalidate(self, *args: Any, **kwargs: Any) -> bool:
+        return self.cache.pop(make_key(args, kwargs, self._typed), _MISSING) is not _MISSING
+
+    def cache_clear(self) -> None:
+        self.cache.clear()
+
+    def __reduce__(self) -> str:
+        return self.__qualname__
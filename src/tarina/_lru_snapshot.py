@@ -0,0 +1,195 @@
+"""LRU 快照的读写, 供 C 与纯 Python 两种实现共用
+
+快照格式为 `_MAGIC` 之后的一串帧, 每帧是 8 字节小端长度加上 codec 序列化的内容:
+第一帧是 {"size": 容量}, 之后每帧是一个 (key, value, deadline), 按最久未使用到最近使用排列,
+最后以长度为 0 的帧结束。deadline 是条目过期的墙上时间 (time.time()), 永不过期时为 None;
+写入时跳过已过期的条目, 读取时条目只保留剩余的存活时间。
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+from typing import IO, Any, Callable
+from typing_extensions import Self
+
+_MAGIC = b"TARINA-LRU\x02\n"
+_LENGTH = struct.Struct("<Q")
+
+
+def _write_frame(file: IO[bytes], codec: Any, obj: Any) -> None:
+    data = codec.dumps(obj)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    file.write(_LENGTH.pack(len(data)))
+    file.write(data)
+
+
+def _read_frame(file: IO[bytes], codec: Any) -> Any:
+    header = file.read(_LENGTH.size)
+    if len(header) != _LENGTH.size:
+        raise ValueError("truncated LRU snapshot")
+    (length,) = _LENGTH.unpack(header)
+    if not length:
+        return None
+    data = file.read(length)
+    if len(data) != length:
+        raise ValueError("truncated LRU snapshot")
+    return codec.loads(data)
+
+
+def _live(cache, items):
+    """为未过期的条目附上过期的墙上时间"""
+    now = time.time()
+    for key, value in items:
+        try:
+            ttl = cache.peek_ttl(key)
+        except KeyError:
+            continue
+        yield key, value, None if ttl is None else now + ttl
+
+
+def _dump_stream(cache, file: IO[bytes], codec: Any, hottest: int | None) -> int:
+    if hottest is None:
+        entries = _live(cache, cache.iteritems(reverse=True))
+    else:
+        # the hottest live entries are collected newest first, then written oldest first
+        entries = []
+        if hottest > 0:
+            for entry in _live(cache, cache.iteritems()):
+                entries.append(entry)
+                if len(entries) == hottest:
+                    break
+        entries.reverse()
+    file.write(_MAGIC)
+    _write_frame(file, codec, {"size": cache.get_size()})
+    count = 0
+    for entry in entries:
+        _write_frame(file, codec, entry)
+        count += 1
+    file.write(_LENGTH.pack(0))
+    return count
+
+
+def dump(cache, file, codec: Any = pickle, hottest: int | None = None) -> int:
+    """将缓存按最近使用顺序流式写入 file, 返回写入的条目数
+
+    file 为路径时先写入同目录下的临时文件再替换, 因此读取方不会看到写了一半的快照。
+    """
+    if not isinstance(file, (str, os.PathLike)):
+        return _dump_stream(cache, file, codec, hottest)
+    directory = os.path.dirname(os.path.abspath(file))
+    fd, temp = tempfile.mkstemp(prefix=".lru-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            count = _dump_stream(cache, f, codec, hottest)
+        os.replace(temp, file)
+    except BaseException:
+        os.unlink(temp)
+        raise
+    return count
+
+
+def _load_stream(cls, file: IO[bytes], codec: Any, size: int | None, kwargs: dict) -> Any:
+    if file.read(len(_MAGIC)) != _MAGIC:
+        raise ValueError("not an LRU snapshot")
+    header = _read_frame(file, codec)
+    cache = cls(size or header["size"], **kwargs)
+    while (item := _read_frame(file, codec)) is not None:
+        key, value, deadline = item
+        if deadline is None:
+            cache[key] = value
+        elif (ttl := deadline - time.time()) > 0:
+            cache.set(key, value, ttl=ttl)
+    return cache
+
+
+def load(cls, file, codec: Any = pickle, size: int | None = None, **kwargs) -> Any:
+    """从 file 读取快照并创建新的缓存, 容量默认为快照中保存的容量, 其余参数传给构造函数"""
+    if not isinstance(file, (str, os.PathLike)):
+        return _load_stream(cls, file, codec, size, kwargs)
+    with open(file, "rb") as f:
+        return _load_stream(cls, f, codec, size, kwargs)
+
+
+class PeriodicSnapshot:
+    """在后台线程中定期将缓存写入快照文件
+
+    写入期间缓存被修改时 (会导致迭代抛出 RuntimeError), 本轮快照会被放弃, 旧的快照文件保持不变。
+    需要保证每轮都成功时, 可以传入与修改缓存时相同的锁。
+
+    Args:
+        cache: 需要快照的缓存
+        path: 快照文件路径
+        interval (float): 两次快照之间的间隔 (秒)
+        codec (Any): 提供 dumps 与 loads 的序列化模块, 默认为 pickle
+        hottest (int, optional): 只保存最近使用的 hottest 个条目
+        lock (optional): 写入快照时持有的锁
+        on_error (Callable, optional): 快照失败时以异常为参数调用
+    """
+
+    def __init__(
+        self,
+        cache,
+        path,
+        interval: float,
+        codec: Any = pickle,
+        hottest: int | None = None,
+        lock: Any = None,
+        on_error: Callable[[BaseException], Any] | None = None,
+    ) -> None:
+        if not interval > 0:
+            raise ValueError("Interval should be a positive number")
+        self.cache = cache
+        self.path = path
+        self.interval = interval
+        self.codec = codec
+        self.hottest = hottest
+        self.lock = lock
+        self.on_error = on_error
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def snapshot(self) -> bool:
+        """立即写入一次快照, 返回是否成功"""
+        try:
+            if self.lock is None:
+                dump(self.cache, self.path, self.codec, self.hottest)
+            else:
+                with self.lock:
+                    dump(self.cache, self.path, self.codec, self.hottest)
+        except Exception as e:
+            if self.on_error:
+                self.on_error(e)
+            return False
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.snapshot()
+
+    def start(self) -> PeriodicSnapshot:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="lru-snapshot", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, final: bool = True) -> None:
+        """停止后台线程, final 为真时在停止后再写入一次快照"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        if final:
+            self.snapshot()
+
+    def __enter__(self) -> Self:
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,1425 @@
+#include <Python.h>
+#include <stdint.h>
+
+/*
+ * Eviction policies other than LRU, the C counterpart of _policy_py.py.
+ *
+ * Every cache keeps a dict of key -> Node and a few intrusive queues of nodes, each ordered
+ * from the oldest node at q->first to the newest at q->last, like an OrderedDict used as a
+ * FIFO.  Ghost entries (keys remembered after their value was evicted) are nodes whose value
+ * is NULL linked in a ghost queue, and they stay in the dict so one lookup finds live and
+ * ghost keys alike.
+ *
+ * The algorithms follow _policy_py.py step by step, so both implementations evict the same
+ * keys in the same order.  Evicted items are buffered while an operation runs and handed to
+ * the callback once the queues are consistent again, right before the method returns.
+ */
+
+#define QUEUES 4
+
+/* Kinds of cache, one per policy type */
+#define KIND_S3FIFO 0
+#define KIND_TWOQUEUE 1
+#define KIND_ARC 2
+#define KIND_TINYLFU 3
+
+/* Queues of each kind */
+#define S3_SMALL 0
+#define S3_MAIN 1
+#define S3_GHOST 2
+#define Q2_A1IN 0
+#define Q2_AM 1
+#define Q2_A1OUT 2
+#define ARC_T1 0
+#define ARC_T2 1
+#define ARC_B1 2
+#define ARC_B2 3
+#define LFU_WINDOW 0
+#define LFU_PROBATION 1
+#define LFU_PROTECTED 2
+
+/* Live queues of each kind, from the one whose keys are kept longest to the one evicted first.
+ * Inside a queue the newest node comes first. */
+static const int policy_order[4][QUEUES] = {
+    {S3_MAIN, S3_SMALL, -1, -1},
+    {Q2_AM, Q2_A1IN, -1, -1},
+    {ARC_T2, ARC_T1, -1, -1},
+    {LFU_WINDOW, LFU_PROTECTED, LFU_PROBATION, -1},
+};
+
+/* Rows of the TinyLFU frequency sketch, counters saturate at 15 */
+#define SKETCH_ROWS 4
+static const uint64_t sketch_seeds[SKETCH_ROWS] = {
+    0x9E3779B97F4A7C15ULL, 0xC2B2AE3D27D4EB4FULL, 0x165667B19E3779F9ULL, 0xD6E8FEB86659FD93ULL,
+};
+
+typedef struct _Node {
+    PyObject_HEAD
+    PyObject *key;
+    PyObject *value;  /* NULL for ghost entries */
+    struct _Node *prev;  /* older node of the same queue */
+    struct _Node *next;  /* newer node of the same queue */
+    Py_hash_t hash;  /* hash of key, used by the frequency sketch */
+    int queue;  /* queue holding the node, -1 if it is not linked */
+    int freq;  /* S3FIFO access frequency, 0 to 3 */
+} Node;
+
+static void
+node_dealloc(Node *self)
+{
+    Py_DECREF(self->key);
+    Py_XDECREF(self->value);
+    assert(self->queue == -1);
+    PyObject_Del((PyObject *)self);
+}
+
+static PyTypeObject NodeType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "_policy_c.Node",        /* tp_name */
+    sizeof(Node),            /* tp_basicsize */
+    0,                       /* tp_itemsize */
+    (destructor)node_dealloc,/* tp_dealloc */
+    0,                       /* tp_print */
+    0,                       /* tp_getattr */
+    0,                       /* tp_setattr */
+    0,                       /* tp_compare */
+    0,                       /* tp_repr */
+    0,                       /* tp_as_number */
+    0,                       /* tp_as_sequence */
+    0,                       /* tp_as_mapping */
+    0,                       /* tp_hash */
+    0,                       /* tp_call */
+    0,                       /* tp_str */
+    0,                       /* tp_getattro */
+    0,                       /* tp_setattro */
+    0,                       /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT,      /* tp_flags */
+    "Queue Node",            /* tp_doc */
+};
+
+typedef struct {
+    Node *first;  /* oldest node */
+    Node *last;  /* newest node */
+    Py_ssize_t len;
+} Queue;
+
+typedef struct {
+    PyObject_HEAD
+    PyObject *dict;  /* key -> Node, for live and ghost entries */
+    int kind;
+    Py_ssize_t size;
+    Py_ssize_t length;  /* number of live entries */
+    Queue queues[QUEUES];
+    double ratio;  /* small_ratio, in_ratio or window_ratio */
+    double out_ratio;  /* out_ratio of TwoQueue */
+    Py_ssize_t part_size;  /* capacity of the small queue, A1in or the window */
+    Py_ssize_t ghost_size;  /* capacity of A1out */
+    Py_ssize_t protected_size;  /* capacity of the protected segment */
+    double p;  /* target size of T1 */
+    unsigned char *sketch;  /* SKETCH_ROWS rows of mask + 1 counters */
+    uint64_t mask;
+    int shift;
+    Py_ssize_t additions;
+    Py_ssize_t sample_size;
+    Py_ssize_t hits;
+    Py_ssize_t misses;
+    Py_ssize_t inserts;
+    Py_ssize_t updates;
+    Py_ssize_t evictions;
+    PyObject *callback;
+    int callback_reason;  /* pass the eviction reason as a third argument */
+    PyObject *pending;  /* list of (key, value) evicted by the running operation, NULL if none */
+} Policy;
+
+#define QLEN(self, q) ((self)->queues[q].len)
+#define QFIRST(self, q) ((self)->queues[q].first)
+#define NODE_LIVE(node) ((node) != NULL && (node)->value != NULL)
+
+/* tarina.lru._make_stats, builds an LRUStats from the five counters */
+static PyObject *make_stats;
+
+static PyObject *reason_capacity;
+
+/* See _lru_c.c, critical sections are plain blocks on GIL builds and before 3.13 */
+#ifndef Py_BEGIN_CRITICAL_SECTION
+ #define Py_BEGIN_CRITICAL_SECTION(op) {
+ #define Py_END_CRITICAL_SECTION() }
+#endif
+
+/* Define name##_locked, which calls name inside a critical section on self */
+#define POLICY_LOCKED(type, name, params, call) \
+    static type                                 \
+    name##_locked params                        \
+    {                                           \
+        type result;                            \
+        Py_BEGIN_CRITICAL_SECTION(self);        \
+        result = name call;                     \
+        Py_END_CRITICAL_SECTION();              \
+        return result;                          \
+    }
+
+#define POLICY_LOCKED_NOARGS(name) POLICY_LOCKED(PyObject *, name, (Policy *self), (self))
+#define POLICY_LOCKED_O(name) POLICY_LOCKED(PyObject *, name, (Policy *self, PyObject *arg), (self, arg))
+#define POLICY_LOCKED_VARARGS(name) POLICY_LOCKED(PyObject *, name, (Policy *self, PyObject *args), (self, args))
+#define POLICY_LOCKED_KEYWORDS(name) \
+    POLICY_LOCKED(PyObject *, name, (Policy *self, PyObject *args, PyObject *kwds), (self, args, kwds))
+
+static void
+queue_append(Policy *self, int q, Node *node)
+{
+    Queue *queue = &self->queues[q];
+
+    node->queue = q;
+    node->prev = queue->last;
+    node->next = NULL;
+    if (queue->last)
+        queue->last->next = node;
+    else
+        queue->first = node;
+    queue->last = node;
+    queue->len++;
+}
+
+static void
+queue_remove(Policy *self, Node *node)
+{
+    Queue *queue = &self->queues[node->queue];
+
+    if (node->prev)
+        node->prev->next = node->next;
+    else
+        queue->first = node->next;
+    if (node->next)
+        node->next->prev = node->prev;
+    else
+        queue->last = node->prev;
+    node->prev = node->next = NULL;
+    node->queue = -1;
+    queue->len--;
+}
+
+/* Move node to the newest end of queue q */
+static void
+queue_move(Policy *self, Node *node, int q)
+{
+    queue_remove(self, node);
+    queue_append(self, q, node);
+}
+
+/* Take the value out of a live node that was just unlinked for capacity.  The node becomes a
+ * ghost: the caller either links it in a ghost queue or drops it with policy_forget. */
+static void
+policy_evict(Policy *self, Node *node)
+{
+    PyObject *item;
+
+    item = PyTuple_Pack(2, node->key, node->value);
+    Py_CLEAR(node->value);
+    self->length--;
+    self->evictions++;
+    /* Values are released with the buffered items, so no destructor runs while the queues change */
+    if (item && !self->pending && !(self->pending = PyList_New(0)))
+        Py_CLEAR(item);
+    if (item == NULL || PyList_Append(self->pending, item) < 0)
+        PyErr_WriteUnraisable((PyObject *)self);
+    Py_XDECREF(item);
+}
+
+/* Remove an unlinked node from the dict */
+static void
+policy_forget(Policy *self, Node *node)
+{
+    PyObject *key = node->key;
+
+    Py_INCREF(key);
+    if (PyDict_DelItem(self->dict, key) < 0)
+        PyErr_WriteUnraisable((PyObject *)self);
+    Py_DECREF(key);
+}
+
+/* Unlink a live node and evict it without keeping a ghost */
+static void
+policy_drop(Policy *self, Node *node)
+{
+    queue_remove(self, node);
+    policy_evict(self, node);
+    policy_forget(self, node);
+}
+
+/* Drop the oldest node of a ghost queue */
+static void
+policy_forget_first(Policy *self, int q)
+{
+    Node *node = QFIRST(self, q);
+
+    queue_remove(self, node);
+    policy_forget(self, node);
+}
+
+/* Hand the items evicted by the last operation to the callback */
+static int
+policy_deliver(Policy *self)
+{
+    PyObject *batch = self->pending, *callback = self->callback, *item, *result;
+    Py_ssize_t i;
+    int status = 0;
+
+    if (batch == NULL)
+        return 0;
+    self->pending = NULL;
+    Py_XINCREF(callback);
+    for (i = 0; callback && i < PyList_GET_SIZE(batch); i++) {
+        item = PyList_GET_ITEM(batch, i);
+        if (self->callback_reason)
+            result = PyObject_CallFunctionObjArgs(
+                callback, PyTuple_GET_ITEM(item, 0), PyTuple_GET_ITEM(item, 1), reason_capacity, NULL);
+        else
+            result = PyObject_CallFunctionObjArgs(callback, PyTuple_GET_ITEM(item, 0), PyTuple_GET_ITEM(item, 1), NULL);
+        if (result == NULL) {
+            status = -1;
+            break;
+        }
+        Py_DECREF(result);
+    }
+    Py_XDECREF(callback);
+    Py_DECREF(batch);
+    return status;
+}
+
+/* Frequency sketch of TinyLFU */
+
+static int
+bit_length(uint64_t x)
+{
+    int n = 0;
+
+    while (x) {
+        n++;
+        x >>= 1;
+    }
+    return n;
+}
+
+static int
+sketch_reset(Policy *self)
+{
+    int width_bits = bit_length((uint64_t)(self->size - 1));
+    uint64_t width = (uint64_t)1 << (width_bits > 4 ? width_bits : 4);
+    unsigned char *sketch = PyMem_Calloc(SKETCH_ROWS * width, 1);
+
+    if (sketch == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    PyMem_Free(self->sketch);
+    self->sketch = sketch;
+    self->mask = width - 1;
+    self->shift = 64 - bit_length(width) + 1;
+    self->additions = 0;
+    self->sample_size = 10 * self->size;
+    return 0;
+}
+
+#define SKETCH_INDEX(self, hash, row) \
+    ((row) * ((self)->mask + 1) + ((((uint64_t)(int64_t)(hash) * sketch_seeds[row]) >> (self)->shift) & (self)->mask))
+
+static void
+sketch_increment(Policy *self, Py_hash_t hash)
+{
+    uint64_t i, total;
+    int row;
+
+    for (row = 0; row < SKETCH_ROWS; row++) {
+        i = SKETCH_INDEX(self, hash, row);
+        if (self->sketch[i] < 15)
+            self->sketch[i]++;
+    }
+    if (++self->additions >= self->sample_size) {
+        self->additions /= 2;
+        total = SKETCH_ROWS * (self->mask + 1);
+        for (i = 0; i < total; i++)
+            self->sketch[i] >>= 1;
+    }
+}
+
+static int
+sketch_frequency(Policy *self, Py_hash_t hash)
+{
+    int row, count, result = 15;
+
+    for (row = 0; row < SKETCH_ROWS; row++) {
+        count = self->sketch[SKETCH_INDEX(self, hash, row)];
+        if (count < result)
+            result = count;
+    }
+    return result;
+}
+
+/* S3FIFO */
+
+static void
+s3fifo_evict_small(Policy *self)
+{
+    Node *node = QFIRST(self, S3_SMALL);
+
+    queue_remove(self, node);
+    if (node->freq > 1) {
+        node->freq = 0;
+        queue_append(self, S3_MAIN, node);
+        return;
+    }
+    policy_evict(self, node);
+    queue_append(self, S3_GHOST, node);
+    if (QLEN(self, S3_GHOST) > self->size - self->part_size)
+        policy_forget_first(self, S3_GHOST);
+}
+
+static void
+s3fifo_evict_main(Policy *self)
+{
+    Node *node = QFIRST(self, S3_MAIN);
+
+    queue_remove(self, node);
+    if (node->freq) {
+        node->freq--;
+        queue_append(self, S3_MAIN, node);
+        return;
+    }
+    policy_evict(self, node);
+    policy_forget(self, node);
+}
+
+static void
+s3fifo_shrink(Policy *self)
+{
+    while (self->length > self->size) {
+        if (QLEN(self, S3_SMALL) > self->part_size || !QLEN(self, S3_MAIN))
+            s3fifo_evict_small(self);
+        else
+            s3fifo_evict_main(self);
+    }
+}
+
+/* TwoQueue */
+
+static void
+twoqueue_shrink(Policy *self)
+{
+    Node *victim;
+
+    while (self->length > self->size) {
+        if (QLEN(self, Q2_A1IN) > self->part_size || !QLEN(self, Q2_AM)) {
+            victim = QFIRST(self, Q2_A1IN);
+            queue_remove(self, victim);
+            policy_evict(self, victim);
+            queue_append(self, Q2_A1OUT, victim);
+            if (QLEN(self, Q2_A1OUT) > self->ghost_size)
+                policy_forget_first(self, Q2_A1OUT);
+        } else {
+            policy_drop(self, QFIRST(self, Q2_AM));
+        }
+    }
+}
+
+/* ARC */
+
+static void
+arc_replace(Policy *self, int in_b2)
+{
+    Py_ssize_t t1 = QLEN(self, ARC_T1);
+    Node *victim;
+
+    if (t1 && ((double)t1 > self->p || (in_b2 && (double)t1 == self->p) || !QLEN(self, ARC_T2))) {
+        victim = QFIRST(self, ARC_T1);
+        queue_remove(self, victim);
+        policy_evict(self, victim);
+        queue_append(self, ARC_B1, victim);
+    } else {
+        victim = QFIRST(self, ARC_T2);
+        queue_remove(self, victim);
+        policy_evict(self, victim);
+        queue_append(self, ARC_B2, victim);
+    }
+}
+
+static Py_ssize_t
+arc_total(Policy *self)
+{
+    return QLEN(self, ARC_T1) + QLEN(self, ARC_T2) + QLEN(self, ARC_B1) + QLEN(self, ARC_B2);
+}
+
+/* Hooks, the same as in _policy_py.CachePolicy */
+
+/* An existing live node was read or updated */
+static void
+policy_touch(Policy *self, Node *node)
+{
+    Node *demoted;
+
+    switch (self->kind) {
+    case KIND_S3FIFO:
+        if (node->freq < 3)
+            node->freq++;
+        break;
+    case KIND_TWOQUEUE:
+        if (node->queue == Q2_AM)
+            queue_move(self, node, Q2_AM);
+        break;
+    case KIND_ARC:
+        queue_move(self, node, ARC_T2);
+        break;
+    case KIND_TINYLFU:
+        sketch_increment(self, node->hash);
+        if (node->queue == LFU_PROBATION) {
+            queue_move(self, node, LFU_PROTECTED);
+            if (QLEN(self, LFU_PROTECTED) > self->protected_size) {
+                demoted = QFIRST(self, LFU_PROTECTED);
+                queue_move(self, demoted, LFU_PROBATION);
+            }
+        } else {
+            queue_move(self, node, node->queue);
+        }
+        break;
+    }
+}
+
+/* node just got its value, it is either unlinked or still in a ghost queue */
+static void
+policy_admit(Policy *self, Node *node)
+{
+    Py_ssize_t size = self->size, b1, b2;
+    Node *candidate, *victim;
+    int main;
+    double step;
+
+    switch (self->kind) {
+    case KIND_S3FIFO:
+        node->freq = 0;
+        if (node->queue == S3_GHOST)
+            queue_move(self, node, S3_MAIN);
+        else
+            queue_append(self, S3_SMALL, node);
+        s3fifo_shrink(self);
+        break;
+    case KIND_TWOQUEUE:
+        if (node->queue == Q2_A1OUT)
+            queue_move(self, node, Q2_AM);
+        else
+            queue_append(self, Q2_A1IN, node);
+        twoqueue_shrink(self);
+        break;
+    case KIND_ARC:
+        b1 = QLEN(self, ARC_B1);
+        b2 = QLEN(self, ARC_B2);
+        if (node->queue == ARC_B1 || node->queue == ARC_B2) {
+            if (node->queue == ARC_B1) {
+                step = (double)b2 / b1;
+                self->p = self->p + (step > 1 ? step : 1);
+                if (self->p > size)
+                    self->p = size;
+            } else {
+                step = (double)b1 / b2;
+                self->p = self->p - (step > 1 ? step : 1);
+                if (self->p < 0)
+                    self->p = 0;
+            }
+            main = node->queue == ARC_B2;
+            queue_remove(self, node);
+            if (self->length > size)
+                arc_replace(self, main);
+            queue_append(self, ARC_T2, node);
+            break;
+        }
+        if (self->length > size) {
+            if (QLEN(self, ARC_T1) + b1 >= size) {
+                if (b1) {
+                    policy_forget_first(self, ARC_B1);
+                    arc_replace(self, 0);
+                } else {
+                    policy_drop(self, QFIRST(self, ARC_T1));
+                }
+            } else {
+                if (arc_total(self) >= 2 * size && b2)
+                    policy_forget_first(self, ARC_B2);
+                arc_replace(self, 0);
+            }
+        }
+        queue_append(self, ARC_T1, node);
+        break;
+    case KIND_TINYLFU:
+        sketch_increment(self, node->hash);
+        queue_append(self, LFU_WINDOW, node);
+        if (QLEN(self, LFU_WINDOW) <= self->part_size)
+            break;
+        candidate = QFIRST(self, LFU_WINDOW);
+        queue_remove(self, candidate);
+        if (self->length <= size) {
+            queue_append(self, LFU_PROBATION, candidate);
+            break;
+        }
+        main = QLEN(self, LFU_PROBATION) ? LFU_PROBATION : LFU_PROTECTED;
+        if (!QLEN(self, main)) {
+            policy_evict(self, candidate);
+            policy_forget(self, candidate);
+            break;
+        }
+        victim = QFIRST(self, main);
+        if (sketch_frequency(self, candidate->hash) > sketch_frequency(self, victim->hash)) {
+            queue_remove(self, victim);
+            queue_append(self, LFU_PROBATION, candidate);
+            policy_evict(self, victim);
+            policy_forget(self, victim);
+        } else {
+            policy_evict(self, candidate);
+            policy_forget(self, candidate);
+        }
+        break;
+    }
+}
+
+/* The size changed: recompute the queue capacities and evict what no longer fits */
+static void
+policy_resize(Policy *self)
+{
+    Py_ssize_t size = self->size;
+
+    switch (self->kind) {
+    case KIND_S3FIFO:
+        self->part_size = (Py_ssize_t)(size * self->ratio);
+        if (self->part_size < 1)
+            self->part_size = 1;
+        while (QLEN(self, S3_GHOST) > size - self->part_size)
+            policy_forget_first(self, S3_GHOST);
+        s3fifo_shrink(self);
+        break;
+    case KIND_TWOQUEUE:
+        self->part_size = (Py_ssize_t)(size * self->ratio);
+        if (self->part_size < 1)
+            self->part_size = 1;
+        self->ghost_size = (Py_ssize_t)(size * self->out_ratio);
+        if (self->ghost_size < 1)
+            self->ghost_size = 1;
+        while (QLEN(self, Q2_A1OUT) > self->ghost_size)
+            policy_forget_first(self, Q2_A1OUT);
+        twoqueue_shrink(self);
+        break;
+    case KIND_ARC:
+        if (self->p > size)
+            self->p = size;
+        while (self->length > size)
+            arc_replace(self, 0);
+        while (QLEN(self, ARC_T1) + QLEN(self, ARC_B1) > size && QLEN(self, ARC_B1))
+            policy_forget_first(self, ARC_B1);
+        while (arc_total(self) > 2 * size)
+            policy_forget_first(self, QLEN(self, ARC_B2) ? ARC_B2 : ARC_B1);
+        break;
+    case KIND_TINYLFU:
+        /* the sketch keeps its width, so the frequencies gathered so far survive */
+        self->part_size = (Py_ssize_t)(size * self->ratio);
+        if (self->part_size < 1)
+            self->part_size = 1;
+        self->protected_size = (Py_ssize_t)((size - self->part_size) * 0.8);
+        while (QLEN(self, LFU_WINDOW) > self->part_size)
+            queue_move(self, QFIRST(self, LFU_WINDOW), LFU_PROBATION);
+        while (QLEN(self, LFU_PROTECTED) > self->protected_size)
+            queue_move(self, QFIRST(self, LFU_PROTECTED), LFU_PROBATION);
+        while (self->length > size)
+            policy_drop(self, QFIRST(self, LFU_PROBATION));
+        break;
+    }
+}
+
+/* Forget every entry and reset the metadata, without calling the callback */
+static int
+policy_reset(Policy *self)
+{
+    PyObject *dict = self->dict, *fresh;
+    Node *node;
+    int q;
+
+    fresh = PyDict_New();
+    if (fresh == NULL)
+        return -1;
+    for (q = 0; q < QUEUES; q++) {
+        while ((node = QFIRST(self, q)) != NULL)
+            queue_remove(self, node);
+    }
+    self->dict = fresh;
+    self->length = 0;
+    self->p = 0;
+    policy_resize(self);
+    if (self->kind == KIND_TINYLFU && sketch_reset(self) < 0)
+        return -1;
+    /* Keys and values are released last, their destructors see an empty cache */
+    Py_XDECREF(dict);
+    return 0;
+}
+
+/* Methods */
+
+static Node *
+policy_lookup(Policy *self, PyObject *key)
+{
+    return (Node *)PyDict_GetItemWithError(self->dict, key);
+}
+
+static PyObject *
+policy_get(Policy *self, PyObject *key, PyObject *instead)
+{
+    Node *node = policy_lookup(self, key);
+
+    if (!NODE_LIVE(node)) {
+        if (PyErr_Occurred())
+            return NULL;
+        self->misses++;
+        Py_INCREF(instead);
+        return instead;
+    }
+    self->hits++;
+    policy_touch(self, node);
+    Py_INCREF(node->value);
+    return node->value;
+}
+
+static int
+policy_set(Policy *self, PyObject *key, PyObject *value)
+{
+    Node *node = policy_lookup(self, key);
+    PyObject *old;
+    Py_hash_t hash;
+
+    if (NODE_LIVE(node)) {
+        old = node->value;
+        Py_INCREF(value);
+        node->value = value;
+        self->updates++;
+        policy_touch(self, node);
+        Py_DECREF(old);
+        return policy_deliver(self);
+    }
+    if (PyErr_Occurred())
+        return -1;
+    if (node == NULL) {
+        hash = PyObject_Hash(key);
+        if (hash == -1)
+            return -1;
+        node = PyObject_New(Node, &NodeType);
+        if (node == NULL)
+            return -1;
+        Py_INCREF(key);
+        node->key = key;
+        node->value = NULL;
+        node->prev = node->next = NULL;
+        node->hash = hash;
+        node->queue = -1;
+        node->freq = 0;
+        if (PyDict_SetItem(self->dict, key, (PyObject *)node) < 0) {
+            Py_DECREF(node);
+            return -1;
+        }
+        Py_DECREF(node);
+    }
+    Py_INCREF(value);
+    node->value = value;
+    self->length++;
+    self->inserts++;
+    policy_admit(self, node);
+    return policy_deliver(self);
+}
+
+/* Remove a live node, return its value */
+static PyObject *
+policy_take(Policy *self, Node *node)
+{
+    PyObject *value = node->value;
+
+    node->value = NULL;
+    self->length--;
+    queue_remove(self, node);
+    policy_forget(self, node);
+    return value;
+}
+
+static int
+policy_ass_sub(Policy *self, PyObject *key, PyObject *value)
+{
+    Node *node;
+
+    if (value)
+        return policy_set(self, key, value);
+    node = policy_lookup(self, key);
+    if (!NODE_LIVE(node)) {
+        if (!PyErr_Occurred())
+            PyErr_SetObject(PyExc_KeyError, key);
+        return -1;
+    }
+    Py_DECREF(policy_take(self, node));
+    return 0;
+}
+
+static PyObject *
+policy_subscript(Policy *self, PyObject *key)
+{
+    Node *node = policy_lookup(self, key);
+
+    if (!NODE_LIVE(node)) {
+        if (PyErr_Occurred())
+            return NULL;
+        self->misses++;
+        PyErr_SetObject(PyExc_KeyError, key);
+        return NULL;
+    }
+    self->hits++;
+    policy_touch(self, node);
+    Py_INCREF(node->value);
+    return node->value;
+}
+
+static Py_ssize_t
+policy_length(Policy *self)
+{
+    return self->length;
+}
+
+static int
+policy_contains(Policy *self, PyObject *key)
+{
+    Node *node = policy_lookup(self, key);
+
+    if (NODE_LIVE(node))
+        return 1;
+    return PyErr_Occurred() ? -1 : 0;
+}
+
+POLICY_LOCKED(PyObject *, policy_subscript, (Policy *self, PyObject *key), (self, key))
+POLICY_LOCKED(int, policy_ass_sub, (Policy *self, PyObject *key, PyObject *value), (self, key, value))
+POLICY_LOCKED(Py_ssize_t, policy_length, (Policy *self), (self))
+POLICY_LOCKED(int, policy_contains, (Policy *self, PyObject *key), (self, key))
+
+static PyMappingMethods policy_as_mapping = {
+    (lenfunc)policy_length_locked,          /* mp_length */
+    (binaryfunc)policy_subscript_locked,    /* mp_subscript */
+    (objobjargproc)policy_ass_sub_locked,   /* mp_ass_subscript */
+};
+
+static PySequenceMethods policy_as_sequence = {
+    0,                                      /* sq_length */
+    0,                                      /* sq_concat */
+    0,                                      /* sq_repeat */
+    0,                                      /* sq_item */
+    0,                                      /* sq_slice */
+    0,                                      /* sq_ass_item */
+    0,                                      /* sq_ass_slice */
+    (objobjproc)policy_contains_locked,     /* sq_contains */
+};
+
+/* First live node in retention order, or the last one if reverse is set */
+static Node *
+policy_end(Policy *self, int reverse)
+{
+    const int *order = policy_order[self->kind];
+    int i, count = 0;
+
+    while (count < QUEUES && order[count] != -1)
+        count++;
+    for (i = 0; i < count; i++) {
+        if (reverse && QLEN(self, order[count - 1 - i]))
+            return QFIRST(self, order[count - 1 - i]);
+        if (!reverse && QLEN(self, order[i]))
+            return self->queues[order[i]].last;
+    }
+    return NULL;
+}
+
+static PyObject *
+get_key(Node *node)
+{
+    Py_INCREF(node->key);
+    return node->key;
+}
+
+static PyObject *
+get_value(Node *node)
+{
+    Py_INCREF(node->value);
+    return node->value;
+}
+
+static PyObject *
+get_item(Node *node)
+{
+    return PyTuple_Pack(2, node->key, node->value);
+}
+
+static PyObject *
+collect(Policy *self, PyObject *(*getterfunc)(Node *))
+{
+    const int *order = policy_order[self->kind];
+    PyObject *list, *item;
+    Py_ssize_t i = 0;
+    Node *node;
+    int q;
+
+    list = PyList_New(self->length);
+    if (list == NULL)
+        return NULL;
+    for (q = 0; q < QUEUES && order[q] != -1; q++) {
+        for (node = self->queues[order[q]].last; node; node = node->prev) {
+            item = getterfunc(node);
+            if (item == NULL) {
+                Py_DECREF(list);
+                return NULL;
+            }
+            PyList_SET_ITEM(list, i++, item);
+        }
+    }
+    return list;
+}
+
+static PyObject *
+Policy_get(Policy *self, PyObject *args)
+{
+    PyObject *key, *instead = Py_None;
+
+    if (!PyArg_ParseTuple(args, "O|O:get", &key, &instead))
+        return NULL;
+    return policy_get(self, key, instead);
+}
+
+static PyObject *
+Policy_setdefault(Policy *self, PyObject *args)
+{
+    PyObject *key, *default_obj = Py_None;
+    Node *node;
+
+    if (!PyArg_ParseTuple(args, "O|O:setdefault", &key, &default_obj))
+        return NULL;
+    node = policy_lookup(self, key);
+    if (NODE_LIVE(node))
+        return policy_get(self, key, default_obj);
+    if (PyErr_Occurred())
+        return NULL;
+    self->misses++;
+    if (policy_set(self, key, default_obj) < 0)
+        return NULL;
+    Py_INCREF(default_obj);
+    return default_obj;
+}
+
+static PyObject *
+Policy_pop(Policy *self, PyObject *args)
+{
+    PyObject *key, *default_obj = Py_None;
+    Node *node;
+
+    if (!PyArg_ParseTuple(args, "O|O:pop", &key, &default_obj))
+        return NULL;
+    node = policy_lookup(self, key);
+    if (!NODE_LIVE(node)) {
+        if (PyErr_Occurred())
+            return NULL;
+        Py_INCREF(default_obj);
+        return default_obj;
+    }
+    return policy_take(self, node);
+}
+
+static PyObject *
+Policy_popitem(Policy *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"least_recent", NULL};
+    int least_recent = 1;
+    PyObject *key, *value, *result;
+    Node *node;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|p:popitem", kwlist, &least_recent))
+        return NULL;
+    node = policy_end(self, least_recent);
+    if (node == NULL) {
+        PyErr_SetString(PyExc_KeyError, "popitem(): cache is empty");
+        return NULL;
+    }
+    key = node->key;
+    Py_INCREF(key);
+    value = policy_take(self, node);
+    result = PyTuple_Pack(2, key, value);
+    Py_DECREF(key);
+    Py_DECREF(value);
+    return result;
+}
+
+static PyObject *
+policy_peek(Policy *self, int reverse)
+{
+    Node *node = policy_end(self, reverse);
+
+    if (node == NULL)
+        Py_RETURN_NONE;
+    return get_item(node);
+}
+
+static PyObject *
+Policy_peek_first_item(Policy *self)
+{
+    return policy_peek(self, 0);
+}
+
+static PyObject *
+Policy_peek_last_item(Policy *self)
+{
+    return policy_peek(self, 1);
+}
+
+static PyObject *
+Policy_has_key(Policy *self, PyObject *key)
+{
+    switch (policy_contains(self, key)) {
+    case 1:
+        Py_RETURN_TRUE;
+    case 0:
+        Py_RETURN_FALSE;
+    default:
+        return NULL;
+    }
+}
+
+static PyObject *
+Policy_keys(Policy *self)
+{
+    return collect(self, get_key);
+}
+
+static PyObject *
+Policy_values(Policy *self)
+{
+    return collect(self, get_value);
+}
+
+static PyObject *
+Policy_items(Policy *self)
+{
+    return collect(self, get_item);
+}
+
+static PyObject *
+Policy_update(Policy *self, PyObject *args, PyObject *kwds)
+{
+    PyObject *items, *key, *value;
+    Py_ssize_t pos = 0;
+
+    items = PyObject_Call((PyObject *)&PyDict_Type, args, kwds);
+    if (items == NULL)
+        return NULL;
+    while (PyDict_Next(items, &pos, &key, &value)) {
+        if (policy_set(self, key, value) < 0) {
+            Py_DECREF(items);
+            return NULL;
+        }
+    }
+    Py_DECREF(items);
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+Policy_clear(Policy *self)
+{
+    if (policy_reset(self) < 0)
+        return NULL;
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+Policy_get_size(Policy *self)
+{
+    return PyLong_FromSsize_t(self->size);
+}
+
+static PyObject *
+Policy_set_size(Policy *self, PyObject *args)
+{
+    Py_ssize_t size;
+
+    if (!PyArg_ParseTuple(args, "n:set_size", &size))
+        return NULL;
+    if (size <= 0) {
+        PyErr_SetString(PyExc_ValueError, "Size should be a positive number");
+        return NULL;
+    }
+    self->size = size;
+    policy_resize(self);
+    if (policy_deliver(self) < 0)
+        return NULL;
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+Policy_set_callback(Policy *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"callback", "reason", NULL};
+    PyObject *callback;
+    int reason = 0;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|p:set_callback", kwlist, &callback, &reason))
+        return NULL;
+    if (callback != Py_None && !PyCallable_Check(callback)) {
+        PyErr_SetString(PyExc_TypeError, "parameter must be callable");
+        return NULL;
+    }
+    if (callback == Py_None) {
+        Py_CLEAR(self->callback);
+    } else {
+        Py_INCREF(callback);
+        Py_XSETREF(self->callback, callback);
+    }
+    self->callback_reason = reason;
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+Policy_get_stats(Policy *self)
+{
+    return PyObject_CallFunction(make_stats, "((nnnnn))",
+                                 self->hits, self->misses, self->inserts, self->updates, self->evictions);
+}
+
+static PyObject *
+Policy_reset_stats(Policy *self)
+{
+    self->hits = self->misses = 0;
+    self->inserts = self->updates = self->evictions = 0;
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+policy_repr(Policy *self)
+{
+    PyObject *items, *dict, *name, *result = NULL;
+
+    items = collect(self, get_item);
+    if (items == NULL)
+        return NULL;
+    dict = PyObject_CallFunctionObjArgs((PyObject *)&PyDict_Type, items, NULL);
+    Py_DECREF(items);
+    if (dict == NULL)
+        return NULL;
+    name = PyObject_GetAttrString((PyObject *)Py_TYPE(self), "__name__");
+    if (name != NULL)
+        result = PyUnicode_FromFormat("%U(%R)", name, dict);
+    Py_XDECREF(name);
+    Py_DECREF(dict);
+    return result;
+}
+
+POLICY_LOCKED_VARARGS(Policy_get)
+POLICY_LOCKED_VARARGS(Policy_setdefault)
+POLICY_LOCKED_VARARGS(Policy_pop)
+POLICY_LOCKED_KEYWORDS(Policy_popitem)
+POLICY_LOCKED_NOARGS(Policy_peek_first_item)
+POLICY_LOCKED_NOARGS(Policy_peek_last_item)
+POLICY_LOCKED_O(Policy_has_key)
+POLICY_LOCKED_NOARGS(Policy_keys)
+POLICY_LOCKED_NOARGS(Policy_values)
+POLICY_LOCKED_NOARGS(Policy_items)
+POLICY_LOCKED_KEYWORDS(Policy_update)
+POLICY_LOCKED_NOARGS(Policy_clear)
+POLICY_LOCKED_NOARGS(Policy_get_size)
+POLICY_LOCKED_VARARGS(Policy_set_size)
+POLICY_LOCKED_KEYWORDS(Policy_set_callback)
+POLICY_LOCKED_NOARGS(Policy_get_stats)
+POLICY_LOCKED_NOARGS(Policy_reset_stats)
+POLICY_LOCKED(PyObject *, policy_repr, (Policy *self), (self))
+
+static PyMethodDef Policy_methods[] = {
+    {"get", (PyCFunction)Policy_get_locked, METH_VARARGS,
+                    PyDoc_STR("C.get(key, instead=None) -> value for key, or instead if it is not cached")},
+    {"setdefault", (PyCFunction)Policy_setdefault_locked, METH_VARARGS,
+                    PyDoc_STR("C.setdefault(key, default=None) -> C.get(key, default), also set C[key]=default if key is not cached")},
+    {"pop", (PyCFunction)Policy_pop_locked, METH_VARARGS,
+                    PyDoc_STR("C.pop(key, default=None) -> remove key and return its value, or default if it is not cached")},
+    {"popitem", (PyCFunction)Policy_popitem_locked, METH_VARARGS | METH_KEYWORDS,
+                    PyDoc_STR("C.popitem(least_recent=True) -> remove and return the (key, value) evicted last or first")},
+    {"peek_first_item", (PyCFunction)Policy_peek_first_item_locked, METH_NOARGS,
+                    PyDoc_STR("C.peek_first_item() -> (key, value) kept the longest, None if empty")},
+    {"peek_last_item", (PyCFunction)Policy_peek_last_item_locked, METH_NOARGS,
+                    PyDoc_STR("C.peek_last_item() -> (key, value) evicted first, None if empty")},
+    {"has_key", (PyCFunction)Policy_has_key_locked, METH_O,
+                    PyDoc_STR("C.has_key(key) -> True if C has the key, else False")},
+    {"keys", (PyCFunction)Policy_keys_locked, METH_NOARGS,
+                    PyDoc_STR("C.keys() -> list of keys, from the one kept the longest to the one evicted first")},
+    {"values", (PyCFunction)Policy_values_locked, METH_NOARGS,
+                    PyDoc_STR("C.values() -> list of values, in the order of keys()")},
+    {"items", (PyCFunction)Policy_items_locked, METH_NOARGS,
+                    PyDoc_STR("C.items() -> list of (key, value), in the order of keys()")},
+    {"update", (PyCFunction)Policy_update_locked, METH_VARARGS | METH_KEYWORDS,
+                    PyDoc_STR("C.update(E, **F) -> update C from dict/iterable E and F")},
+    {"clear", (PyCFunction)Policy_clear_locked, METH_NOARGS,
+                    PyDoc_STR("C.clear() -> remove all entries and forget the ghost keys, without calling the callback")},
+    {"get_size", (PyCFunction)Policy_get_size_locked, METH_NOARGS,
+                    PyDoc_STR("C.get_size() -> get size of the cache")},
+    {"set_size", (PyCFunction)Policy_set_size_locked, METH_VARARGS,
+                    PyDoc_STR("C.set_size(size) -> set size of the cache, evicting what no longer fits")},
+    {"set_callback", (PyCFunction)Policy_set_callback_locked, METH_VARARGS | METH_KEYWORDS,
+                    PyDoc_STR("C.set_callback(callback, reason=False) -> set a callback to call when an item is evicted")},
+    {"get_stats", (PyCFunction)Policy_get_stats_locked, METH_NOARGS,
+                    PyDoc_STR("C.get_stats() -> LRUStats(hits, misses, inserts, updates, evictions)")},
+    {"reset_stats", (PyCFunction)Policy_reset_stats_locked, METH_NOARGS,
+                    PyDoc_STR("C.reset_stats() -> reset all counters to zero")},
+    {NULL, NULL},
+};
+
+static int
+policy_init(Policy *self, int kind, Py_ssize_t size, PyObject *callback, double ratio, double out_ratio)
+{
+    if (self->dict != NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "cache is already initialized");
+        return -1;
+    }
+    if (size <= 0) {
+        PyErr_SetString(PyExc_ValueError, "Size should be a positive number");
+        return -1;
+    }
+    if (callback == Py_None)
+        callback = NULL;
+    if (callback && !PyCallable_Check(callback)) {
+        PyErr_SetString(PyExc_TypeError, "parameter must be callable");
+        return -1;
+    }
+    Py_XINCREF(callback);
+    self->callback = callback;
+    self->kind = kind;
+    self->size = size;
+    self->ratio = ratio;
+    self->out_ratio = out_ratio;
+    return policy_reset(self);
+}
+
+static int
+S3FIFO_init(Policy *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"size", "callback", "small_ratio", NULL};
+    PyObject *callback = NULL;
+    Py_ssize_t size;
+    double small_ratio = 0.1;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "n|Od:S3FIFO", kwlist, &size, &callback, &small_ratio))
+        return -1;
+    if (!(small_ratio > 0 && small_ratio < 1)) {
+        PyErr_SetString(PyExc_ValueError, "small_ratio should be between 0 and 1");
+        return -1;
+    }
+    return policy_init(self, KIND_S3FIFO, size, callback, small_ratio, 0);
+}
+
+static int
+TwoQueue_init(Policy *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"size", "callback", "in_ratio", "out_ratio", NULL};
+    PyObject *callback = NULL;
+    Py_ssize_t size;
+    double in_ratio = 0.25, out_ratio = 0.5;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "n|Odd:TwoQueue", kwlist, &size, &callback, &in_ratio, &out_ratio))
+        return -1;
+    if (!(in_ratio > 0 && in_ratio < 1)) {
+        PyErr_SetString(PyExc_ValueError, "in_ratio should be between 0 and 1");
+        return -1;
+    }
+    if (!(out_ratio > 0)) {
+        PyErr_SetString(PyExc_ValueError, "out_ratio should be a positive number");
+        return -1;
+    }
+    return policy_init(self, KIND_TWOQUEUE, size, callback, in_ratio, out_ratio);
+}
+
+static int
+ARC_init(Policy *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"size", "callback", NULL};
+    PyObject *callback = NULL;
+    Py_ssize_t size;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "n|O:ARC", kwlist, &size, &callback))
+        return -1;
+    return policy_init(self, KIND_ARC, size, callback, 0, 0);
+}
+
+static int
+TinyLFU_init(Policy *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"size", "callback", "window_ratio", NULL};
+    PyObject *callback = NULL;
+    Py_ssize_t size;
+    double window_ratio = 0.01;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "n|Od:TinyLFU", kwlist, &size, &callback, &window_ratio))
+        return -1;
+    if (!(window_ratio > 0 && window_ratio < 1)) {
+        PyErr_SetString(PyExc_ValueError, "window_ratio should be between 0 and 1");
+        return -1;
+    }
+    return policy_init(self, KIND_TINYLFU, size, callback, window_ratio, 0);
+}
+
+static int
+CachePolicy_init(Policy *self, PyObject *args, PyObject *kwds)
+{
+    PyErr_SetString(PyExc_TypeError, "CachePolicy is abstract, use one of its subclasses");
+    return -1;
+}
+
+static void
+Policy_dealloc(Policy *self)
+{
+    int q;
+
+    if (self->dict) {
+        for (q = 0; q < QUEUES; q++) {
+            while (QFIRST(self, q))
+                queue_remove(self, QFIRST(self, q));
+        }
+        Py_CLEAR(self->dict);
+    }
+    Py_XDECREF(self->callback);
+    Py_XDECREF(self->pending);
+    PyMem_Free(self->sketch);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+PyDoc_STRVAR(policy_doc,
+"Base of the caches with an eviction policy other than LRU.\n"
+"They share the mapping API of LRU: get, setdefault, pop, popitem, peek_first_item,\n"
+"peek_last_item, keys, values, items, set_size, set_callback and get_stats.\n");
+
+PyDoc_STRVAR(s3fifo_doc,
+"S3FIFO(size, callback=None, small_ratio=0.1) -> cache evicting with S3-FIFO\n"
+"New keys enter a small FIFO queue and are promoted to the main FIFO queue only if\n"
+"they are read again before leaving it; evicted keys are remembered in a ghost queue.\n");
+
+PyDoc_STRVAR(twoqueue_doc,
+"TwoQueue(size, callback=None, in_ratio=0.25, out_ratio=0.5) -> cache evicting with 2Q\n"
+"New keys enter the A1in FIFO queue, keys set again after leaving it go to the Am LRU\n"
+"queue, so a one-off scan does not flush the hot keys.\n");
+
+PyDoc_STRVAR(arc_doc,
+"ARC(size, callback=None) -> adaptive replacement cache\n"
+"Balances recency and frequency by adapting the target size of T1 on ghost hits.\n");
+
+PyDoc_STRVAR(tinylfu_doc,
+"TinyLFU(size, callback=None, window_ratio=0.01) -> cache evicting with W-TinyLFU\n"
+"A small LRU window in front of a segmented LRU, with admission gated by the access\n"
+"frequencies estimated by a count-min sketch.\n");
+
+static PyTypeObject PolicyType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "_policy_c.CachePolicy", /* tp_name */
+    sizeof(Policy),          /* tp_basicsize */
+    0,                       /* tp_itemsize */
+    (destructor)Policy_dealloc, /* tp_dealloc */
+    0,                       /* tp_print */
+    0,                       /* tp_getattr */
+    0,                       /* tp_setattr */
+    0,                       /* tp_compare */
+    (reprfunc)policy_repr_locked, /* tp_repr */
+    0,                       /* tp_as_number */
+    &policy_as_sequence,     /* tp_as_sequence */
+    &policy_as_mapping,      /* tp_as_mapping */
+    0,                       /* tp_hash */
+    0,                       /* tp_call */
+    0,                       /* tp_str */
+    0,                       /* tp_getattro */
+    0,                       /* tp_setattro */
+    0,                       /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE, /* tp_flags */
+    policy_doc,              /* tp_doc */
+    0,                       /* tp_traverse */
+    0,                       /* tp_clear */
+    0,                       /* tp_richcompare */
+    0,                       /* tp_weaklistoffset */
+    0,                       /* tp_iter */
+    0,                       /* tp_iternext */
+    Policy_methods,          /* tp_methods */
+    0,                       /* tp_members */
+    0,                       /* tp_getset */
+    0,                       /* tp_base */
+    0,                       /* tp_dict */
+    0,                       /* tp_descr_get */
+    0,                       /* tp_descr_set */
+    0,                       /* tp_dictoffset */
+    (initproc)CachePolicy_init, /* tp_init */
+    0,                       /* tp_alloc */
+    0,                       /* tp_new */
+};
+
+/* The policies only differ in tp_init, everything else is inherited from PolicyType */
+#define POLICY_SUBTYPE(var, name, init, doc)                    \
+    static PyTypeObject var = {                                 \
+        PyVarObject_HEAD_INIT(NULL, 0)                          \
+        .tp_name = "_policy_c." name,                           \
+        .tp_basicsize = sizeof(Policy),                         \
+        .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE,   \
+        .tp_doc = doc,                                          \
+        .tp_base = &PolicyType,                                 \
+        .tp_init = (initproc)init,                              \
+    };
+
+POLICY_SUBTYPE(S3FIFOType, "S3FIFO", S3FIFO_init, s3fifo_doc)
+POLICY_SUBTYPE(TwoQueueType, "TwoQueue", TwoQueue_init, twoqueue_doc)
+POLICY_SUBTYPE(ARCType, "ARC", ARC_init, arc_doc)
+POLICY_SUBTYPE(TinyLFUType, "TinyLFU", TinyLFU_init, tinylfu_doc)
+
+static struct PyModuleDef moduledef = {
+    PyModuleDef_HEAD_INIT,
+    "_policy_c",      /* m_name */
+    "Eviction policies other than LRU, see tarina.policy", /* m_doc */
+    -1,               /* m_size */
+    NULL,             /* m_methods */
+};
+
+PyMODINIT_FUNC
+PyInit__policy_c(void)
+{
+    PyTypeObject *types[] = {&S3FIFOType, &TwoQueueType, &ARCType, &TinyLFUType};
+    PyObject *m, *lru;
+    size_t i;
+
+    if (PyType_Ready(&NodeType) < 0)
+        return NULL;
+    PolicyType.tp_new = PyType_GenericNew;
+    if (PyType_Ready(&PolicyType) < 0)
+        return NULL;
+    for (i = 0; i < sizeof(types) / sizeof(types[0]); i++) {
+        if (PyType_Ready(types[i]) < 0)
+            return NULL;
+    }
+
+    lru = PyImport_ImportModule("tarina.lru");
+    if (lru == NULL)
+        return NULL;
+    make_stats = PyObject_GetAttrString(lru, "_make_stats");
+    Py_DECREF(lru);
+    if (make_stats == NULL)
+        return NULL;
+    reason_capacity = PyUnicode_InternFromString("capacity");
+    if (reason_capacity == NULL)
+        return NULL;
+
+    m = PyModule_Create(&moduledef);
+    if (m == NULL)
+        return NULL;
+
+#ifdef Py_GIL_DISABLED
+    /* Every method locks its own object, so importing the module must not re-enable the GIL */
+    if (PyUnstable_Module_SetGIL(m, Py_MOD_GIL_NOT_USED) < 0) {
+        Py_DECREF(m);
+        return NULL;
+    }
+#endif
+
+    Py_INCREF(&PolicyType);
+    PyModule_AddObject(m, "CachePolicy", (PyObject *)&PolicyType);
+    for (i = 0; i < sizeof(types) / sizeof(types[0]); i++) {
+        Py_INCREF(types[i]);
+        PyModule_AddObject(m, types[i]->tp_name + sizeof("_policy_c.") - 1, (PyObject *)types[i]);
+    }
+    return m;
+}
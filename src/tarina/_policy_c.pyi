@@ -0,0 +1,63 @@
+from collections.abc import Hashable
+from typing import Any, Callable, Generic, TypeVar, overload
+
+from .lru import LRUStats
+
+_KT = TypeVar("_KT", bound=Hashable)
+_VT = TypeVar("_VT")
+_T = TypeVar("_T")
+
+class CachePolicy(Generic[_KT, _VT]):
+    def clear(self) -> None: ...
+    @overload
+    def get(self, key: _KT) -> _VT | None: ...
+    @overload
+    def get(self, key: _KT, instead: _VT | _T) -> _VT | _T: ...
+    def get_size(self) -> int: ...
+    def get_stats(self) -> LRUStats: ...
+    def reset_stats(self) -> None: ...
+    def has_key(self, key: _KT) -> bool: ...
+    def keys(self) -> list[_KT]: ...
+    def values(self) -> list[_VT]: ...
+    def items(self) -> list[tuple[_KT, _VT]]: ...
+    def peek_first_item(self) -> tuple[_KT, _VT] | None: ...
+    def peek_last_item(self) -> tuple[_KT, _VT] | None: ...
+    @overload
+    def pop(self, key: _KT) -> _VT | None: ...
+    @overload
+    def pop(self, key: _KT, default: _VT | _T) -> _VT | _T: ...
+    def popitem(self, least_recent: bool = True) -> tuple[_KT, _VT]: ...
+    @overload
+    def setdefault(self: CachePolicy[_KT, _T | None], key: _KT) -> _T | None: ...
+    @overload
+    def setdefault(self, key: _KT, default: _VT) -> _VT: ...
+    def set_callback(self, callback: Callable[..., Any] | None, reason: bool = False) -> None: ...
+    def set_size(self, size: int) -> None: ...
+    def update(self, *args, **kwargs) -> None: ...
+    def __contains__(self, key: _KT) -> bool: ...
+    def __delitem__(self, key: _KT) -> None: ...
+    def __getitem__(self, key: _KT) -> _VT: ...
+    def __len__(self) -> int: ...
+    def __setitem__(self, key: _KT, value: _VT) -> None: ...
+
+class S3FIFO(CachePolicy[_KT, _VT]):
+    def __init__(
+        self, size: int, callback: Callable[[_KT, _VT], Any] | None = None, small_ratio: float = 0.1
+    ) -> None: ...
+
+class TwoQueue(CachePolicy[_KT, _VT]):
+    def __init__(
+        self,
+        size: int,
+        callback: Callable[[_KT, _VT], Any] | None = None,
+        in_ratio: float = 0.25,
+        out_ratio: float = 0.5,
+    ) -> None: ...
+
+class ARC(CachePolicy[_KT, _VT]):
+    def __init__(self, size: int, callback: Callable[[_KT, _VT], Any] | None = None) -> None: ...
+
+class TinyLFU(CachePolicy[_KT, _VT]):
+    def __init__(
+        self, size: int, callback: Callable[[_KT, _VT], Any] | None = None, window_ratio: float = 0.01
+    ) -> None: ...
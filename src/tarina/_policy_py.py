@@ -0,0 +1,600 @@
+"""除 LRU 以外的缓存淘汰策略的纯 Python 实现, 参见 `tarina.policy`"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable, Iterator
+from typing import Any, Callable, Generic, TypeVar, overload
+
+from .lru import LRUStats, _make_stats
+
+__all__ = ("ARC", "S3FIFO", "CachePolicy", "TinyLFU", "TwoQueue")
+
+_KT = TypeVar("_KT", bound=Hashable)
+_VT = TypeVar("_VT")
+_T = TypeVar("_T")
+
+_MISSING: Any = object()
+
+
+class CachePolicy(Generic[_KT, _VT]):
+    """淘汰策略缓存的基类
+
+    值统一存放在 `_data` 中, 子类只维护各自的元数据, 并实现以下钩子:
+
+    - `_touch(key)`: 已有的键被访问或更新
+    - `_admit(key)`: 新键已写入 `_data`, 需要时调用 `_evict` 腾出空间
+    - `_discard(key)`: 键被显式删除
+    - `_order(reverse)`: 从最应保留到最先被淘汰的键的顺序, reverse 为真时逆序, 需要惰性产出
+    - `_resize()`: 容量已改变, 重新计算各队列的容量并经 `_evict` 淘汰多出的键
+    - `_reset()`: 清空所有元数据
+    """
+
+    __slots__ = (
+        "_size",
+        "_data",
+        "_callback",
+        "_callback_reason",
+        "_hits",
+        "_misses",
+        "_inserts",
+        "_updates",
+        "_evictions",
+    )
+
+    def __init__(self, size: int, callback: Callable[[_KT, _VT], Any] | None = None) -> None:
+        if size < 1:
+            raise ValueError("Size should be a positive number")
+        self._size = size
+        self._data: dict[_KT, _VT] = {}
+        self._callback = callback
+        self._callback_reason = False
+        self._hits = self._misses = 0
+        self._inserts = self._updates = self._evictions = 0
+        self._reset()
+
+    def _touch(self, key: _KT) -> None:
+        raise NotImplementedError
+
+    def _admit(self, key: _KT) -> None:
+        raise NotImplementedError
+
+    def _discard(self, key: _KT) -> None:
+        raise NotImplementedError
+
+    def _order(self, reverse: bool = False) -> Iterable[_KT]:
+        raise NotImplementedError
+
+    def _resize(self) -> None:
+        raise NotImplementedError
+
+    def _reset(self) -> None:
+        raise NotImplementedError
+
+    def _evict(self, key: _KT) -> None:
+        value = self._data.pop(key)
+        self._evictions += 1
+        if self._callback:
+            if self._callback_reason:
+                self._callback(key, value, "capacity")  # type: ignore
+            else:
+                self._callback(key, value)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._reset()
+
+    @overload
+    def get(self, key: _KT) -> _VT | None: ...
+
+    @overload
+    def get(self, key: _KT, instead: _VT | _T) -> _VT | _T: ...
+
+    def get(self, key: _KT, instead: _VT | _T | None = None) -> _VT | _T | None:
+        value = self._data.get(key, _MISSING)
+        if value is _MISSING:
+            self._misses += 1
+            return instead
+        self._hits += 1
+        self._touch(key)
+        return value
+
+    def get_size(self) -> int:
+        return self._size
+
+    def get_stats(self) -> LRUStats:
+        return _make_stats((self._hits, self._misses, self._inserts, self._updates, self._evictions))
+
+    def reset_stats(self) -> None:
+        self._hits = self._misses = 0
+        self._inserts = self._updates = self._evictions = 0
+
+    def has_key(self, key: _KT) -> bool:
+        return key in self._data
+
+    def keys(self) -> list[_KT]:
+        return list(self._order())
+
+    def values(self) -> list[_VT]:
+        return [self._data[key] for key in self._order()]
+
+    def items(self) -> list[tuple[_KT, _VT]]:
+        return [(key, self._data[key]) for key in self._order()]
+
+    def peek_first_item(self) -> tuple[_KT, _VT] | None:
+        for key in self._order():
+            return key, self._data[key]
+        return None
+
+    def peek_last_item(self) -> tuple[_KT, _VT] | None:
+        for key in self._order(True):
+            return key, self._data[key]
+        return None
+
+    @overload
+    def pop(self, key: _KT) -> _VT | None: ...
+
+    @overload
+    def pop(self, key: _KT, default: _VT | _T) -> _VT | _T: ...
+
+    def pop(self, key: _KT, default: _VT | _T | None = None) -> _VT | _T | None:
+        if key not in self._data:
+            return default
+        self._discard(key)
+        return self._data.pop(key)
+
+    def popitem(self, least_recent: bool = True) -> tuple[_KT, _VT]:
+        if not self._data:
+            raise KeyError("popitem(): cache is empty")
+        key, value = self.peek_last_item() if least_recent else self.peek_first_item()  # type: ignore
+        self._discard(key)
+        del self._data[key]
+        return key, value
+
+    @overload
+    def setdefault(self: CachePolicy[_KT, _T | None], key: _KT) -> _T | None: ...
+
+    @overload
+    def setdefault(self, key: _KT, default: _VT) -> _VT: ...
+
+    def setdefault(self, key: _KT, default: _VT | None = None):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            self[key] = default  # type: ignore
+            return default
+        return value
+
+    def set_callback(self, callback: Callable[..., Any] | None, reason: bool = False) -> None:
+        self._callback = callback
+        self._callback_reason = reason
+
+    def set_size(self, size: int) -> None:
+        if size < 1:
+            raise ValueError("Size should be a positive number")
+        self._size = size
+        self._resize()
+
+    def update(self, *args, **kwargs) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    __contains__ = has_key
+
+    def __delitem__(self, key: _KT) -> None:
+        if key not in self._data:
+            raise KeyError(key)
+        self._discard(key)
+        del self._data[key]
+
+    def __getitem__(self, key: _KT) -> _VT:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({dict(self.items())!r})"
+
+    def __setitem__(self, key: _KT, value: _VT) -> None:
+        if key in self._data:
+            self._data[key] = value
+            self._updates += 1
+            self._touch(key)
+        else:
+            self._data[key] = value
+            self._inserts += 1
+            self._admit(key)
+
+
+class S3FIFO(CachePolicy[_KT, _VT]):
+    """S3-FIFO 淘汰策略
+
+    新键进入容量约为 10% 的小 FIFO 队列, 在离开小队列前被再次访问过的键晋升到主 FIFO 队列,
+    否则被淘汰并记入幽灵队列; 幽灵队列中的键再次写入时直接进入主队列。
+    主队列按 FIFO 淘汰, 但访问频率不为零的键会被降低频率后重新放回队尾。
+
+    Args:
+        size (int): 缓存容量
+        callback (Callable, optional): 淘汰回调
+        small_ratio (float): 小队列占总容量的比例
+    """
+
+    __slots__ = ("_small_ratio", "_small_size", "_small", "_main", "_ghost", "_freq")
+
+    def __init__(self, size: int, callback: Callable[[_KT, _VT], Any] | None = None, small_ratio: float = 0.1) -> None:
+        if not 0 < small_ratio < 1:
+            raise ValueError("small_ratio should be between 0 and 1")
+        self._small_ratio = small_ratio
+        super().__init__(size, callback)
+
+    def _reset(self) -> None:
+        self._small_size = max(1, int(self._size * self._small_ratio))
+        self._small: OrderedDict[_KT, None] = OrderedDict()
+        self._main: OrderedDict[_KT, None] = OrderedDict()
+        self._ghost: OrderedDict[_KT, None] = OrderedDict()
+        self._freq: dict[_KT, int] = {}
+
+    def _touch(self, key: _KT) -> None:
+        if self._freq[key] < 3:
+            self._freq[key] += 1
+
+    def _admit(self, key: _KT) -> None:
+        self._freq[key] = 0
+        if key in self._ghost:
+            del self._ghost[key]
+            self._main[key] = None
+        else:
+            self._small[key] = None
+        self._shrink()
+
+    def _shrink(self) -> None:
+        while len(self._data) > self._size:
+            if len(self._small) > self._small_size or not self._main:
+                self._evict_small()
+            else:
+                self._evict_main()
+
+    def _resize(self) -> None:
+        self._small_size = max(1, int(self._size * self._small_ratio))
+        while len(self._ghost) > self._size - self._small_size:
+            self._ghost.popitem(last=False)
+        self._shrink()
+
+    def _evict_small(self) -> None:
+        key, _ = self._small.popitem(last=False)
+        if self._freq[key] > 1:
+            self._freq[key] = 0
+            self._main[key] = None
+            return
+        del self._freq[key]
+        self._ghost[key] = None
+        if len(self._ghost) > self._size - self._small_size:
+            self._ghost.popitem(last=False)
+        self._evict(key)
+
+    def _evict_main(self) -> None:
+        key, _ = self._main.popitem(last=False)
+        if self._freq[key]:
+            self._freq[key] -= 1
+            self._main[key] = None
+            return
+        del self._freq[key]
+        self._evict(key)
+
+    def _discard(self, key: _KT) -> None:
+        del self._freq[key]
+        if self._small.pop(key, _MISSING) is _MISSING:
+            del self._main[key]
+
+    def _order(self, reverse: bool = False) -> Iterable[_KT]:
+        if reverse:
+            yield from self._small
+            yield from self._main
+        else:
+            yield from reversed(self._main)
+            yield from reversed(self._small)
+
+
+class TwoQueue(CachePolicy[_KT, _VT]):
+    """2Q 淘汰策略
+
+    新键进入容量约为 25% 的 A1in FIFO 队列, 离开时只在 A1out 幽灵队列中保留键。
+    A1out 中的键再次写入时进入 Am LRU 队列, 因此一次性的扫描不会挤出 Am 中的热点数据。
+
+    Args:
+        size (int): 缓存容量
+        callback (Callable, optional): 淘汰回调
+        in_ratio (float): A1in 占总容量的比例
+        out_ratio (float): A1out 可记住的键数相对总容量的比例
+    """
+
+    __slots__ = ("_in_ratio", "_out_ratio", "_in_size", "_out_size", "_a1in", "_a1out", "_am")
+
+    def __init__(
+        self,
+        size: int,
+        callback: Callable[[_KT, _VT], Any] | None = None,
+        in_ratio: float = 0.25,
+        out_ratio: float = 0.5,
+    ) -> None:
+        if not 0 < in_ratio < 1:
+            raise ValueError("in_ratio should be between 0 and 1")
+        if out_ratio <= 0:
+            raise ValueError("out_ratio should be a positive number")
+        self._in_ratio = in_ratio
+        self._out_ratio = out_ratio
+        super().__init__(size, callback)
+
+    def _reset(self) -> None:
+        self._in_size = max(1, int(self._size * self._in_ratio))
+        self._out_size = max(1, int(self._size * self._out_ratio))
+        self._a1in: OrderedDict[_KT, None] = OrderedDict()
+        self._a1out: OrderedDict[_KT, None] = OrderedDict()
+        self._am: OrderedDict[_KT, None] = OrderedDict()
+
+    def _touch(self, key: _KT) -> None:
+        if key in self._am:
+            self._am.move_to_end(key)
+
+    def _admit(self, key: _KT) -> None:
+        if key in self._a1out:
+            del self._a1out[key]
+            self._am[key] = None
+        else:
+            self._a1in[key] = None
+        self._shrink()
+
+    def _shrink(self) -> None:
+        while len(self._data) > self._size:
+            if len(self._a1in) > self._in_size or not self._am:
+                victim, _ = self._a1in.popitem(last=False)
+                self._a1out[victim] = None
+                if len(self._a1out) > self._out_size:
+                    self._a1out.popitem(last=False)
+            else:
+                victim, _ = self._am.popitem(last=False)
+            self._evict(victim)
+
+    def _resize(self) -> None:
+        self._in_size = max(1, int(self._size * self._in_ratio))
+        self._out_size = max(1, int(self._size * self._out_ratio))
+        while len(self._a1out) > self._out_size:
+            self._a1out.popitem(last=False)
+        self._shrink()
+
+    def _discard(self, key: _KT) -> None:
+        if self._am.pop(key, _MISSING) is _MISSING:
+            del self._a1in[key]
+
+    def _order(self, reverse: bool = False) -> Iterable[_KT]:
+        if reverse:
+            yield from self._a1in
+            yield from self._am
+        else:
+            yield from reversed(self._am)
+            yield from reversed(self._a1in)
+
+
+class ARC(CachePolicy[_KT, _VT]):
+    """ARC 自适应替换缓存
+
+    T1 保存只被访问过一次的键, T2 保存被多次访问的键, B1 与 B2 分别记住从两者淘汰的键。
+    B1 中的命中会增大 T1 的目标容量 p, B2 中的命中则减小 p, 从而在近期性与频率之间自适应。
+    """
+
+    __slots__ = ("_p", "_t1", "_t2", "_b1", "_b2")
+
+    def _reset(self) -> None:
+        self._p = 0.0
+        self._t1: OrderedDict[_KT, None] = OrderedDict()
+        self._t2: OrderedDict[_KT, None] = OrderedDict()
+        self._b1: OrderedDict[_KT, None] = OrderedDict()
+        self._b2: OrderedDict[_KT, None] = OrderedDict()
+
+    def _touch(self, key: _KT) -> None:
+        if key in self._t1:
+            del self._t1[key]
+            self._t2[key] = None
+        else:
+            self._t2.move_to_end(key)
+
+    def _replace(self, in_b2: bool) -> None:
+        t1 = len(self._t1)
+        if t1 and (t1 > self._p or (in_b2 and t1 == self._p) or not self._t2):
+            victim, _ = self._t1.popitem(last=False)
+            self._b1[victim] = None
+        else:
+            victim, _ = self._t2.popitem(last=False)
+            self._b2[victim] = None
+        self._evict(victim)
+
+    def _admit(self, key: _KT) -> None:
+        size = self._size
+        if key in self._b1:
+            self._p = min(size, self._p + max(len(self._b2) / len(self._b1), 1))
+            del self._b1[key]
+            if len(self._data) > size:
+                self._replace(False)
+            self._t2[key] = None
+            return
+        if key in self._b2:
+            self._p = max(0.0, self._p - max(len(self._b1) / len(self._b2), 1))
+            del self._b2[key]
+            if len(self._data) > size:
+                self._replace(True)
+            self._t2[key] = None
+            return
+        if len(self._data) > size:
+            if len(self._t1) + len(self._b1) >= size:
+                if self._b1:
+                    self._b1.popitem(last=False)
+                    self._replace(False)
+                else:
+                    victim, _ = self._t1.popitem(last=False)
+                    self._evict(victim)
+            else:
+                if len(self._t1) + len(self._t2) + len(self._b1) + len(self._b2) >= 2 * size and self._b2:
+                    self._b2.popitem(last=False)
+                self._replace(False)
+        self._t1[key] = None
+
+    def _discard(self, key: _KT) -> None:
+        if self._t1.pop(key, _MISSING) is _MISSING:
+            del self._t2[key]
+
+    def _resize(self) -> None:
+        size = self._size
+        self._p = min(self._p, size)
+        while len(self._data) > size:
+            self._replace(False)
+        while len(self._t1) + len(self._b1) > size and self._b1:
+            self._b1.popitem(last=False)
+        while len(self._t1) + len(self._t2) + len(self._b1) + len(self._b2) > 2 * size:
+            (self._b2 or self._b1).popitem(last=False)
+
+    def _order(self, reverse: bool = False) -> Iterable[_KT]:
+        if reverse:
+            yield from self._t1
+            yield from self._t2
+        else:
+            yield from reversed(self._t2)
+            yield from reversed(self._t1)
+
+
+class _FrequencySketch:
+    """4 行的 count-min sketch, 计数上限为 15, 每累计 10 倍容量次访问后所有计数减半"""
+
+    __slots__ = ("_rows", "_mask", "_shift", "_additions", "_sample_size")
+
+    _SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+
+    def __init__(self, size: int) -> None:
+        width = 1 << max(4, (size - 1).bit_length())
+        self._rows = [bytearray(width) for _ in self._SEEDS]
+        self._mask = width - 1
+        self._shift = 64 - width.bit_length() + 1
+        self._additions = 0
+        self._sample_size = 10 * size
+
+    def _indexes(self, key: Hashable) -> Iterator[int]:
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        for seed in self._SEEDS:
+            yield ((h * seed) & 0xFFFFFFFFFFFFFFFF) >> self._shift & self._mask
+
+    def increment(self, key: Hashable) -> None:
+        for row, index in zip(self._rows, self._indexes(key)):
+            if row[index] < 15:
+                row[index] += 1
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            self._additions //= 2
+            for row in self._rows:
+                row[:] = bytes(count >> 1 for count in row)
+
+    def frequency(self, key: Hashable) -> int:
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+
+
+class TinyLFU(CachePolicy[_KT, _VT]):
+    """W-TinyLFU 淘汰策略
+
+    新键先进入容量约为 1% 的 LRU 窗口; 离开窗口的候选键只有在估计访问频率高于主缓存的淘汰对象时才会被接纳。
+    主缓存是分为试用区 (20%) 与保护区 (80%) 的分段 LRU, 试用区中再次被访问的键晋升到保护区。
+
+    Args:
+        size (int): 缓存容量
+        callback (Callable, optional): 淘汰回调
+        window_ratio (float): 窗口占总容量的比例
+    """
+
+    __slots__ = (
+        "_window_ratio",
+        "_window_size",
+        "_protected_size",
+        "_window",
+        "_probation",
+        "_protected",
+        "_sketch",
+    )
+
+    def __init__(
+        self, size: int, callback: Callable[[_KT, _VT], Any] | None = None, window_ratio: float = 0.01
+    ) -> None:
+        if not 0 < window_ratio < 1:
+            raise ValueError("window_ratio should be between 0 and 1")
+        self._window_ratio = window_ratio
+        super().__init__(size, callback)
+
+    def _reset(self) -> None:
+        self._window_size = max(1, int(self._size * self._window_ratio))
+        self._protected_size = int((self._size - self._window_size) * 0.8)
+        self._window: OrderedDict[_KT, None] = OrderedDict()
+        self._probation: OrderedDict[_KT, None] = OrderedDict()
+        self._protected: OrderedDict[_KT, None] = OrderedDict()
+        self._sketch = _FrequencySketch(self._size)
+
+    def _touch(self, key: _KT) -> None:
+        self._sketch.increment(key)
+        if key in self._window:
+            self._window.move_to_end(key)
+        elif key in self._protected:
+            self._protected.move_to_end(key)
+        else:
+            del self._probation[key]
+            self._protected[key] = None
+            if len(self._protected) > self._protected_size:
+                demoted, _ = self._protected.popitem(last=False)
+                self._probation[demoted] = None
+
+    def _admit(self, key: _KT) -> None:
+        self._sketch.increment(key)
+        self._window[key] = None
+        if len(self._window) <= self._window_size:
+            return
+        candidate, _ = self._window.popitem(last=False)
+        if len(self._data) <= self._size:
+            self._probation[candidate] = None
+            return
+        main = self._probation or self._protected
+        if not main:
+            self._evict(candidate)
+            return
+        victim = next(iter(main))
+        if self._sketch.frequency(candidate) > self._sketch.frequency(victim):
+            del main[victim]
+            self._probation[candidate] = None
+            self._evict(victim)
+        else:
+            self._evict(candidate)
+
+    def _discard(self, key: _KT) -> None:
+        for segment in (self._window, self._probation, self._protected):
+            if segment.pop(key, _MISSING) is not _MISSING:
+                return
+
+    def _resize(self) -> None:
+        # the sketch keeps its width, so the frequencies gathered so far survive
+        self._window_size = max(1, int(self._size * self._window_ratio))
+        self._protected_size = int((self._size - self._window_size) * 0.8)
+        while len(self._window) > self._window_size:
+            candidate, _ = self._window.popitem(last=False)
+            self._probation[candidate] = None
+        while len(self._protected) > self._protected_size:
+            demoted, _ = self._protected.popitem(last=False)
+            self._probation[demoted] = None
+        while len(self._data) > self._size:
+            victim, _ = self._probation.popitem(last=False)
+            self._evict(victim)
+
+    def _order(self, reverse: bool = False) -> Iterable[_KT]:
+        if reverse:
+            yield from self._probation
+            yield from self._protected
+            yield from self._window
+        else:
+            yield from reversed(self._window)
+            yield from reversed(self._protected)
+            yield from reversed(self._probation)
@@ -1,14 +1,31 @@
-from collections.abc import Iterator
+from array import array
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor
 from typing_extensions import Self
 
 CRLF: str
 QUOTATION: dict[str, str]
 
 def split(text: str, separator: str, crlf: bool = True) -> list[str]: ...
+def split_many(
+    texts: Iterable[str],
+    separator: str,
+    crlf: bool = True,
+    workers: int | Executor | None = None,
+    chunk_size: int | None = None,
+) -> list[list[str]]: ...
+def split_spans(text: str, separator: str, crlf: bool = True) -> array[int]: ...
 def split_once(text: str, separator: str, crlf: bool = True) -> tuple[str, str]: ...
 def split_once_without_escape(text: str, separator: str, crlf: bool = True) -> tuple[str, str]: ...
 def split_once_index_only(text: str, separator: str, offset: int, crlf: bool = True): ...
 
+class Tokenizer:
+    separator: str
+    def __init__(self, separator: str, crlf: bool = True) -> None: ...
+    def feed(self, chunk: str) -> None: ...
+    def tokens(self) -> list[str]: ...
+    def close(self) -> list[str]: ...
+
 class String(Iterator[str]):
     left_index: int
     offset: int
@@ -1,7 +1,10 @@
-# cython: language_level=3, boundscheck=False, cdivision=True, wraparound=False, initializedcheck=False, infer_types=True, binding=True
+# cython: language_level=3, boundscheck=False, cdivision=True, wraparound=False, initializedcheck=False, infer_types=True, binding=True, freethreading_compatible=True
 
 
+from cpython cimport array
 from cpython.dict cimport PyDict_Contains, PyDict_GetItem
+from cpython.mem cimport PyMem_Free, PyMem_Realloc
+from cpython.object cimport Py_SIZE
 from cpython.list cimport PyList_Append, PyList_GET_ITEM, PyList_GET_SIZE, PyList_Insert
 from cpython.unicode cimport (
     PyUnicode_Concat,
@@ -11,9 +14,13 @@ from cpython.unicode cimport (
     PyUnicode_Substring,
 )
 
+import array
+
 
 cdef extern from "Python.h":
     Py_UCS4 PyUnicode_READ_CHAR(object s, Py_ssize_t i)
+    object PyUnicode_FromKindAndData(int kind, const void *buffer, Py_ssize_t size)
+    cdef int PyUnicode_4BYTE_KIND
     cdef Py_ssize_t PY_SSIZE_T_MAX
 
 
@@ -24,8 +31,11 @@ cdef extern from "_op.h":
     cdef int RIGHTSTRIP
     cdef int BOTHSTRIP
 
-cdef dict QUOTATION = {'"': '"', "'": "'"}
-cdef unicode CRLF = "\n\r"
+cdef dict _QUOTATION = {'"': '"', "'": "'"}
+cdef unicode _CRLF = "\n\r"
+
+QUOTATION = _QUOTATION
+CRLF = _CRLF
 
 def split(str text, str separator, bint crlf=True):
     """尊重引号与转义的字符串切分
@@ -39,7 +49,7 @@ def split(str text, str separator, bint crlf=True):
         list[str]: 切割后的字符串, 可能含有空格
     """
     if crlf:
-        separator = PyUnicode_Concat(separator, CRLF)
+        separator = PyUnicode_Concat(separator, _CRLF)
     text = str_strip(text, BOTHSTRIP, separator)
     cdef:
         bint escape = 0
@@ -59,13 +69,13 @@ def split(str text, str separator, bint crlf=True):
     while index < length:
         ch = PyUnicode_READ_CHAR(text, index)
         index += 1
-        if PyDict_Contains(QUOTATION, ch):
+        if PyDict_Contains(_QUOTATION, ch):
             if index == 1 + escape + max(last_sep_index, last_quote_index) and quotation == 0:
-                quotation = PyUnicode_READ_CHAR(<str>PyDict_GetItem(QUOTATION, ch), 0)
+                quotation = PyUnicode_READ_CHAR(<str>PyDict_GetItem(_QUOTATION, ch), 0)
             elif (
                 PyList_GET_SIZE(result) == 0
                 or index == length
-                or PyDict_Contains(QUOTATION, PyUnicode_READ_CHAR(text, index))
+                or PyDict_Contains(_QUOTATION, PyUnicode_READ_CHAR(text, index))
                 or str_contains(separator, PyUnicode_READ_CHAR(text, index))
             ) and ch == quotation:
                 quotation = 0
@@ -95,11 +105,288 @@ def split(str text, str separator, bint crlf=True):
         PyList_Insert(result, last_sep_pos, PyUnicode_READ_CHAR(text,  last_sep_index or last_quote_index))
         # result[first_quoted_sep_index] = '\1'
         while i < _len:
-            result[<Py_ssize_t>PyList_GET_ITEM(quoted_sep_index, i)] = '\1'
+            result[<Py_ssize_t><object>PyList_GET_ITEM(quoted_sep_index, i)] = '\1'
             i += 1
     return PyUnicode_Split(PyUnicode_Join('', result), '\1', -1)
 
 
+# marks the end of a part in the scratch buffer, same as the '\1' used by `split`
+cdef Py_UCS4 PART_END = 1
+
+
+cdef struct Scratch:
+    Py_UCS4 *chars
+    Py_ssize_t *quoted_sep_index
+    Py_ssize_t size
+
+
+cdef int scratch_reserve(Scratch *scratch, Py_ssize_t size) except -1:
+    cdef void *chars
+    cdef void *quoted_sep_index
+    if size <= scratch.size:
+        return 0
+    chars = PyMem_Realloc(scratch.chars, size * sizeof(Py_UCS4))
+    if chars == NULL:
+        raise MemoryError
+    scratch.chars = <Py_UCS4 *>chars
+    quoted_sep_index = PyMem_Realloc(scratch.quoted_sep_index, size * sizeof(Py_ssize_t))
+    if quoted_sep_index == NULL:
+        raise MemoryError
+    scratch.quoted_sep_index = <Py_ssize_t *>quoted_sep_index
+    scratch.size = size
+    return 0
+
+
+cdef list split_scratch(str text, str separator, Scratch *scratch):
+    """`split` writing into scratch instead of a list of chars, separator already includes crlf"""
+    text = str_strip(text, BOTHSTRIP, separator)
+    cdef:
+        bint escape = 0
+        Py_UCS4 quotation = 0
+        Py_UCS4 ch = 0
+        Py_UCS4 next_ch = 0
+        Py_ssize_t index = 0
+        Py_ssize_t length = PyUnicode_GET_LENGTH(text)
+        Py_ssize_t count = 0
+        Py_ssize_t quoted = 0
+        Py_ssize_t last_sep_index = 0
+        Py_ssize_t last_sep_pos = 0
+        Py_ssize_t last_quote_index = 0
+        Py_ssize_t start = 0
+        Py_ssize_t i = 0
+        Py_UCS4 *chars
+        list result = []
+
+    # the text is copied at most once, plus the char inserted for an unclosed quote
+    scratch_reserve(scratch, length + 1)
+    chars = scratch.chars
+    while index < length:
+        ch = PyUnicode_READ_CHAR(text, index)
+        index += 1
+        if ch == 34 or ch == 39:
+            if index == 1 + escape + max(last_sep_index, last_quote_index) and quotation == 0:
+                quotation = ch
+            else:
+                if index < length:
+                    next_ch = PyUnicode_READ_CHAR(text, index)
+                if (
+                    count == 0
+                    or index == length
+                    or next_ch == 34
+                    or next_ch == 39
+                    or str_contains(separator, next_ch)
+                ) and ch == quotation:
+                    quotation = 0
+                    last_quote_index = index
+                else:
+                    chars[count] = ch
+                    count += 1
+            if escape:
+                chars[count - 1] = ch
+        elif str_contains(separator, ch):
+            if quotation:
+                scratch.quoted_sep_index[quoted] = count + 1
+                quoted += 1
+                chars[count] = ch
+                count += 1
+            else:
+                last_sep_index = index
+                last_sep_pos = count + 1
+                if count and chars[count - 1] != PART_END:
+                    chars[count] = PART_END
+                    count += 1
+                quoted = 0
+        else:
+            chars[count] = ch
+            count += 1
+        escape = ch == 92
+    if count == 0:
+        return result
+    if quotation and quoted:
+        if last_sep_pos > count:
+            last_sep_pos = count
+        for i in range(count, last_sep_pos, -1):
+            chars[i] = chars[i - 1]
+        chars[last_sep_pos] = PyUnicode_READ_CHAR(text, last_sep_index or last_quote_index)
+        count += 1
+        for i in range(quoted):
+            chars[scratch.quoted_sep_index[i]] = PART_END
+    for i in range(count):
+        if chars[i] == PART_END:
+            PyList_Append(result, PyUnicode_FromKindAndData(PyUnicode_4BYTE_KIND, chars + start, i - start))
+            start = i + 1
+    PyList_Append(result, PyUnicode_FromKindAndData(PyUnicode_4BYTE_KIND, chars + start, count - start))
+    return result
+
+
+cdef array.array SPANS_TEMPLATE = array.array("q")
+
+
+cdef inline int append_span(
+    array.array spans,
+    Py_ssize_t start,
+    Py_ssize_t end,
+    bint quoted,
+) except -1:
+    cdef Py_ssize_t size = Py_SIZE(spans)
+    array.resize_smart(spans, size + 3)
+    spans.data.as_longlongs[size] = start
+    spans.data.as_longlongs[size + 1] = end
+    spans.data.as_longlongs[size + 2] = quoted
+    return 0
+
+
+cdef inline int append_part(
+    array.array spans,
+    Py_ssize_t offset,
+    Py_ssize_t start,
+    Py_ssize_t end,
+    Py_ssize_t opened,
+    Py_ssize_t opened_at,
+    Py_ssize_t closed_at,
+) except -1:
+    if opened == 1 and opened_at == start + 1 and closed_at == end:
+        append_span(spans, offset + start + 1, offset + end - 1, 1)
+    else:
+        append_span(spans, offset + start, offset + end, 0)
+    return 0
+
+
+def split_spans(str text, str separator, bint crlf=True):
+    """尊重引号与转义的字符串切分, 只返回每个部分在原字符串中的位置
+
+    切分的边界与 `split` 相同。每个部分对应 (start, end, quoted) 三个数,
+    被一对引号完整括起的部分 quoted 为 1, 且 start 与 end 不含两侧的引号; 其余部分为原文中的范围,
+    其中的转义与引号保持原样, 因此不含引号与反斜杠的部分满足 text[start:end] == split(text)[i]。
+
+    Args:
+        text (str): 要切割的字符串
+        separator (str): 切割符.
+        crlf (bool): 是否去除 \n 与 \r，默认为 True
+
+    Returns:
+        array[int]: 依次排列的 (start, end, quoted)
+    """
+    if crlf:
+        separator = PyUnicode_Concat(separator, _CRLF)
+    cdef:
+        array.array spans = array.clone(SPANS_TEMPLATE, 0, False)
+        Py_ssize_t offset = 0
+        Py_ssize_t end = PyUnicode_GET_LENGTH(text)
+        Py_ssize_t tlen = 0
+        bint escape = 0
+        bint has_result = 0
+        bint marked = 0
+        bint quoted_sep = 0
+        Py_UCS4 quotation = 0
+        Py_UCS4 ch = 0
+        Py_UCS4 next_ch = 0
+        Py_ssize_t index = 0
+        Py_ssize_t start = 0
+        Py_ssize_t last_sep_index = 0
+        Py_ssize_t last_quote_index = 0
+        Py_ssize_t opened = 0
+        Py_ssize_t opened_at = 0
+        Py_ssize_t closed_at = 0
+
+    while offset < end and str_contains(separator, PyUnicode_READ_CHAR(text, offset)):
+        offset += 1
+    while end > offset and str_contains(separator, PyUnicode_READ_CHAR(text, end - 1)):
+        end -= 1
+    tlen = end - offset
+    while index < tlen:
+        ch = PyUnicode_READ_CHAR(text, offset + index)
+        index += 1
+        if ch == 34 or ch == 39:
+            if index == 1 + escape + max(last_sep_index, last_quote_index) and quotation == 0:
+                quotation = ch
+                opened += 1
+                if opened == 1:
+                    opened_at = -1 if escape else index
+            else:
+                if index < tlen:
+                    next_ch = PyUnicode_READ_CHAR(text, offset + index)
+                if (
+                    not has_result
+                    or index == tlen
+                    or next_ch == 34
+                    or next_ch == 39
+                    or str_contains(separator, next_ch)
+                ) and ch == quotation:
+                    quotation = 0
+                    last_quote_index = index
+                    closed_at = -1 if escape else index
+                else:
+                    has_result = 1
+                    marked = 0
+        elif str_contains(separator, ch):
+            if quotation:
+                quoted_sep = 1
+                has_result = 1
+                marked = 0
+            else:
+                if has_result and not marked:
+                    append_part(spans, offset, last_sep_index, index - 1, opened, opened_at, closed_at)
+                    marked = 1
+                last_sep_index = index
+                opened = opened_at = closed_at = 0
+                quoted_sep = 0
+        else:
+            has_result = 1
+            marked = 0
+        escape = ch == 92
+    if not has_result:
+        return spans
+    if quotation and quoted_sep:
+        # an unclosed quote is kept and every separator after the part start splits again
+        start = last_sep_index
+        for index in range(last_sep_index, tlen):
+            if str_contains(separator, PyUnicode_READ_CHAR(text, offset + index)):
+                append_span(spans, offset + start, offset + index, 0)
+                start = index + 1
+        append_span(spans, offset + start, offset + tlen, 0)
+    elif quotation:
+        # an unclosed quote without separators is dropped
+        start = last_sep_index + (opened_at == last_sep_index + 1)
+        append_span(spans, offset + start, offset + tlen, 0)
+    else:
+        append_part(spans, offset, last_sep_index, tlen, opened, opened_at, closed_at)
+    return spans
+
+def split_many(texts, str separator, bint crlf=True, workers=None, chunk_size=None):
+    """对多个字符串分别调用 `split`, 返回结果的列表
+
+    循环在 C 中完成, 并在所有文本间复用同一块缓冲区。
+
+    Args:
+        texts (Iterable[str]): 要切割的字符串
+        separator (str): 切割符.
+        crlf (bool): 是否去除 \n 与 \r，默认为 True
+        workers (int | Executor, optional): 进程数或进程池, 给出时将大批次分块交给多个进程切分
+        chunk_size (int, optional): 交给每个进程的文本数, 默认按进程数均分
+
+    Returns:
+        list[list[str]]: 每个字符串切割后的结果
+    """
+    if workers is not None:
+        from tarina._string_parallel import split_parallel
+
+        return split_parallel(split_many, texts, separator, crlf, workers, chunk_size)
+    if crlf:
+        separator = PyUnicode_Concat(separator, _CRLF)
+    cdef Scratch scratch
+    cdef list result = []
+    scratch.chars = NULL
+    scratch.quoted_sep_index = NULL
+    scratch.size = 0
+    try:
+        for text in texts:
+            PyList_Append(result, split_scratch(<str?>text, separator, &scratch))
+    finally:
+        PyMem_Free(scratch.chars)
+        PyMem_Free(scratch.quoted_sep_index)
+    return result
+
 def split_once(str text, str separator, bint crlf=True):
     """尊重引号与转义的字符串切分, 只切割一次
 
@@ -111,8 +398,9 @@ def split_once(str text, str separator, bint crlf=True):
         tuple[str, str]: 切割后的字符串, 可能含有空格
     """
     if crlf:
-        separator = PyUnicode_Concat(separator, CRLF)
-    text = str_strip(text, LEFTSTRIP, separator)
+        separator = PyUnicode_Concat(separator, _CRLF)
+    # only whitespace is stripped on the left, like the pure Python version
+    text = text.lstrip()
     cdef:
         Py_ssize_t index = 0
         list[Py_UCS4] out_text = []
@@ -135,9 +423,9 @@ def split_once(str text, str separator, bint crlf=True):
         if sep == 1:
             index -= 1
             break
-        if PyDict_Contains(QUOTATION, ch):  # 遇到引号括起来的部分跳过分隔
+        if PyDict_Contains(_QUOTATION, ch):  # 遇到引号括起来的部分跳过分隔
             if index == 1 + escape + last_quote_index and quotation == 0:
-                quotation = PyUnicode_READ_CHAR(<str>PyDict_GetItem(QUOTATION, ch), 0)
+                quotation = PyUnicode_READ_CHAR(<str>PyDict_GetItem(_QUOTATION, ch), 0)
             elif (index == length or str_contains(separator, PyUnicode_READ_CHAR(text, index-2)) == 0) and ch == quotation:
                 last_quote_index = index
                 first_quoted_sep_index = -1
@@ -168,8 +456,9 @@ def split_once_without_escape(str text, str separator, bint crlf=True):
         tuple[str, str]: 切割后的字符串, 可能含有空格
     """
     if crlf:
-        separator = PyUnicode_Concat(separator, CRLF)
-    text = str_strip(text, LEFTSTRIP, separator)
+        separator = PyUnicode_Concat(separator, _CRLF)
+    # only whitespace is stripped on the left, like the pure Python version
+    text = text.lstrip()
     cdef:
         Py_ssize_t index = 0
         Py_UCS4 quotation = 0
@@ -185,9 +474,9 @@ def split_once_without_escape(str text, str separator, bint crlf=True):
                 break
             if first_quoted_sep_index == -1:
                 first_quoted_sep_index = index
-        if PyDict_Contains(QUOTATION, ch):  # 遇到引号括起来的部分跳过分隔
+        if PyDict_Contains(_QUOTATION, ch):  # 遇到引号括起来的部分跳过分隔
             if index == 1 + last_quote_index and quotation == 0:
-                quotation = PyUnicode_READ_CHAR(<str>PyDict_GetItem(QUOTATION, ch), 0)
+                quotation = PyUnicode_READ_CHAR(<str>PyDict_GetItem(_QUOTATION, ch), 0)
             elif (index == length or str_contains(separator, PyUnicode_READ_CHAR(text, index-2)) == 0) and ch == quotation:
                 last_quote_index = index
                 first_quoted_sep_index = -1
@@ -212,7 +501,7 @@ cpdef inline tuple split_once_index_only(str text, str separator, Py_ssize_t off
         tuple[str, str]: 切割后的字符串, 可能含有空格
     """
     if crlf:
-        separator = PyUnicode_Concat(separator, CRLF)
+        separator = PyUnicode_Concat(separator, _CRLF)
     cdef:
         Py_ssize_t index = offset
         Py_UCS4 quotation = 0
@@ -234,9 +523,9 @@ cpdef inline tuple split_once_index_only(str text, str separator, Py_ssize_t off
         if sep:
             index -= 1
             break
-        if PyDict_Contains(QUOTATION, ch):  # 遇到引号括起来的部分跳过分隔
+        if PyDict_Contains(_QUOTATION, ch):  # 遇到引号括起来的部分跳过分隔
             if index == 1 + (last_quote_index or offset) and quotation == 0:
-                quotation = PyUnicode_READ_CHAR(<str>PyDict_GetItem(QUOTATION, ch), 0)
+                quotation = PyUnicode_READ_CHAR(<str>PyDict_GetItem(_QUOTATION, ch), 0)
             elif (index == length or str_contains(separator, PyUnicode_READ_CHAR(text, index-2)) == 0) and ch == quotation:
                 last_quote_index = index
                 quoted_sep_index = -1
@@ -247,6 +536,166 @@ cpdef inline tuple split_once_index_only(str text, str separator, Py_ssize_t off
     return index, sep
 
 
+cdef class Tokenizer:
+    """增量的 `split`, 按块输入文本并随时取出已经完成的部分
+
+    引号, 转义与分隔符的状态跨块保留, 结果与对完整文本调用 `split` 相同。
+    只有当前未完成的部分留在内存中; 未闭合的引号内的内容要等到引号闭合或输入结束才能确定。
+
+    Args:
+        separator (str): 切割符.
+        crlf (bool): 是否去除 \n 与 \r，默认为 True
+    """
+    cdef readonly str separator
+    cdef list ready
+    cdef list current
+    cdef list quoted_sep_index
+    cdef list seps  # separators not processed yet, dropped if the input ends with them
+    cdef Py_UCS4 quotation
+    cdef Py_UCS4 text_quote
+    cdef Py_ssize_t pending_quote  # index of a closing quote that depends on the next char
+    cdef bint pending_escape
+    cdef bint escape
+    cdef bint started
+    cdef bint closed
+    cdef Py_ssize_t index
+    cdef Py_ssize_t last_sep_index
+    cdef Py_ssize_t last_sep_pos
+    cdef Py_ssize_t last_quote_index
+    cdef Py_UCS4 first
+    cdef Py_UCS4 after_sep
+    cdef Py_UCS4 after_quote
+
+    def __init__(self, str separator, bint crlf=True):
+        self.separator = PyUnicode_Concat(separator, _CRLF) if crlf else separator
+        self.ready = []
+        self.current = []
+        self.quoted_sep_index = []
+        self.seps = []
+        self.quotation = 0
+        self.text_quote = 0
+        self.pending_quote = 0
+        self.pending_escape = 0
+        self.escape = 0
+        self.started = 0
+        self.closed = 0
+        self.index = 0
+        self.last_sep_index = 0
+        self.last_sep_pos = 0
+        self.last_quote_index = 0
+        self.first = self.after_sep = self.after_quote = 0
+
+    cdef void _resolve(self, Py_UCS4 ch, bint end):
+        # the closing quote is kept as text unless the next char ends the part
+        if end or PyDict_Contains(_QUOTATION, ch) or str_contains(self.separator, ch):
+            self.quotation = 0
+            self.last_quote_index = self.pending_quote
+            if self.pending_escape:
+                self.current[PyList_GET_SIZE(self.current)-1] = self.text_quote
+        else:
+            PyList_Append(self.current, self.text_quote)
+        self.pending_quote = 0
+
+    cdef void _step(self, Py_UCS4 ch):
+        self.index += 1
+        cdef Py_ssize_t index = self.index
+        if index == 1:
+            self.first = ch
+        if index - 1 == self.last_sep_index:
+            self.after_sep = ch
+        if index - 1 == self.last_quote_index:
+            self.after_quote = ch
+        if PyDict_Contains(_QUOTATION, ch):
+            if index == 1 + self.escape + max(self.last_sep_index, self.last_quote_index) and self.quotation == 0:
+                self.quotation = PyUnicode_READ_CHAR(<str>PyDict_GetItem(_QUOTATION, ch), 0)
+                if self.escape:
+                    self.current[PyList_GET_SIZE(self.current)-1] = ch
+            elif ch == self.quotation and self.started:
+                self.pending_quote = index
+                self.pending_escape = self.escape
+                self.text_quote = ch
+            elif ch == self.quotation:
+                self.quotation = 0
+                self.last_quote_index = index
+            else:
+                PyList_Append(self.current, ch)
+                self.started = 1
+        elif str_contains(self.separator, ch):
+            if self.quotation:
+                PyList_Append(self.quoted_sep_index, PyList_GET_SIZE(self.current) + 1)
+                PyList_Append(self.current, ch)
+                self.started = 1
+            else:
+                self.last_sep_index = index
+                self.last_sep_pos = 0 if PyList_GET_SIZE(self.current) else 1
+                if PyList_GET_SIZE(self.current):
+                    PyList_Append(self.ready, PyUnicode_Join('', self.current))
+                    self.current = []
+                self.quoted_sep_index = []
+        else:
+            PyList_Append(self.current, ch)
+            self.started = 1
+        self.escape = ch == 92
+
+    def feed(self, str chunk):
+        """输入下一块文本"""
+        if self.closed:
+            raise ValueError("feed() after close()")
+        cdef:
+            Py_ssize_t i = 0
+            Py_ssize_t j
+            Py_ssize_t length = PyUnicode_GET_LENGTH(chunk)
+            Py_UCS4 ch
+            list seps
+        while i < length:
+            ch = PyUnicode_READ_CHAR(chunk, i)
+            i += 1
+            if self.pending_quote:
+                self._resolve(ch, 0)
+            if str_contains(self.separator, ch):
+                # leading separators are stripped like in split
+                if self.index:
+                    PyList_Append(self.seps, ch)
+                continue
+            if PyList_GET_SIZE(self.seps):
+                seps = self.seps
+                self.seps = []
+                for j in range(PyList_GET_SIZE(seps)):
+                    self._step(PyUnicode_READ_CHAR(<str>PyList_GET_ITEM(seps, j), 0))
+            self._step(ch)
+
+    def tokens(self):
+        """取出目前已经完成的部分"""
+        cdef list ready = self.ready
+        self.ready = []
+        return ready
+
+    def close(self):
+        """结束输入, 取出剩余的所有部分"""
+        if self.closed:
+            return self.tokens()
+        self.closed = 1
+        if self.pending_quote:
+            self._resolve(0, 1)
+        self.seps = []
+        if not self.started:
+            return self.tokens()
+        cdef:
+            list current = self.current
+            Py_ssize_t i
+            Py_UCS4 mark
+        if self.quotation and PyList_GET_SIZE(self.quoted_sep_index):
+            mark = self.after_sep if self.last_sep_index else self.after_quote if self.last_quote_index else self.first
+            PyList_Insert(current, self.last_sep_pos, mark)
+            for i in range(PyList_GET_SIZE(self.quoted_sep_index)):
+                current[<Py_ssize_t><object>PyList_GET_ITEM(self.quoted_sep_index, i)] = '\1'
+            self.ready.extend(PyUnicode_Split(PyUnicode_Join('', current), '\1', -1))
+        else:
+            PyList_Append(self.ready, PyUnicode_Join('', current))
+        self.current = []
+        return self.tokens()
+
+
 cdef class String:
     cdef public Py_ssize_t left_index
     cdef public Py_ssize_t next_index
@@ -0,0 +1,46 @@
+"""多进程批量切分, 供 C 与纯 Python 两种实现的 split_many 共用"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import repeat
+from typing import Callable
+
+MIN_CHUNK = 1024
+"""每块的最少文本数, 更小的批次不值得跨进程传递"""
+
+
+def split_parallel(
+    split_many: Callable[..., list[list[str]]],
+    texts: Iterable[str],
+    separator: str,
+    crlf: bool,
+    workers: int | Executor,
+    chunk_size: int | None = None,
+) -> list[list[str]]:
+    """将 texts 分块交给进程池中的 split_many, 按原顺序拼接结果
+
+    workers 为进程数时临时创建进程池, 也可以传入已有的 Executor 以便在多次调用间复用。
+    批次不足两块时直接在当前进程中切分。
+    """
+    if isinstance(workers, int) and workers < 1:
+        raise ValueError("Workers should be a positive number")
+    if chunk_size is not None and chunk_size < 1:
+        raise ValueError("Chunk size should be a positive number")
+    texts = texts if isinstance(texts, list) else list(texts)
+    if chunk_size is None:
+        count = workers if isinstance(workers, int) else 4
+        chunk_size = max(MIN_CHUNK, -(-len(texts) // (count * 4)))
+    if workers == 1 or len(texts) <= chunk_size:
+        return split_many(texts, separator, crlf)
+    chunks = [texts[i : i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    result: list[list[str]] = []
+    if isinstance(workers, Executor):
+        for part in workers.map(split_many, chunks, repeat(separator), repeat(crlf)):
+            result.extend(part)
+        return result
+    with ProcessPoolExecutor(workers) as pool:
+        for part in pool.map(split_many, chunks, repeat(separator), repeat(crlf)):
+            result.extend(part)
+    return result
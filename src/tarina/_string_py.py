@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from collections.abc import Iterator
+from array import array
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor
 
 QUOTATION = {"'": "'", '"': '"'}
 CRLF = "\n\r"
@@ -200,6 +202,250 @@ def split(text: str, separator: str, crlf: bool = True):
     return str.join("", result).split("\0")
 
 
+def split_spans(text: str, separator: str, crlf: bool = True):
+    """尊重引号与转义的字符串切分, 只返回每个部分在原字符串中的位置
+
+    切分的边界与 `split` 相同。每个部分对应 (start, end, quoted) 三个数,
+    被一对引号完整括起的部分 quoted 为 1, 且 start 与 end 不含两侧的引号; 其余部分为原文中的范围,
+    其中的转义与引号保持原样, 因此不含引号与反斜杠的部分满足 text[start:end] == split(text)[i]。
+
+    Args:
+        text (str): 要切割的字符串
+        separator (str): 切割符.
+        crlf (bool): 是否去除 \n 与 \r，默认为 True
+
+    Returns:
+        array[int]: 依次排列的 (start, end, quoted)
+    """
+    if crlf:
+        separator += CRLF
+    spans = array("q")
+    offset = len(text) - len(text.lstrip(separator))
+    end = len(text.rstrip(separator))
+    tlen = end - offset
+    quotation, escape = "", False
+    has_result = marked = False
+    last_sep_index = 0
+    last_quote_index = 0
+    # state of the current part, reset by every separator outside of quotes
+    opened = opened_at = closed_at = 0
+    quoted_sep = False
+    index = 0
+    while index < tlen:
+        char = text[offset + index]
+        index += 1
+        if char in QUOTATION:
+            if index == 1 + escape + max(last_sep_index, last_quote_index) and not quotation:
+                quotation = QUOTATION[char]
+                opened += 1
+                if opened == 1:
+                    opened_at = -1 if escape else index
+            elif (
+                not has_result
+                or index == tlen
+                or text[offset + index] in QUOTATION
+                or text[offset + index] in separator
+            ) and char == quotation:
+                quotation = ""
+                last_quote_index = index
+                closed_at = -1 if escape else index
+            else:
+                has_result, marked = True, False
+        elif char in separator:
+            if quotation:
+                quoted_sep = True
+                has_result, marked = True, False
+            else:
+                if has_result and not marked:
+                    _append_span(spans, offset, last_sep_index, index - 1, opened, opened_at, closed_at)
+                    marked = True
+                last_sep_index = index
+                opened = opened_at = closed_at = 0
+                quoted_sep = False
+        else:
+            has_result, marked = True, False
+        escape = char == "\\"
+    if not has_result:
+        return spans
+    if quotation and quoted_sep:
+        # an unclosed quote is kept and every separator after the part start splits again
+        start = last_sep_index
+        for index in range(last_sep_index, tlen):
+            if text[offset + index] in separator:
+                spans.extend((offset + start, offset + index, 0))
+                start = index + 1
+        spans.extend((offset + start, offset + tlen, 0))
+    elif quotation:
+        # an unclosed quote without separators is dropped
+        start = last_sep_index + (opened_at == last_sep_index + 1)
+        spans.extend((offset + start, offset + tlen, 0))
+    else:
+        _append_span(spans, offset, last_sep_index, tlen, opened, opened_at, closed_at)
+    return spans
+
+
+def _append_span(spans, offset: int, start: int, end: int, opened: int, opened_at: int, closed_at: int):
+    if opened == 1 and opened_at == start + 1 and closed_at == end:
+        spans.extend((offset + start + 1, offset + end - 1, 1))
+    else:
+        spans.extend((offset + start, offset + end, 0))
+
+
+def split_many(
+    texts: Iterable[str],
+    separator: str,
+    crlf: bool = True,
+    workers: int | Executor | None = None,
+    chunk_size: int | None = None,
+):
+    """对多个字符串分别调用 `split`, 返回结果的列表
+
+    Args:
+        texts (Iterable[str]): 要切割的字符串
+        separator (str): 切割符.
+        crlf (bool): 是否去除 \n 与 \r，默认为 True
+        workers (int | Executor, optional): 进程数或进程池, 给出时将大批次分块交给多个进程切分
+        chunk_size (int, optional): 交给每个进程的文本数, 默认按进程数均分
+
+    Returns:
+        list[list[str]]: 每个字符串切割后的结果
+    """
+    if workers is not None:
+        from ._string_parallel import split_parallel
+
+        return split_parallel(split_many, texts, separator, crlf, workers, chunk_size)
+    return [split(text, separator, crlf) for text in texts]
+
+
+class Tokenizer:
+    """增量的 `split`, 按块输入文本并随时取出已经完成的部分
+
+    引号, 转义与分隔符的状态跨块保留, 结果与对完整文本调用 `split` 相同。
+    只有当前未完成的部分留在内存中; 未闭合的引号内的内容要等到引号闭合或输入结束才能确定。
+
+    Args:
+        separator (str): 切割符.
+        crlf (bool): 是否去除 \n 与 \r，默认为 True
+    """
+
+    def __init__(self, separator: str, crlf: bool = True):
+        self.separator = separator + CRLF if crlf else separator
+        self.ready: list[str] = []
+        self.current: list[str] = []
+        self.quoted_sep_index: list[int] = []
+        self.seps = ""  # separators not processed yet, dropped if the input ends with them
+        self.quotation = ""
+        self.pending_quote = 0  # index of a closing quote that depends on the next char
+        self.pending_escape = False
+        self.text_quote = ""
+        self.escape = False
+        self.started = False
+        self.closed = False
+        self.index = 0
+        self.last_sep_index = 0
+        self.last_sep_pos = 0
+        self.last_quote_index = 0
+        self.first = self.after_sep = self.after_quote = ""
+
+    def _resolve(self, char: str):
+        # the closing quote is kept as text unless the next char ends the part
+        if not char or char in QUOTATION or char in self.separator:
+            self.quotation = ""
+            self.last_quote_index = self.pending_quote
+            if self.pending_escape:
+                self.current[-1] = self.text_quote
+        else:
+            self.current.append(self.text_quote)
+        self.pending_quote = 0
+
+    def _step(self, char: str):
+        self.index += 1
+        index = self.index
+        if index == 1:
+            self.first = char
+        if index - 1 == self.last_sep_index:
+            self.after_sep = char
+        if index - 1 == self.last_quote_index:
+            self.after_quote = char
+        if char in QUOTATION:
+            if index == 1 + self.escape + max(self.last_sep_index, self.last_quote_index) and not self.quotation:
+                self.quotation = QUOTATION[char]
+                if self.escape:
+                    self.current[-1] = char
+            elif char == self.quotation and self.started:
+                self.pending_quote = index
+                self.pending_escape = self.escape
+                self.text_quote = char
+            elif char == self.quotation:
+                self.quotation = ""
+                self.last_quote_index = index
+            else:
+                self.current.append(char)
+                self.started = True
+        elif char in self.separator:
+            if self.quotation:
+                self.quoted_sep_index.append(len(self.current) + 1)
+                self.current.append(char)
+                self.started = True
+            else:
+                self.last_sep_index = index
+                self.last_sep_pos = 0 if self.current else 1
+                if self.current:
+                    self.ready.append("".join(self.current))
+                    self.current = []
+                self.quoted_sep_index = []
+        else:
+            self.current.append(char)
+            self.started = True
+        self.escape = char == "\\"
+
+    def feed(self, chunk: str):
+        """输入下一块文本"""
+        if self.closed:
+            raise ValueError("feed() after close()")
+        separator = self.separator
+        for char in chunk:
+            if self.pending_quote:
+                self._resolve(char)
+            if char in separator:
+                # leading separators are stripped like in split
+                if self.index:
+                    self.seps += char
+                continue
+            if self.seps:
+                seps, self.seps = self.seps, ""
+                for sep in seps:
+                    self._step(sep)
+            self._step(char)
+
+    def tokens(self) -> list[str]:
+        """取出目前已经完成的部分"""
+        ready, self.ready = self.ready, []
+        return ready
+
+    def close(self) -> list[str]:
+        """结束输入, 取出剩余的所有部分"""
+        if self.closed:
+            return self.tokens()
+        self.closed = True
+        if self.pending_quote:
+            self._resolve("")
+        self.seps = ""
+        if not self.started:
+            return self.tokens()
+        current = self.current
+        if self.quotation and self.quoted_sep_index:
+            mark = self.after_sep if self.last_sep_index else self.after_quote if self.last_quote_index else self.first
+            current.insert(self.last_sep_pos, mark)
+            for i in self.quoted_sep_index:
+                current[i] = "\0"
+            self.ready.extend(str.join("", current).split("\0"))
+        else:
+            self.ready.append(str.join("", current))
+        self.current = []
+        return self.tokens()
+
+
 class String(Iterator[str]):
     left_index: int
     offset: int
@@ -0,0 +1,227 @@
+"""按命中率与内存压力自动调整容量的 LRU 缓存
+
+容量调整基于最近一个采样窗口内的计数:
+因容量被淘汰的键会记入幽灵表 (只保存键), 未命中的键若仍在幽灵表中, 说明容量再大一些就能命中。
+幽灵命中数与查找数之比即为扩容带来的命中率增益估计, 足够大时扩容; 内存超出上限时缩容。
+"""
+
+from __future__ import annotations
+
+import os
+import tracemalloc
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any, Callable, Generic, NamedTuple, TypeVar, overload
+
+from .lru import LRU, LRUStats
+
+__all__ = ("AdaptiveLRU", "AdaptiveStats", "memory_usage")
+
+_KT = TypeVar("_KT", bound=Hashable)
+_VT = TypeVar("_VT")
+_T = TypeVar("_T")
+
+_MISSING: Any = object()
+
+
+def memory_usage() -> int | None:
+    """当前进程的内存占用 (字节)
+
+    优先读取 /proc/self/statm 中的常驻内存, 不可用时使用 tracemalloc 统计的内存 (需已开始追踪),
+    两者都不可用时返回 None。
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    return None
+
+
+class AdaptiveStats(NamedTuple):
+    """`AdaptiveLRU.get_stats` 的返回值"""
+
+    cache: LRUStats
+    """底层 LRU 的统计计数"""
+    ghost_hits: int
+    """未命中但键仍在幽灵表中的次数"""
+    grows: int
+    """扩容次数"""
+    shrinks: int
+    """缩容次数"""
+
+
+class AdaptiveLRU(Generic[_KT, _VT]):
+    """容量随负载自动调整的 LRU 缓存
+
+    每 interval 次查找调用一次 `tune`, 也可以手动调用。每次调整按当前容量的 step 比例增减, 并限制在
+    [min_size, max_size] 之间; 幽灵表的容量等于下一次扩容的增量, 因此幽灵命中率估计的正是下一次扩容的收益。
+
+    Args:
+        size (int): 初始容量
+        min_size (int): 容量下限
+        max_size (int): 容量上限
+        step (float): 每次调整的比例
+        min_gain (float): 扩容所需的最小命中率增益 (幽灵命中数 / 查找数)
+        memory_limit (int, optional): 内存上限 (字节), 超出时缩容, 为 None 时不按内存缩容
+        interval (int): 采样窗口的查找次数
+        memory (Callable, optional): 返回当前内存占用的函数, 默认为 `memory_usage`
+        callback (Callable, optional): 淘汰回调, 参见 `LRU.set_callback`
+        ttl (float, optional): 存活时间 (秒)
+    """
+
+    def __init__(
+        self,
+        size: int,
+        min_size: int = 1,
+        max_size: int | None = None,
+        step: float = 0.25,
+        min_gain: float = 0.01,
+        memory_limit: int | None = None,
+        interval: int = 1000,
+        memory: Callable[[], int | None] = memory_usage,
+        callback: Callable[[_KT, _VT], Any] | None = None,
+        ttl: float | None = None,
+    ) -> None:
+        max_size = size * 4 if max_size is None else max_size
+        if not 1 <= min_size <= size <= max_size:
+            raise ValueError("Size should be between min_size and max_size")
+        if not step > 0:
+            raise ValueError("Step should be a positive number")
+        if interval < 1:
+            raise ValueError("Interval should be a positive number")
+        self._cache: LRU[_KT, _VT] = LRU(size, ttl=ttl)
+        self._cache.set_callback(self._evicted, True)
+        self._ghosts: OrderedDict[_KT, None] = OrderedDict()
+        self._min_size = min_size
+        self._max_size = max_size
+        self._step = step
+        self._min_gain = min_gain
+        self._memory_limit = memory_limit
+        self._interval = interval
+        self._memory = memory
+        self._callback = callback
+        self._lookups = self._window_ghost_hits = 0
+        self._ghost_hits = self._grows = self._shrinks = 0
+
+    def _delta(self) -> int:
+        return max(1, int(self._cache.get_size() * self._step))
+
+    def _evicted(self, key: _KT, value: _VT, reason: str) -> None:
+        if reason == "capacity":
+            self._ghosts[key] = None
+            self._ghosts.move_to_end(key)
+            while len(self._ghosts) > self._delta():
+                self._ghosts.popitem(last=False)
+        if self._callback:
+            self._callback(key, value)
+
+    def _miss(self, key: _KT) -> None:
+        if self._ghosts.pop(key, _MISSING) is not _MISSING:
+            self._window_ghost_hits += 1
+            self._ghost_hits += 1
+
+    def _resize(self, size: int) -> None:
+        self._cache.set_size(size)
+        while len(self._ghosts) > self._delta():
+            self._ghosts.popitem(last=False)
+
+    def tune(self) -> int:
+        """根据当前采样窗口调整容量并开始新的窗口, 返回调整后的容量"""
+        size = self._cache.get_size()
+        lookups, ghost_hits = self._lookups, self._window_ghost_hits
+        self._lookups = self._window_ghost_hits = 0
+        if self._memory_limit is not None:
+            usage = self._memory()
+            # over the limit the cache never grows, and shrinks no further than min_size
+            if usage is not None and usage > self._memory_limit:
+                if size > self._min_size:
+                    self._resize(max(self._min_size, size - self._delta()))
+                    self._shrinks += 1
+                return self._cache.get_size()
+        if lookups and size < self._max_size and ghost_hits / lookups >= self._min_gain:
+            self._resize(min(self._max_size, size + self._delta()))
+            self._grows += 1
+        return self._cache.get_size()
+
+    def _lookup(self, key: _KT) -> Any:
+        value = self._cache.get(key, _MISSING)
+        if value is _MISSING:
+            self._miss(key)
+        self._lookups += 1
+        if self._lookups >= self._interval:
+            self.tune()
+        return value
+
+    @overload
+    def get(self, key: _KT) -> _VT | None: ...
+
+    @overload
+    def get(self, key: _KT, instead: _VT | _T) -> _VT | _T: ...
+
+    def get(self, key: _KT, instead: _VT | _T | None = None) -> _VT | _T | None:
+        value = self._lookup(key)
+        return instead if value is _MISSING else value
+
+    def __getitem__(self, key: _KT) -> _VT:
+        value = self._lookup(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: _KT, value: _VT) -> None:
+        self._ghosts.pop(key, None)
+        self._cache[key] = value
+
+    @overload
+    def setdefault(self: AdaptiveLRU[_KT, _T | None], key: _KT) -> _T | None: ...
+
+    @overload
+    def setdefault(self, key: _KT, default: _VT) -> _VT: ...
+
+    def setdefault(self, key: _KT, default: _VT | None = None):
+        value = self._lookup(key)
+        if value is _MISSING:
+            self[key] = default  # type: ignore
+            return default
+        return value
+
+    @overload
+    def pop(self, key: _KT) -> _VT | None: ...
+
+    @overload
+    def pop(self, key: _KT, default: _VT | _T) -> _VT | _T: ...
+
+    def pop(self, key: _KT, default: _VT | _T | None = None) -> _VT | _T | None:
+        self._ghosts.pop(key, None)
+        return self._cache.pop(key, default)
+
+    def __delitem__(self, key: _KT) -> None:
+        if self.pop(key, _MISSING) is _MISSING:
+            raise KeyError(key)
+
+    def __contains__(self, key: _KT) -> bool:
+        return key in self._cache
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get_size(self) -> int:
+        return self._cache.get_size()
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._ghosts.clear()
+        self._lookups = self._window_ghost_hits = 0
+
+    def get_stats(self) -> AdaptiveStats:
+        return AdaptiveStats(self._cache.get_stats(), self._ghost_hits, self._grows, self._shrinks)
+
+    def reset_stats(self) -> None:
+        self._cache.reset_stats()
+        self._ghost_hits = self._grows = self._shrinks = 0
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({len(self._cache)}/{self._cache.get_size()})"
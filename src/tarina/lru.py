@@ -1,7 +1,15 @@
+from __future__ import annotations
+
+import asyncio
 import os
 import sys
+import threading
+from functools import update_wrapper, wraps
+
+from ._lru_async import discard
+from ._lru_snapshot import PeriodicSnapshot as PeriodicSnapshot
 
-__all__ = ("LRU",)
+__all__ = ("LRU", "EvictionDrainer", "LRUStats", "PeriodicSnapshot", "ShardedLRU", "async_cached", "cached", "make_key")
 
 
 NO_EXTENSIONS = bool(os.environ.get("TARINA_NO_EXTENSIONS"))  # type: bool
@@ -12,7 +20,331 @@ if sys.implementation.name != "cpython":
 if not NO_EXTENSIONS:  # pragma: no branch
     try:
         from ._lru_c import LRU as LRU  # type: ignore[misc]
+        from ._lru_c import CachedFunction  # type: ignore[misc]
+        from ._lru_c import LRUStats as LRUStats  # type: ignore[misc]
+        from ._lru_c import make_key as make_key  # type: ignore[misc]
+
+        _make_stats = LRUStats
     except Exception:  # pragma: no cover
         from ._lru_py import LRU as LRU  # type: ignore[misc]
+        from ._lru_py import CachedFunction  # type: ignore[misc]
+        from ._lru_py import LRUStats as LRUStats  # type: ignore[misc]
+        from ._lru_py import make_key as make_key  # type: ignore[misc]
+
+        _make_stats = LRUStats._make
 else:
     from ._lru_py import LRU as LRU  # type: ignore[misc]
+    from ._lru_py import CachedFunction  # type: ignore[misc]
+    from ._lru_py import LRUStats as LRUStats  # type: ignore[misc]
+    from ._lru_py import make_key as make_key  # type: ignore[misc]
+
+    _make_stats = LRUStats._make
+
+
+_MISSING = object()
+
+
+class ShardedLRU:
+    """线程安全的分片 LRU 缓存
+
+    键按哈希分配到多个相互独立的 `LRU` 分片, 每个分片有自己的锁, 因此不同分片上的操作不会互相阻塞。
+    每个分片各自淘汰, 所以整体的淘汰顺序只在分片内部严格满足 LRU。
+
+    Args:
+        size (int): 总容量, 平均分配给各个分片, 不能小于分片数量
+        shards (int, optional): 分片数量, 默认为 16 与 size 中的较小者
+        callback (Callable, optional): 淘汰回调, 参见 `LRU.set_callback`
+        ttl (float, optional): 默认的存活时间 (秒)
+    """
+
+    __slots__ = ("_shards", "_locks", "_size")
+
+    def __init__(self, size: int, shards: int | None = None, callback=None, ttl: float | None = None):
+        if size < 1:
+            raise ValueError("Size should be a positive number")
+        if shards is None:
+            shards = min(size, 16)
+        if shards < 1:
+            raise ValueError("Shards should be a positive number")
+        self._size = size
+        self._shards = [LRU(shard_size, callback, ttl) for shard_size in self._shard_sizes(size, shards)]
+        self._locks = [threading.RLock() for _ in range(shards)]
+
+    @staticmethod
+    def _shard_sizes(size: int, shards: int) -> list[int]:
+        """将 size 分给各个分片, 前 size % shards 个分片各多分一个, 总和恰好为 size"""
+        if size < shards:
+            raise ValueError("Size should not be less than the number of shards")
+        base, extra = divmod(size, shards)
+        return [base + (index < extra) for index in range(shards)]
+
+    def _shard(self, key):
+        index = hash(key) % len(self._shards)
+        return self._shards[index], self._locks[index]
+
+    def get(self, key, instead=None):
+        shard, lock = self._shard(key)
+        with lock:
+            return shard.get(key, instead)
+
+    def get_or_set(self, key, factory):
+        """获取键对应的值, 不存在时调用 factory() 生成并写入
+
+        整个过程在分片锁内完成, 因此对同一个键并发调用时 factory 只会执行一次。
+        factory 内部可以再次访问本缓存, 但会阻塞同一分片上的其他线程。
+        """
+        shard, lock = self._shard(key)
+        with lock:
+            return shard.get_or_compute(key, factory)
+
+    def setdefault(self, key, default=None):
+        shard, lock = self._shard(key)
+        with lock:
+            return shard.setdefault(key, default)
+
+    def set(self, key, value, ttl: float | None = None) -> None:
+        shard, lock = self._shard(key)
+        with lock:
+            shard.set(key, value, ttl)
+
+    def pop(self, key, default=None):
+        shard, lock = self._shard(key)
+        with lock:
+            return shard.pop(key, default)
+
+    def has_key(self, key) -> bool:
+        shard, lock = self._shard(key)
+        with lock:
+            return key in shard
+
+    __contains__ = has_key
+
+    def __getitem__(self, key):
+        shard, lock = self._shard(key)
+        with lock:
+            return shard[key]
+
+    def __setitem__(self, key, value) -> None:
+        shard, lock = self._shard(key)
+        with lock:
+            shard[key] = value
+
+    def __delitem__(self, key) -> None:
+        shard, lock = self._shard(key)
+        with lock:
+            del shard[key]
+
+    def __len__(self) -> int:
+        total = 0
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                total += len(shard)
+        return total
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(size={self._size}, shards={len(self._shards)}, len={len(self)})"
+
+    def _collect(self, method: str) -> list:
+        result = []
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                result.extend(getattr(shard, method)())
+        return result
+
+    def keys(self) -> list:
+        return self._collect("keys")
+
+    def values(self) -> list:
+        return self._collect("values")
+
+    def items(self) -> list:
+        return self._collect("items")
+
+    def clear(self) -> None:
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                shard.clear()
+
+    def expire(self) -> int:
+        count = 0
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                count += shard.expire()
+        return count
+
+    def get_size(self) -> int:
+        return self._size
+
+    def get_shards(self) -> int:
+        return len(self._shards)
+
+    def set_size(self, size: int) -> None:
+        if size < 1:
+            raise ValueError("Size should be a positive number")
+        for shard, lock, shard_size in zip(self._shards, self._locks, self._shard_sizes(size, len(self._shards))):
+            with lock:
+                shard.set_size(shard_size)
+        self._size = size
+
+    def set_callback(self, callback, reason: bool = False, batch: int | None = None) -> None:
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                shard.set_callback(callback, reason, batch)
+
+    def drain(self) -> int:
+        """将各分片缓冲的淘汰条目交给回调, 每个分片一批, 返回条目总数"""
+        count = 0
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                count += shard.drain()
+        return count
+
+    def get_stats(self) -> LRUStats:
+        """汇总所有分片的统计计数"""
+        totals = [0, 0, 0, 0, 0]
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                for i, count in enumerate(shard.get_stats()):
+                    totals[i] += count
+        return _make_stats(totals)
+
+    def reset_stats(self) -> None:
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                shard.reset_stats()
+
+
+class EvictionDrainer:
+    """定期调用缓存的 drain(), 让批量淘汰回调在插入路径之外执行
+
+    配合 `LRU.set_callback(callback, batch=n)` 使用, 可以用 start/stop 在后台线程中运行,
+    也可以将 `run()` 作为 asyncio 任务运行。停止时会再 drain 一次, 缓冲区中的条目不会丢失。
+
+    Args:
+        cache: 需要 drain 的 `LRU` 或 `ShardedLRU`
+        interval (float): 两次 drain 之间的间隔 (秒)
+        on_error (Callable, optional): 回调抛出异常时以异常为参数调用
+    """
+
+    def __init__(self, cache, interval: float, on_error=None) -> None:
+        if not interval > 0:
+            raise ValueError("Interval should be a positive number")
+        self.cache = cache
+        self.interval = interval
+        self.on_error = on_error
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def drain(self) -> int:
+        """立即 drain 一次, 返回交给回调的条目数, 回调失败时返回 0"""
+        try:
+            return self.cache.drain()
+        except Exception as e:
+            if self.on_error:
+                self.on_error(e)
+            return 0
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.drain()
+
+    def start(self) -> EvictionDrainer:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="lru-drain", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """停止后台线程并 drain 剩余的条目"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.drain()
+
+    async def run(self) -> None:
+        """在当前事件循环中定期 drain, 直到任务被取消"""
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                self.drain()
+        finally:
+            self.drain()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def cached(size: int, typed: bool = False, callback=None):
+    """以 `LRU` 为存储的函数缓存装饰器, 可替代 `functools.lru_cache`
+
+    缓存键的构造方式与 `functools.lru_cache` 相同, C 扩展可用时在 C 中完成。
+
+    Args:
+        size (int): 缓存容量
+        typed (bool): 为真时不同类型的参数分别缓存, 例如 f(1) 与 f(1.0)
+        callback (Callable, optional): 淘汰回调, 以缓存键与结果为参数调用
+
+    被装饰的函数额外提供:
+        cache: 底层的 `LRU` 实例, 可用于 set_size, get_stats 等
+        peek(*args, **kwargs): 获取对应参数的缓存结果而不改变使用顺序, 未缓存时返回 None
+        invalidate(*args, **kwargs): 删除对应参数的缓存, 返回是否存在
+        cache_clear(): 清空缓存
+    """
+
+    def decorator(func):
+        return update_wrapper(CachedFunction(func, size, typed, callback), func)
+
+    return decorator
+
+
+def async_cached(size: int, ttl: float | None = None, key=None, callback=None):
+    """以 `LRU` 为存储的异步函数缓存装饰器
+
+    结果经 `LRU.aget_or_compute` 写入, 同一事件循环中相同键的并发调用会共享同一个正在执行的任务,
+    因此缓存未命中时后端只会被调用一次。调用失败时结果不会被缓存, 等待中的调用者都会收到同一个异常。
+
+    Args:
+        size (int): 缓存容量
+        ttl (float, optional): 结果的存活时间 (秒)
+        key (Callable, optional): 由调用参数生成缓存键的函数, 默认使用 `make_key`
+        callback (Callable, optional): 淘汰回调, 参见 `LRU.set_callback`
+
+    被装饰的函数额外提供:
+        cache: 底层的 `LRU` 实例
+        invalidate(*args, **kwargs): 删除对应参数的缓存, 正在执行的调用结果也不会再被写入
+        cache_clear(): 清空缓存
+    """
+
+    def decorator(func):
+        # guard caches its checks with `cached`, so it can only be imported lazily
+        from .guard import is_coroutinefunction
+
+        if not is_coroutinefunction(func):
+            raise TypeError(f"{func!r} is not a coroutine function")
+        cache = LRU(size, callback, ttl)
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            k = key(*args, **kwargs) if key else make_key(args, kwargs)
+            return await cache.aget_or_compute(k, lambda: func(*args, **kwargs))
+
+        def invalidate(*args, **kwargs) -> bool:
+            k = key(*args, **kwargs) if key else make_key(args, kwargs)
+            in_flight = discard(cache, k)
+            return cache.pop(k, _MISSING) is not _MISSING or in_flight
+
+        def cache_clear() -> None:
+            discard(cache)
+            cache.clear()
+
+        wrapper.cache = cache  # type: ignore
+        wrapper.invalidate = invalidate  # type: ignore
+        wrapper.cache_clear = cache_clear  # type: ignore
+        return wrapper
+
+    return decorator
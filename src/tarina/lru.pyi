@@ -1,25 +1,75 @@
-from collections.abc import Hashable, Iterable
-from typing import Any, Callable, Generic, TypeVar, overload
+from collections.abc import Awaitable, Coroutine, Hashable, Iterable, Iterator, Mapping
+from os import PathLike
+from typing import IO, Any, Callable, Generic, Literal, NamedTuple, TypeVar, overload
+from typing_extensions import ParamSpec, Self
 
 _KT = TypeVar("_KT", bound=Hashable)
 _VT = TypeVar("_VT")
 _T = TypeVar("_T")
+_R = TypeVar("_R")
+_P = ParamSpec("_P")
+
+class LRUStats(NamedTuple):
+    hits: int
+    misses: int
+    inserts: int
+    updates: int
+    evictions: int
 
 class LRU(Generic[_KT, _VT]):
     @overload
-    def __init__(self, size: int, callback: None = None) -> None: ...
+    def __init__(
+        self,
+        size: int,
+        callback: None = None,
+        ttl: float | None = None,
+        max_weight: int | None = None,
+        weigher: Callable[[_KT, _VT], int] | None = None,
+    ) -> None: ...
     @overload
-    def __init__(self, size: int, callback: Callable[[_KT, _VT], Any]) -> None: ...
+    def __init__(
+        self,
+        size: int,
+        callback: Callable[[_KT, _VT], Any],
+        ttl: float | None = None,
+        max_weight: int | None = None,
+        weigher: Callable[[_KT, _VT], int] | None = None,
+    ) -> None: ...
     def clear(self) -> None: ...
+    def dump(self, file: str | PathLike[str] | IO[bytes], codec: Any = ..., hottest: int | None = None) -> int: ...
+    @classmethod
+    def load(
+        cls, file: str | PathLike[str] | IO[bytes], codec: Any = ..., size: int | None = None, **kwargs: Any
+    ) -> LRU[Any, Any]: ...
     @overload
     def get(self, key: _KT) -> _VT: ...
     @overload
     def get(self, key: _KT, instead: _VT | _T) -> _VT | _T: ...
+    def get_or_compute(self, key: _KT, factory: Callable[[], _VT]) -> _VT: ...
+    def aget_or_compute(self, key: _KT, factory: Callable[[], Awaitable[_VT]]) -> Coroutine[Any, Any, _VT]: ...
+    @overload
+    def peek(self, key: _KT) -> _VT | None: ...
+    @overload
+    def peek(self, key: _KT, instead: _VT | _T) -> _VT | _T: ...
+    @overload
+    def get_many(self, keys: Iterable[_KT]) -> list[_VT | None]: ...
+    @overload
+    def get_many(self, keys: Iterable[_KT], instead: _T) -> list[_VT | _T]: ...
+    def set_many(self, pairs: Mapping[_KT, _VT] | Iterable[tuple[_KT, _VT]], /) -> None: ...
+    def pop_many(self, keys: Iterable[_KT], /) -> dict[_KT, _VT]: ...
     def get_size(self) -> int: ...
+    def get_max_weight(self) -> int | None: ...
+    def get_weight(self) -> int: ...
+    def get_stats(self) -> LRUStats: ...
+    def reset_stats(self) -> None: ...
+    def get_ttl(self) -> float | None: ...
     def has_key(self, key: _KT) -> bool: ...
     def keys(self) -> list[_KT]: ...
     def values(self) -> list[_VT]: ...
     def items(self) -> list[tuple[_KT, _VT]]: ...
+    def iterkeys(self, reverse: bool = False) -> Iterator[_KT]: ...
+    def itervalues(self, reverse: bool = False) -> Iterator[_VT]: ...
+    def iteritems(self, reverse: bool = False) -> Iterator[tuple[_KT, _VT]]: ...
     def peek_first_item(self) -> tuple[_KT, _VT] | None: ...
     def peek_last_item(self) -> tuple[_KT, _VT] | None: ...
     @overload
@@ -27,12 +77,34 @@ class LRU(Generic[_KT, _VT]):
     @overload
     def pop(self, key: _KT, default: _VT | _T) -> _VT | _T: ...
     def popitem(self, least_recent: bool = ...) -> tuple[_KT, _VT]: ...
+    def set(self, key: _KT, value: _VT, ttl: float | None = None, priority: int | None = None) -> None: ...
+    def peek_ttl(self, key: _KT) -> float | None: ...
+    def pin(self, key: _KT) -> None: ...
+    def unpin(self, key: _KT) -> None: ...
+    def expire(self) -> int: ...
     @overload
     def setdefault(self: LRU[_KT, _T | None], key: _KT) -> _T | None: ...
     @overload
     def setdefault(self, key: _KT, default: _VT) -> _VT: ...
-    def set_callback(self, callback: Callable[[_KT, _VT], Any]) -> None: ...
+    @overload
+    def set_callback(
+        self, callback: Callable[[_KT, _VT], Any] | None, reason: Literal[False] = False, batch: None = None
+    ) -> None: ...
+    @overload
+    def set_callback(
+        self, callback: Callable[[_KT, _VT, str], Any] | None, reason: Literal[True], batch: None = None
+    ) -> None: ...
+    @overload
+    def set_callback(
+        self, callback: Callable[[list[tuple[_KT, _VT]]], Any] | None, reason: Literal[False] = False, *, batch: int
+    ) -> None: ...
+    @overload
+    def set_callback(
+        self, callback: Callable[[list[tuple[_KT, _VT, str]]], Any] | None, reason: Literal[True], batch: int
+    ) -> None: ...
+    def drain(self) -> int: ...
     def set_size(self, size: int) -> None: ...
+    def set_max_weight(self, max_weight: int | None) -> None: ...
     @overload
     def update(self, m: Iterable[tuple[_KT, _VT]], /, **kwargs: _VT) -> None: ...
     @overload
@@ -42,3 +114,133 @@ class LRU(Generic[_KT, _VT]):
     def __getitem__(self, item: _KT) -> _VT: ...
     def __len__(self) -> int: ...
     def __setitem__(self, key: _KT, value: _VT) -> None: ...
+
+class ShardedLRU(Generic[_KT, _VT]):
+    def __init__(
+        self,
+        size: int,
+        shards: int | None = None,
+        callback: Callable[[_KT, _VT], Any] | None = None,
+        ttl: float | None = None,
+    ) -> None: ...
+    @overload
+    def get(self, key: _KT) -> _VT | None: ...
+    @overload
+    def get(self, key: _KT, instead: _VT | _T) -> _VT | _T: ...
+    def get_or_set(self, key: _KT, factory: Callable[[], _VT]) -> _VT: ...
+    @overload
+    def setdefault(self: ShardedLRU[_KT, _T | None], key: _KT) -> _T | None: ...
+    @overload
+    def setdefault(self, key: _KT, default: _VT) -> _VT: ...
+    def set(self, key: _KT, value: _VT, ttl: float | None = None) -> None: ...
+    @overload
+    def pop(self, key: _KT) -> _VT | None: ...
+    @overload
+    def pop(self, key: _KT, default: _VT | _T) -> _VT | _T: ...
+    def has_key(self, key: _KT) -> bool: ...
+    def keys(self) -> list[_KT]: ...
+    def values(self) -> list[_VT]: ...
+    def items(self) -> list[tuple[_KT, _VT]]: ...
+    def clear(self) -> None: ...
+    def expire(self) -> int: ...
+    def get_size(self) -> int: ...
+    def get_shards(self) -> int: ...
+    def set_size(self, size: int) -> None: ...
+    @overload
+    def set_callback(
+        self, callback: Callable[[_KT, _VT], Any] | None, reason: Literal[False] = False, batch: None = None
+    ) -> None: ...
+    @overload
+    def set_callback(
+        self, callback: Callable[[_KT, _VT, str], Any] | None, reason: Literal[True], batch: None = None
+    ) -> None: ...
+    @overload
+    def set_callback(
+        self, callback: Callable[[list[tuple[_KT, _VT]]], Any] | None, reason: Literal[False] = False, *, batch: int
+    ) -> None: ...
+    @overload
+    def set_callback(
+        self, callback: Callable[[list[tuple[_KT, _VT, str]]], Any] | None, reason: Literal[True], batch: int
+    ) -> None: ...
+    def drain(self) -> int: ...
+    def get_stats(self) -> LRUStats: ...
+    def reset_stats(self) -> None: ...
+    def __contains__(self, o: Any, /) -> bool: ...
+    def __delitem__(self, key: _KT) -> None: ...
+    def __getitem__(self, item: _KT) -> _VT: ...
+    def __len__(self) -> int: ...
+    def __setitem__(self, key: _KT, value: _VT) -> None: ...
+
+class CachedFunction(Generic[_P, _R]):
+    cache: LRU[Hashable, _R]
+    def __init__(
+        self,
+        func: Callable[_P, _R],
+        size: int,
+        typed: bool = False,
+        callback: Callable[[Hashable, _R], Any] | None = None,
+    ) -> None: ...
+    def __call__(self, *args: _P.args, **kwargs: _P.kwargs) -> _R: ...
+    def __get__(self, instance: object, owner: type | None = None) -> Any: ...
+    def peek(self, *args: _P.args, **kwargs: _P.kwargs) -> _R | None: ...
+    def invalidate(self, *args: _P.args, **kwargs: _P.kwargs) -> bool: ...
+    def cache_clear(self) -> None: ...
+
+def make_key(args: tuple[Any, ...], kwargs: dict[str, Any] | None = None, typed: bool = False) -> Hashable: ...
+def cached(
+    size: int, typed: bool = False, callback: Callable[[Hashable, Any], Any] | None = None
+) -> Callable[[Callable[_P, _R]], CachedFunction[_P, _R]]: ...
+
+class _AsyncCached(Generic[_P, _R]):
+    cache: LRU[Any, _R]
+    def __call__(self, *args: _P.args, **kwargs: _P.kwargs) -> Coroutine[Any, Any, _R]: ...
+    def invalidate(self, *args: _P.args, **kwargs: _P.kwargs) -> bool: ...
+    def cache_clear(self) -> None: ...
+
+def async_cached(
+    size: int,
+    ttl: float | None = None,
+    key: Callable[..., Hashable] | None = None,
+    callback: Callable[[Any, Any], Any] | None = None,
+) -> Callable[[Callable[_P, Coroutine[Any, Any, _R]]], _AsyncCached[_P, _R]]: ...
+
+class PeriodicSnapshot:
+    cache: LRU[Any, Any]
+    path: str | PathLike[str]
+    interval: float
+    codec: Any
+    hottest: int | None
+    lock: Any
+    on_error: Callable[[BaseException], Any] | None
+    def __init__(
+        self,
+        cache: LRU[Any, Any],
+        path: str | PathLike[str],
+        interval: float,
+        codec: Any = ...,
+        hottest: int | None = None,
+        lock: Any = None,
+        on_error: Callable[[BaseException], Any] | None = None,
+    ) -> None: ...
+    def snapshot(self) -> bool: ...
+    def start(self) -> PeriodicSnapshot: ...
+    def stop(self, final: bool = True) -> None: ...
+    def __enter__(self) -> Self: ...
+    def __exit__(self, *exc_info: object) -> None: ...
+
+class EvictionDrainer:
+    cache: LRU[Any, Any] | ShardedLRU[Any, Any]
+    interval: float
+    on_error: Callable[[BaseException], Any] | None
+    def __init__(
+        self,
+        cache: LRU[Any, Any] | ShardedLRU[Any, Any],
+        interval: float,
+        on_error: Callable[[BaseException], Any] | None = None,
+    ) -> None: ...
+    def drain(self) -> int: ...
+    def start(self) -> EvictionDrainer: ...
+    def stop(self) -> None: ...
+    async def run(self) -> None: ...
+    def __enter__(self) -> Self: ...
+    def __exit__(self, *exc_info: object) -> None: ...
@@ -0,0 +1,42 @@
+"""除 LRU 以外的缓存淘汰策略
+
+这里的缓存与 `tarina.LRU` 有相同的映射接口, 但在存在周期性全量扫描等访问模式时有更高的命中率:
+
+- `S3FIFO`: 小 FIFO + 主 FIFO + 幽灵队列, 只访问一次的键会很快离开缓存
+- `TwoQueue`: 2Q 算法, 新键先进入 FIFO, 再次被访问时才进入 LRU
+- `ARC`: 自适应替换缓存, 根据幽灵命中在近期性与频率之间自动调整
+- `TinyLFU`: W-TinyLFU, 以 count-min sketch 估计访问频率作为主缓存的准入条件
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+__all__ = ("ARC", "S3FIFO", "CachePolicy", "TinyLFU", "TwoQueue")
+
+
+NO_EXTENSIONS = bool(os.environ.get("TARINA_NO_EXTENSIONS"))  # type: bool
+if sys.implementation.name != "cpython":
+    NO_EXTENSIONS = True
+
+
+if not NO_EXTENSIONS:  # pragma: no branch
+    try:
+        from ._policy_c import ARC as ARC  # type: ignore[misc]
+        from ._policy_c import S3FIFO as S3FIFO  # type: ignore[misc]
+        from ._policy_c import CachePolicy as CachePolicy  # type: ignore[misc]
+        from ._policy_c import TinyLFU as TinyLFU  # type: ignore[misc]
+        from ._policy_c import TwoQueue as TwoQueue  # type: ignore[misc]
+    except ImportError:  # pragma: no cover
+        from ._policy_py import ARC as ARC
+        from ._policy_py import S3FIFO as S3FIFO
+        from ._policy_py import CachePolicy as CachePolicy
+        from ._policy_py import TinyLFU as TinyLFU
+        from ._policy_py import TwoQueue as TwoQueue
+else:
+    from ._policy_py import ARC as ARC
+    from ._policy_py import S3FIFO as S3FIFO
+    from ._policy_py import CachePolicy as CachePolicy
+    from ._policy_py import TinyLFU as TinyLFU
+    from ._policy_py import TwoQueue as TwoQueue
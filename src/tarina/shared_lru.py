@@ -0,0 +1,425 @@
+"""跨进程共享的 LRU 缓存
+
+`SharedLRU` 将定长槽位、哈希索引与最近使用链表全部放在一块 `multiprocessing.shared_memory` 中,
+由一把进程间的锁保护, 因此 fork 出的多个 worker 可以共用同一份缓存。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib
+import multiprocessing
+import pickle
+import struct
+from collections.abc import Hashable, Iterable
+from multiprocessing.shared_memory import SharedMemory
+from types import ModuleType
+from typing import Any, Callable, Generic, TypeVar, overload
+
+from .lru import LRUStats, _make_stats
+
+__all__ = ("SharedLRU",)
+
+_KT = TypeVar("_KT", bound=Hashable)
+_VT = TypeVar("_VT")
+_T = TypeVar("_T")
+
+_MISSING: Any = object()
+_MAGIC = 0x4C5255_5348_4D31  # "LRUSHM1"
+
+# magic, size, slot_size, buckets, head, tail, count, free, hits, misses, inserts, updates, evictions
+_HEADER = struct.Struct("<13q")
+# hash, prev, next, chain, key length, value length
+_SLOT = struct.Struct("<Qqqqii")
+_INDEX = struct.Struct("<q")
+
+_HEAD, _TAIL, _COUNT, _FREE = 4, 5, 6, 7
+_HITS, _MISSES, _INSERTS, _UPDATES, _EVICTIONS = 8, 9, 10, 11, 12
+
+
+def _attach(name: str) -> SharedMemory:
+    try:
+        return SharedMemory(name, track=False)  # type: ignore[call-arg]
+    except TypeError:  # pragma: no cover
+        # before 3.13 attaching registers the block again, which is harmless as child
+        # processes share the resource tracker of the creator
+        return SharedMemory(name)
+
+
+class SharedLRU(Generic[_KT, _VT]):
+    """存放在共享内存中的 LRU 缓存
+
+    键与值经 codec 序列化后存入定长槽位, 键按序列化结果比较, 因此键的序列化结果需要是确定的
+    (例如 str、bytes、int 以及它们组成的 tuple)。
+    在 fork worker 之前创建即可在所有 worker 中使用; 也可以作为参数传给以 spawn 方式启动的子进程。
+
+    Args:
+        size (int): 槽位数量, 即最多能存放的条目数
+        slot_size (int): 每个槽位可存放的键与值序列化后的总字节数
+        callback (Callable, optional): 淘汰回调, 在执行淘汰的进程中调用
+        codec (Any): 提供 dumps 与 loads 的序列化模块, 默认为 pickle
+        name (str, optional): 共享内存块的名称
+        context (Any, optional): 用于创建进程锁的 multiprocessing 上下文
+    """
+
+    def __init__(
+        self,
+        size: int,
+        slot_size: int = 256,
+        callback: Callable[[_KT, _VT], Any] | None = None,
+        codec: Any = pickle,
+        name: str | None = None,
+        context: Any = None,
+    ) -> None:
+        if size < 1:
+            raise ValueError("Size should be a positive number")
+        if slot_size < 1:
+            raise ValueError("Slot size should be a positive number")
+        buckets = 1 << (2 * size - 1).bit_length()
+        total = _HEADER.size + buckets * _INDEX.size + size * (_SLOT.size + slot_size)
+        self._shm = SharedMemory(name, create=True, size=total)
+        self._owner = True
+        self._lock = (context or multiprocessing.get_context()).Lock()
+        _HEADER.pack_into(self._shm.buf, 0, _MAGIC, size, slot_size, buckets, -1, -1, 0, 0, 0, 0, 0, 0, 0)
+        self._setup(codec, callback)
+        for i in range(buckets):
+            _INDEX.pack_into(self._buf, self._buckets_offset + i * _INDEX.size, -1)
+        self._reset_slots()
+
+    def _setup(self, codec: Any, callback: Callable[[_KT, _VT], Any] | None) -> None:
+        self._codec = codec
+        self._callback = callback
+        self._buf = self._shm.buf
+        magic, self._size, self._slot_size, self._nbuckets, *_ = _HEADER.unpack_from(self._buf, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"shared memory {self._shm.name!r} does not hold a SharedLRU")
+        self._buckets_offset = _HEADER.size
+        self._slots_offset = self._buckets_offset + self._nbuckets * _INDEX.size
+        self._stride = _SLOT.size + self._slot_size
+
+    def __getstate__(self):
+        # modules such as pickle or json cannot be pickled themselves
+        codec = self._codec.__name__ if isinstance(self._codec, ModuleType) else self._codec
+        return self._shm.name, self._lock, codec, self._callback
+
+    def __setstate__(self, state):
+        name, self._lock, codec, callback = state
+        if isinstance(codec, str):
+            codec = importlib.import_module(codec)
+        self._shm = _attach(name)
+        self._owner = False
+        self._setup(codec, callback)
+
+    @property
+    def name(self) -> str:
+        """共享内存块的名称"""
+        return self._shm.name
+
+    def close(self) -> None:
+        """断开与共享内存的连接, 不会销毁其中的数据"""
+        self._buf = None  # type: ignore
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """销毁共享内存块, 应在所有进程都不再使用后由创建者调用"""
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+        if self._owner:
+            self.unlink()
+
+    # --- layout helpers, callers must hold the lock ---
+
+    def _field(self, index: int) -> int:
+        return _INDEX.unpack_from(self._buf, index * 8)[0]
+
+    def _set_field(self, index: int, value: int) -> None:
+        _INDEX.pack_into(self._buf, index * 8, value)
+
+    def _bump(self, index: int) -> None:
+        self._set_field(index, self._field(index) + 1)
+
+    def _bucket(self, h: int) -> int:
+        return self._buckets_offset + (h & (self._nbuckets - 1)) * _INDEX.size
+
+    def _slot(self, i: int) -> tuple[int, int, int, int, int, int]:
+        return _SLOT.unpack_from(self._buf, self._slots_offset + i * self._stride)
+
+    def _set_slot(self, i: int, h: int, prev: int, next_: int, chain: int, klen: int, vlen: int) -> None:
+        _SLOT.pack_into(self._buf, self._slots_offset + i * self._stride, h, prev, next_, chain, klen, vlen)
+
+    def _data(self, i: int) -> int:
+        return self._slots_offset + i * self._stride + _SLOT.size
+
+    def _reset_slots(self) -> None:
+        for i in range(self._size):
+            self._set_slot(i, 0, -1, i + 1 if i + 1 < self._size else -1, -1, 0, 0)
+        self._set_field(_FREE, 0)
+
+    def _find(self, h: int, key: bytes) -> int:
+        i = _INDEX.unpack_from(self._buf, self._bucket(h))[0]
+        while i != -1:
+            sh, _, _, chain, klen, _ = self._slot(i)
+            if sh == h and klen == len(key):
+                start = self._data(i)
+                if self._buf[start : start + klen] == key:
+                    return i
+            i = chain
+        return -1
+
+    def _detach(self, i: int) -> None:
+        _, prev, next_, _, _, _ = self._slot(i)
+        if prev == -1:
+            self._set_field(_HEAD, next_)
+        else:
+            ph, pp, _, pc, pk, pv = self._slot(prev)
+            self._set_slot(prev, ph, pp, next_, pc, pk, pv)
+        if next_ == -1:
+            self._set_field(_TAIL, prev)
+        else:
+            nh, _, nn, nc, nk, nv = self._slot(next_)
+            self._set_slot(next_, nh, prev, nn, nc, nk, nv)
+
+    def _push_front(self, i: int) -> None:
+        h, _, _, chain, klen, vlen = self._slot(i)
+        head = self._field(_HEAD)
+        self._set_slot(i, h, -1, head, chain, klen, vlen)
+        if head == -1:
+            self._set_field(_TAIL, i)
+        else:
+            hh, _, hn, hc, hk, hv = self._slot(head)
+            self._set_slot(head, hh, i, hn, hc, hk, hv)
+        self._set_field(_HEAD, i)
+
+    def _unindex(self, i: int) -> None:
+        h, _, _, chain, _, _ = self._slot(i)
+        offset = self._bucket(h)
+        j = _INDEX.unpack_from(self._buf, offset)[0]
+        if j == i:
+            _INDEX.pack_into(self._buf, offset, chain)
+            return
+        while j != -1:
+            jh, jp, jn, jc, jk, jv = self._slot(j)
+            if jc == i:
+                self._set_slot(j, jh, jp, jn, chain, jk, jv)
+                return
+            j = jc
+
+    def _entry(self, i: int) -> tuple[bytes, bytes]:
+        _, _, _, _, klen, vlen = self._slot(i)
+        start = self._data(i)
+        return bytes(self._buf[start : start + klen]), bytes(self._buf[start + klen : start + klen + vlen])
+
+    def _release(self, i: int) -> tuple[bytes, bytes]:
+        """将槽位从索引与链表中移除并放回空闲链表, 返回其中键与值的字节"""
+        entry = self._entry(i)
+        self._unindex(i)
+        self._detach(i)
+        self._set_slot(i, 0, -1, self._field(_FREE), -1, 0, 0)
+        self._set_field(_FREE, i)
+        self._set_field(_COUNT, self._field(_COUNT) - 1)
+        return entry
+
+    def _lookup(self, key: _KT) -> tuple[int, bytes]:
+        kb = self._codec.dumps(key)
+        return int.from_bytes(hashlib.blake2b(kb, digest_size=8).digest(), "little"), kb
+
+    def _read(self, i: int) -> bytes:
+        _, _, _, _, klen, vlen = self._slot(i)
+        start = self._data(i) + klen
+        return bytes(self._buf[start : start + vlen])
+
+    def _store(self, h: int, kb: bytes, value: _VT, evicted: list) -> None:
+        vb = self._codec.dumps(value)
+        if len(kb) + len(vb) > self._slot_size:
+            raise ValueError(f"entry of {len(kb) + len(vb)} bytes exceeds slot size {self._slot_size}")
+        i = self._find(h, kb)
+        if i != -1:
+            sh, prev, next_, chain, klen, _ = self._slot(i)
+            self._set_slot(i, sh, prev, next_, chain, klen, len(vb))
+            start = self._data(i) + klen
+            self._buf[start : start + len(vb)] = vb
+            self._detach(i)
+            self._push_front(i)
+            self._bump(_UPDATES)
+            return
+        if self._field(_FREE) == -1:
+            evicted.append(self._release(self._field(_TAIL)))
+            self._bump(_EVICTIONS)
+        i = self._field(_FREE)
+        self._set_field(_FREE, self._slot(i)[2])
+        offset = self._bucket(h)
+        self._set_slot(i, h, -1, -1, _INDEX.unpack_from(self._buf, offset)[0], len(kb), len(vb))
+        _INDEX.pack_into(self._buf, offset, i)
+        start = self._data(i)
+        self._buf[start : start + len(kb)] = kb
+        self._buf[start + len(kb) : start + len(kb) + len(vb)] = vb
+        self._push_front(i)
+        self._set_field(_COUNT, self._field(_COUNT) + 1)
+        self._bump(_INSERTS)
+
+    def _notify(self, evicted: list) -> None:
+        if self._callback:
+            loads = self._codec.loads
+            for kb, vb in evicted:
+                self._callback(loads(kb), loads(vb))
+
+    # --- mapping API ---
+
+    @overload
+    def get(self, key: _KT) -> _VT | None: ...
+
+    @overload
+    def get(self, key: _KT, instead: _VT | _T) -> _VT | _T: ...
+
+    def get(self, key: _KT, instead: _VT | _T | None = None) -> _VT | _T | None:
+        h, kb = self._lookup(key)
+        with self._lock:
+            i = self._find(h, kb)
+            if i == -1:
+                self._bump(_MISSES)
+                return instead
+            self._detach(i)
+            self._push_front(i)
+            self._bump(_HITS)
+            data = self._read(i)
+        return self._codec.loads(data)
+
+    def __getitem__(self, key: _KT) -> _VT:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: _KT, value: _VT) -> None:
+        h, kb = self._lookup(key)
+        evicted: list = []
+        with self._lock:
+            self._store(h, kb, value, evicted)
+        self._notify(evicted)
+
+    @overload
+    def setdefault(self: SharedLRU[_KT, _T | None], key: _KT) -> _T | None: ...
+
+    @overload
+    def setdefault(self, key: _KT, default: _VT) -> _VT: ...
+
+    def setdefault(self, key: _KT, default: _VT | None = None):
+        h, kb = self._lookup(key)
+        evicted: list = []
+        with self._lock:
+            i = self._find(h, kb)
+            if i != -1:
+                self._detach(i)
+                self._push_front(i)
+                self._bump(_HITS)
+                data = self._read(i)
+            else:
+                self._bump(_MISSES)
+                self._store(h, kb, default, evicted)  # type: ignore
+        if i == -1:
+            self._notify(evicted)
+            return default
+        return self._codec.loads(data)
+
+    def update(self, *args, **kwargs) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    @overload
+    def pop(self, key: _KT) -> _VT | None: ...
+
+    @overload
+    def pop(self, key: _KT, default: _VT | _T) -> _VT | _T: ...
+
+    def pop(self, key: _KT, default: _VT | _T | None = None) -> _VT | _T | None:
+        h, kb = self._lookup(key)
+        with self._lock:
+            i = self._find(h, kb)
+            if i == -1:
+                return default
+            _, data = self._release(i)
+        return self._codec.loads(data)
+
+    def __delitem__(self, key: _KT) -> None:
+        if self.pop(key, _MISSING) is _MISSING:
+            raise KeyError(key)
+
+    def has_key(self, key: _KT) -> bool:
+        h, kb = self._lookup(key)
+        with self._lock:
+            return self._find(h, kb) != -1
+
+    __contains__ = has_key
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._field(_COUNT)
+
+    def _entries(self, end: int, step: int, limit: int = -1) -> list[tuple[bytes, bytes]]:
+        result = []
+        with self._lock:
+            i = self._field(end)
+            while i != -1 and limit:
+                _, prev, next_, _, _, _ = self._slot(i)
+                result.append(self._entry(i))
+                i = next_ if step > 0 else prev
+                limit -= 1
+        return result
+
+    def keys(self) -> list[_KT]:
+        return [self._codec.loads(kb) for kb, _ in self._entries(_HEAD, 1)]
+
+    def values(self) -> list[_VT]:
+        return [self._codec.loads(vb) for _, vb in self._entries(_HEAD, 1)]
+
+    def items(self) -> list[tuple[_KT, _VT]]:
+        loads = self._codec.loads
+        return [(loads(kb), loads(vb)) for kb, vb in self._entries(_HEAD, 1)]
+
+    def peek_first_item(self) -> tuple[_KT, _VT] | None:
+        entries = self._entries(_HEAD, 1, 1)
+        return (self._codec.loads(entries[0][0]), self._codec.loads(entries[0][1])) if entries else None
+
+    def peek_last_item(self) -> tuple[_KT, _VT] | None:
+        entries = self._entries(_TAIL, -1, 1)
+        return (self._codec.loads(entries[0][0]), self._codec.loads(entries[0][1])) if entries else None
+
+    def get_many(self, keys: Iterable[_KT], instead: _T | None = None) -> list[_VT | _T | None]:
+        return [self.get(key, instead) for key in keys]
+
+    def clear(self) -> None:
+        with self._lock:
+            for i in range(self._nbuckets):
+                _INDEX.pack_into(self._buf, self._buckets_offset + i * _INDEX.size, -1)
+            self._reset_slots()
+            self._set_field(_HEAD, -1)
+            self._set_field(_TAIL, -1)
+            self._set_field(_COUNT, 0)
+
+    def get_size(self) -> int:
+        return self._size
+
+    def get_slot_size(self) -> int:
+        return self._slot_size
+
+    def set_callback(self, callback: Callable[[_KT, _VT], Any] | None) -> None:
+        """设置当前进程中的淘汰回调"""
+        self._callback = callback
+
+    def get_stats(self) -> LRUStats:
+        """所有进程共享的统计计数"""
+        with self._lock:
+            return _make_stats(tuple(self._field(i) for i in range(_HITS, _EVICTIONS + 1)))
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for i in range(_HITS, _EVICTIONS + 1):
+                self._set_field(i, 0)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._shm.name!r}, size={self._size}, len={len(self)})"
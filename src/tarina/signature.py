@@ -6,8 +6,10 @@ import sys
 from collections.abc import Mapping
 from typing import Any, Callable
 
+from .lru import cached
 
-@functools.lru_cache(4096)
+
+@cached(4096)
 def get_signature(target: Callable):
     return inspect.signature(target).parameters.values()
 
@@ -64,7 +66,7 @@ except ImportError:
         }
 
 
-@functools.lru_cache(4096)
+@cached(4096)
 def signatures(callable_target: Callable) -> list[tuple[str, Any, Any]]:
     callable_annotation = get_annotations(callable_target, eval_str=True)
     return [
@@ -1,7 +1,21 @@
+from __future__ import annotations
+
 import os
 import sys
+from collections.abc import Iterator
+from typing import IO
 
-__all__ = ("split", "split_once", "split_once_without_escape", "split_once_index_only", "String")
+__all__ = (
+    "split",
+    "split_once",
+    "split_once_without_escape",
+    "split_once_index_only",
+    "String",
+    "Tokenizer",
+    "iter_split",
+    "split_many",
+    "split_spans",
+)
 
 
 NO_EXTENSIONS = bool(os.environ.get("TARINA_NO_EXTENSIONS"))  # type: bool
@@ -13,7 +27,9 @@ if not NO_EXTENSIONS:  # pragma: no branch
     try:
         from ._string_c import QUOTATION as QUOTATION  # type: ignore[misc]
         from ._string_c import String as String  # type: ignore[misc]
+        from ._string_c import Tokenizer as Tokenizer  # type: ignore[misc]
         from ._string_c import split as split  # type: ignore[misc]
+        from ._string_c import split_many as split_many  # type: ignore[misc]
         from ._string_c import split_once as split_once  # type: ignore[misc]
         from ._string_c import (
             split_once_index_only as split_once_index_only,  # type: ignore[misc]
@@ -21,17 +37,43 @@ if not NO_EXTENSIONS:  # pragma: no branch
         from ._string_c import (
             split_once_without_escape as split_once_without_escape,  # type: ignore[misc]
         )
+        from ._string_c import split_spans as split_spans  # type: ignore[misc]
     except ImportError:  # pragma: no cover
         from ._string_py import QUOTATION as QUOTATION
         from ._string_py import String as String
+        from ._string_py import Tokenizer as Tokenizer
         from ._string_py import split as split
+        from ._string_py import split_many as split_many
         from ._string_py import split_once as split_once
         from ._string_py import split_once_index_only as split_once_index_only
         from ._string_py import split_once_without_escape as split_once_without_escape
+        from ._string_py import split_spans as split_spans
 else:
     from ._string_py import QUOTATION as QUOTATION
     from ._string_py import String as String
+    from ._string_py import Tokenizer as Tokenizer
     from ._string_py import split as split
+    from ._string_py import split_many as split_many
     from ._string_py import split_once as split_once
     from ._string_py import split_once_index_only as split_once_index_only
     from ._string_py import split_once_without_escape as split_once_without_escape
+    from ._string_py import split_spans as split_spans
+
+
+def iter_split(fp: IO[str], separator: str, crlf: bool = True, chunk_size: int = 65536) -> Iterator[str]:
+    """从文本文件中逐块读取并切分, 结果与对全部内容调用 `split` 相同
+
+    Args:
+        fp (IO[str]): 以文本模式打开的文件或其他提供 read(size) 的对象
+        separator (str): 切割符.
+        crlf (bool): 是否去除 \n 与 \r，默认为 True
+        chunk_size (int): 每次读取的字符数
+
+    Yields:
+        str: 切割后的字符串, 可能含有空格
+    """
+    tokenizer = Tokenizer(separator, crlf)
+    while chunk := fp.read(chunk_size):
+        tokenizer.feed(chunk)
+        yield from tokenizer.tokens()
+    yield from tokenizer.close()
@@ -0,0 +1,279 @@
+"""带磁盘溢出层的两级 LRU 缓存
+
+内存层是普通的 `LRU`, 因容量被淘汰的条目经淘汰回调写入 sqlite3 磁盘层;
+内存未命中时从磁盘层读取并提升回内存层。
+"""
+
+from __future__ import annotations
+
+import pickle
+import sqlite3
+import time
+from collections.abc import Hashable
+from typing import Any, Generic, NamedTuple, TypeVar, overload
+
+from .lru import LRU, LRUStats
+
+__all__ = ("TieredLRU", "TieredStats")
+
+_KT = TypeVar("_KT", bound=Hashable)
+_VT = TypeVar("_VT")
+_T = TypeVar("_T")
+
+_MISSING: Any = object()
+
+
+class TieredStats(NamedTuple):
+    """`TieredLRU.get_stats` 的返回值"""
+
+    memory: LRUStats
+    """内存层的统计计数"""
+    disk_hits: int
+    """内存未命中但在磁盘层命中的次数"""
+    disk_misses: int
+    """两层都未命中的次数"""
+    spills: int
+    """写入磁盘层的条目数"""
+    disk_evictions: int
+    """因超出磁盘层容量而被丢弃的条目数"""
+
+
+class TieredLRU(Generic[_KT, _VT]):
+    """内存 LRU + sqlite3 磁盘层的两级缓存
+
+    写入磁盘的操作先进入缓冲区, 攒够 batch_size 条后一次性写入一个事务;
+    磁盘层按写入顺序淘汰最旧的条目, 超出 disk_size 的部分在每次批量写入后删除。
+    键与值经 codec 序列化后存入磁盘, 键按序列化结果比较。
+    设置了 ttl 时, 条目的过期时刻 (墙上时间) 随条目一同写入磁盘,
+    过期的条目不会写入磁盘, 从磁盘读取时视为未命中, 提升回内存层时只保留剩余的存活时间。
+
+    Args:
+        size (int): 内存层容量
+        disk_size (int): 磁盘层容量
+        path (str): sqlite3 数据库路径, 默认为内存数据库
+        codec (Any): 提供 dumps 与 loads 的序列化模块, 默认为 pickle
+        batch_size (int): 批量写入磁盘的条目数
+        ttl (float, optional): 条目的存活时间 (秒)
+    """
+
+    def __init__(
+        self,
+        size: int,
+        disk_size: int,
+        path: str = ":memory:",
+        codec: Any = pickle,
+        batch_size: int = 64,
+        ttl: float | None = None,
+    ) -> None:
+        if disk_size < 1:
+            raise ValueError("Disk size should be a positive number")
+        if batch_size < 1:
+            raise ValueError("Batch size should be a positive number")
+        # memory entries carry their wall-clock deadline, the spill callback runs after
+        # the entry left the memory layer and can no longer ask it for the expiry
+        self._memory: LRU[_KT, tuple[_VT, float | None]] = LRU(size, ttl=ttl)
+        self._memory.set_callback(self._spill, True)
+        self._ttl = ttl
+        self._disk_size = disk_size
+        self._codec = codec
+        self._batch_size = batch_size
+        self._pending: dict[bytes, tuple[bytes, float | None]] = {}
+        self._deletes: set[bytes] = set()
+        self._disk_hits = self._disk_misses = self._spills = self._disk_evictions = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key BLOB PRIMARY KEY, value BLOB NOT NULL, seq INTEGER, deadline REAL)"
+        )
+        if "deadline" not in {row[1] for row in self._conn.execute("PRAGMA table_info(cache)")}:
+            self._conn.execute("ALTER TABLE cache ADD COLUMN deadline REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_seq ON cache (seq)")
+        row = self._conn.execute("SELECT MAX(seq), COUNT(*) FROM cache").fetchone()
+        self._seq = row[0] or 0
+        self._rows = row[1]
+
+    def _spill(self, key: _KT, entry: tuple[_VT, float | None], reason: str) -> None:
+        if reason != "capacity":
+            return
+        value, deadline = entry
+        if deadline is not None and deadline <= time.time():
+            return
+        # a row still shadowed by _deletes is removed before the batch is inserted
+        self._pending[self._codec.dumps(key)] = (self._codec.dumps(value), deadline)
+        self._spills += 1
+        if len(self._pending) >= self._batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """将缓冲区中的写入与删除提交到磁盘, 并丢弃超出磁盘层容量的最旧条目"""
+        if not self._pending and not self._deletes:
+            return
+        with self._conn:
+            if self._deletes:
+                cursor = self._conn.executemany("DELETE FROM cache WHERE key = ?", [(kb,) for kb in self._deletes])
+                self._rows -= cursor.rowcount
+            if self._pending:
+                # memory and disk never hold the same key, so every pending key is a new row
+                start = self._seq
+                self._seq += len(self._pending)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO cache (key, value, seq, deadline) VALUES (?, ?, ?, ?)",
+                    [(kb, vb, start + i, deadline) for i, (kb, (vb, deadline)) in enumerate(self._pending.items(), 1)],
+                )
+                self._rows += len(self._pending)
+            excess = self._rows - self._disk_size
+            if excess > 0:
+                cursor = self._conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY seq LIMIT ?)", (excess,)
+                )
+                self._rows -= cursor.rowcount
+                self._disk_evictions += cursor.rowcount
+        self._pending.clear()
+        self._deletes.clear()
+
+    def _forget(self, kb: bytes) -> None:
+        # the row is deleted with the next batch, until then _deletes shadows it
+        self._deletes.add(kb)
+        if len(self._deletes) >= self._batch_size:
+            self.flush()
+
+    def _take(self, kb: bytes) -> tuple[bytes, float | None] | None:
+        """从磁盘层 (含缓冲区) 中取出并移除键对应的值与过期时刻, 过期的条目视为不存在"""
+        entry = self._pending.pop(kb, None)
+        if entry is None and kb not in self._deletes:
+            entry = self._conn.execute("SELECT value, deadline FROM cache WHERE key = ?", (kb,)).fetchone()
+            if entry is not None:
+                self._forget(kb)
+        if entry is None or (entry[1] is not None and entry[1] <= time.time()):
+            return None
+        return entry
+
+    @overload
+    def get(self, key: _KT) -> _VT | None: ...
+
+    @overload
+    def get(self, key: _KT, instead: _VT | _T) -> _VT | _T: ...
+
+    def get(self, key: _KT, instead: _VT | _T | None = None) -> _VT | _T | None:
+        entry = self._memory.get(key)
+        if entry is not None:
+            return entry[0]
+        taken = self._take(self._codec.dumps(key))
+        if taken is None:
+            self._disk_misses += 1
+            return instead
+        self._disk_hits += 1
+        data, deadline = taken
+        value = self._codec.loads(data)
+        # promoting may spill other entries, but not this one as it is the most recent
+        if deadline is None:
+            self._memory[key] = (value, None)
+        else:
+            self._memory.set(key, (value, deadline), ttl=max(deadline - time.time(), 1e-6))
+        return value
+
+    def __getitem__(self, key: _KT) -> _VT:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: _KT, value: _VT) -> None:
+        # a stale copy on disk would resurface after the new value expires from memory,
+        # keys held in memory are never on disk and need no lookup
+        if key not in self._memory:
+            kb = self._codec.dumps(key)
+            if self._pending.pop(kb, None) is None and kb not in self._deletes:
+                if self._conn.execute("SELECT 1 FROM cache WHERE key = ?", (kb,)).fetchone() is not None:
+                    self._forget(kb)
+        self._memory[key] = (value, None if self._ttl is None else time.time() + self._ttl)
+
+    @overload
+    def setdefault(self: TieredLRU[_KT, _T | None], key: _KT) -> _T | None: ...
+
+    @overload
+    def setdefault(self, key: _KT, default: _VT) -> _VT: ...
+
+    def setdefault(self, key: _KT, default: _VT | None = None):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            self[key] = default  # type: ignore
+            return default
+        return value
+
+    @overload
+    def pop(self, key: _KT) -> _VT | None: ...
+
+    @overload
+    def pop(self, key: _KT, default: _VT | _T) -> _VT | _T: ...
+
+    def pop(self, key: _KT, default: _VT | _T | None = None) -> _VT | _T | None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            # keys held in memory are never on disk
+            return entry[0]
+        taken = self._take(self._codec.dumps(key))
+        return default if taken is None else self._codec.loads(taken[0])
+
+    def __delitem__(self, key: _KT) -> None:
+        if self.pop(key, _MISSING) is _MISSING:
+            raise KeyError(key)
+
+    def __contains__(self, key: _KT) -> bool:
+        if key in self._memory:
+            return True
+        kb = self._codec.dumps(key)
+        now = time.time()
+        if kb in self._pending:
+            deadline = self._pending[kb][1]
+            return deadline is None or deadline > now
+        if kb in self._deletes:
+            return False
+        row = self._conn.execute(
+            "SELECT 1 FROM cache WHERE key = ? AND (deadline IS NULL OR deadline > ?)", (kb, now)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        self.flush()
+        row = self._conn.execute(
+            "SELECT COUNT(*) FROM cache WHERE deadline IS NULL OR deadline > ?", (time.time(),)
+        ).fetchone()
+        return len(self._memory) + row[0]
+
+    def memory_len(self) -> int:
+        """内存层中的条目数"""
+        return len(self._memory)
+
+    def clear(self) -> None:
+        self._memory.set_callback(None)
+        self._memory.clear()
+        self._memory.set_callback(self._spill, True)
+        self._pending.clear()
+        self._deletes.clear()
+        with self._conn:
+            self._conn.execute("DELETE FROM cache")
+        self._rows = 0
+
+    def get_stats(self) -> TieredStats:
+        return TieredStats(
+            self._memory.get_stats(), self._disk_hits, self._disk_misses, self._spills, self._disk_evictions
+        )
+
+    def reset_stats(self) -> None:
+        self._memory.reset_stats()
+        self._disk_hits = self._disk_misses = self._spills = self._disk_evictions = 0
+
+    def close(self) -> None:
+        """提交缓冲区并关闭数据库连接, 内存层中的条目不会写入磁盘"""
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        memory = f"{len(self._memory)}/{self._memory.get_size()}"
+        return f"{self.__class__.__name__}(memory={memory}, disk={self._disk_size})"
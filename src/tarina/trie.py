@@ -10,7 +10,12 @@ __copyright__ = "Copyright 2014 Google Inc."
 
 import copy as _copy
 import enum
-from collections.abc import Generator, Iterable, Iterator, MutableMapping
+import multiprocessing
+import os
+import random
+import sys
+from collections.abc import Generator, Iterable, Iterator, MutableMapping, MutableSet
+from concurrent.futures import Executor
 from typing import (
     TYPE_CHECKING,
     Any,
@@ -18,6 +23,7 @@ from typing import (
     Final,
     Generic,
     Literal,
+    NamedTuple,
     Optional,
     Protocol,
     TypeVar,
@@ -236,6 +242,11 @@ class _SentinelClass(enum.Enum):
 T_Iteritems = Callable[[Children[T]], Iterable[tuple[str, "_Node[T]"]]]
 
 PathConv = Callable[[tuple[str, ...]], str]
+VisitCallback = Callable[[PathConv, list[str], Optional[T]], Optional[int]]
+
+_VISIT_CONTINUE: Final = 0
+_VISIT_SKIP_SUBTREE: Final = 1
+_VISIT_STOP: Final = 2
 NodeFactory = Callable[
     [
         Callable[[tuple[str, ...]], str],
@@ -351,6 +362,59 @@ class _Node(Generic[V]):
 
         return node_factory(path_conv, tuple(path), children, value_maybe)
 
+    def visit(
+        self,
+        enter: VisitCallback[V] | None,
+        leave: VisitCallback[V] | None,
+        path_conv: PathConv,
+        path: list[str],
+        items: T_Iteritems[V],
+    ) -> bool:
+        """Walks the node depth-first calling enter and leave callbacks.
+
+        Args:
+            enter: Called with ``(path_conv, path, value_maybe)`` before the
+                children of a node are visited.  Returning ``SKIP_SUBTREE``
+                skips the children and ``STOP`` ends the walk.
+            leave: Called with the same arguments after the children of a node
+                have been visited.  Not called for skipped nodes.  Returning
+                ``STOP`` ends the walk.
+            path_conv: Callable to convert node path to a key.
+            path: Current path for this node.  The list is modified in place
+                while walking.
+            items: A callable which takes ``node.children`` as a sole argument
+                and returns an iterable of children as ``(step, node)`` pairs.
+
+        Returns:
+            ``False`` if a callback stopped the walk, ``True`` otherwise.
+        """
+        # Like iterate, we keep the stack on the heap, and also avoid nested
+        # generators, so the Python stack depth does not grow with the trie.
+        node = self
+        stack: list[tuple[V | None, Iterator[tuple[str, _Node[V]]]]] = []
+        while True:
+            value = None if node.value is _SentinelClass._Sentinel else node.value
+            action = enter(path_conv, path, value) if enter else _VISIT_CONTINUE
+            if action == _VISIT_STOP:
+                return False
+            if action != _VISIT_SKIP_SUBTREE and node.children:
+                stack.append((value, iter(items(node.children))))
+                path.append("")
+            elif action != _VISIT_SKIP_SUBTREE and leave and leave(path_conv, path, value) == _VISIT_STOP:
+                return False
+
+            while stack:
+                child = next(stack[-1][1], None)
+                if child is not None:
+                    path[-1], node = child
+                    break
+                value = stack.pop()[0]
+                path.pop()
+                if leave and leave(path_conv, path, value) == _VISIT_STOP:
+                    return False
+            else:
+                return True
+
     def equals(self, other: _Node[V]):
         """Returns whether this and other node are recursively equal."""
         # Like iterate, we don't recurse so this works on deep tries.
@@ -497,6 +561,107 @@ class _Node(Generic[V]):
                 stack[-1].value = next(state)
 
 
+def _merge_level(
+    path: tuple[str, ...], dst: _Node[V], srcs: list[_Node[V]], overwrite: bool, conflicts: list[tuple[str, ...]]
+) -> dict[str, list[_Node[V]]] | None:
+    """Merges values of srcs into dst and groups children of all the nodes.
+
+    Returns:
+        ``None`` if none of the srcs had children, otherwise a dict mapping
+        each step to the nodes reachable by it, dst's own child first.  The
+        srcs are left without children.
+    """
+    steps: dict[str, list[_Node[V]]] | None = None
+    conflict = False
+    for src in srcs:
+        if src.value is not _SentinelClass._Sentinel:
+            if dst.value is _SentinelClass._Sentinel:
+                dst.value = src.value
+            else:
+                conflict = conflict or (dst.value is not src.value and dst.value != src.value)
+                if overwrite:
+                    dst.value = src.value
+        if src.children:
+            if steps is None:
+                steps = {step: [node] for step, node in dst.children.items()}
+            for step, node in src.children.items():
+                steps.setdefault(step, []).append(node)
+            src.children = _EMPTY
+    if conflict:
+        conflicts.append(path)
+    return steps
+
+
+def _merge_nodes(
+    nodes: list[_Node[V]], overwrite: bool, path: tuple[str, ...] = ()
+) -> tuple[_Node[V], list[tuple[str, ...]]]:
+    """Merges all the nodes into the first one in a single k-way pass.
+
+    Children present in only one of the nodes are moved as a whole without
+    being walked.  All but the first node are left empty.
+
+    Args:
+        nodes: Nodes to merge, the first one receives the result.
+        overwrite: Whether later values overwrite earlier ones.
+        path: Path of the nodes, used to report conflicts.
+
+    Returns:
+        ``(node, conflicts)`` tuple where ``node`` is the first node and
+        ``conflicts`` lists paths where more than one node had a value and the
+        values were not equal.
+    """
+    conflicts: list[tuple[str, ...]] = []
+    queue = [(path, nodes)]
+    while queue:
+        path, (dst, *srcs) = queue.pop()
+        steps = _merge_level(path, dst, srcs, overwrite, conflicts)
+        if steps is None:
+            continue
+        for step, group in steps.items():
+            if len(group) > 1:
+                queue.append((path + (step,), group))
+        dst.children = _children_from([(step, group[0]) for step, group in steps.items()])
+    return nodes[0], conflicts
+
+
+def _children_from(items: list[tuple[str, _Node[V]]]) -> Children[V]:
+    """Builds the most compact children collection for given items."""
+    if not items:
+        return _EMPTY
+    if len(items) == 1:
+        return _OneChild(*items[0])
+    return _Children(*items)
+
+
+class TrieStats(NamedTuple):
+    """Shape and memory report of a trie as returned by :func:`Trie.stats`.
+
+    When the report was sampled, counts are estimates scaled up from the
+    walked part of the trie.
+    """
+
+    nodes: int
+    """Number of nodes, including the root."""
+    values: int
+    """Number of nodes with a value."""
+    leaves: int
+    """Number of nodes without children."""
+    one_child: int
+    """Number of nodes storing their only child in a ``_OneChild``."""
+    many_children: int
+    """Number of nodes storing their children in a ``_Children`` dict."""
+    max_depth: int
+    """Length of the longest path from the start node."""
+    fanout: dict[int, int]
+    """Histogram mapping number of children to number of nodes."""
+    depth: dict[int, int]
+    """Histogram mapping depth to number of nodes."""
+    approx_bytes: int
+    """Approximate size of nodes, children containers and steps, excluding values."""
+    sampled: float
+    """Fraction of top-level subtries which were walked, ``1.0`` for a full walk."""
+
+
 _KT = TypeVar("_KT", covariant=True)
 
 
@@ -753,6 +918,70 @@ class Trie(Generic[V]):
             other._merge_impl(self, other, overwrite=overwrite)  # pylint: disable=protected-access
         other.clear()
 
+    def merge_all(
+        self, others: Iterable[Trie[V]], overwrite: bool = False, executor: Executor | None = None
+    ) -> list[str]:
+        """Moves nodes from many other tries into this one in a single pass.
+
+        This is equivalent to calling :func:`Trie.merge` with each of the other
+        tries in turn, but instead of walking this trie again for every one of
+        them, nodes with the same path in all the tries are merged together.
+        Subtries present in only one trie are moved without being walked.
+
+        Rather than silently picking one value, every key which has different
+        values in more than one trie is reported.  For such keys, the value
+        from this trie (or the first trie having it) is kept unless
+        ``overwrite`` is true in which case the last one wins.
+
+        Subtries below distinct top-level steps are independent, so they may be
+        merged in parallel by passing an ``executor``.  A thread pool merges in
+        place; with a process pool the subtries are pickled to the workers and
+        the merged ones are pickled back, which only pays off for large tries
+        with expensive-to-compare values.
+
+        As with :func:`Trie.merge`, the other tries are cleared.
+
+        Args:
+            others: Tries to move nodes from.
+            overwrite: Whether to overwrite existing values in this trie.
+            executor: :class:`concurrent.futures.Executor` used to merge
+                top-level subtries in parallel.
+
+        Returns:
+            Keys whose values conflicted, i.e. were set to different values in
+            more than one trie.
+
+        Raises:
+            TypeError: If any of the other tries can not be merged into this one.
+        """
+        others = list(others)
+        for other in others:
+            if not isinstance(other, Trie):
+                raise TypeError("Can only merge tries with other tries.")
+            if isinstance(other, StringTrie) and not isinstance(self, StringTrie):
+                raise TypeError(f"{other.__class__.__name__} cannot be merged into a {self.__class__.__name__}")
+        # pylint: disable=protected-access
+        roots = [self._root] + [other._root for other in others]
+        if executor is None:
+            _, conflicts = _merge_nodes(roots, overwrite)
+        else:
+            conflicts = []
+            steps = _merge_level((), self._root, roots[1:], overwrite, conflicts)
+            if steps is not None:
+                futures = {
+                    step: executor.submit(_merge_nodes, group, overwrite, (step,))
+                    for step, group in steps.items()
+                    if len(group) > 1
+                }
+                for step, future in futures.items():
+                    # With a process pool, the merged node is a copy.
+                    steps[step][0], sub_conflicts = future.result()
+                    conflicts.extend(sub_conflicts)
+                self._root.children = _children_from([(step, group[0]) for step, group in steps.items()])
+        for other in others:
+            other.clear()
+        return [self._key_from_path(path) for path in conflicts]
+
     @classmethod
     def _merge_impl(cls, dst, src, overwrite):
         # pylint: disable=protected-access
@@ -997,11 +1226,96 @@ class Trie(Generic[V]):
     def __bool__(self):
         return self._root.value is not _SentinelClass._Sentinel or bool(self._root.children)
 
+    def stats(
+        self,
+        prefix: str | Literal[_SentinelClass._Sentinel] = _SentinelClass._Sentinel,
+        sample: float = 1.0,
+        seed: int | None = None,
+    ) -> TrieStats:
+        """Computes shape and memory statistics of the trie in a single pass.
+
+        The report tells how many nodes there are, how they store their
+        children, how wide and deep the trie is and roughly how much memory the
+        structure takes.  It is a named tuple, so ``stats._asdict()`` gives
+        a plain dict suitable for logging or comparing between releases.
+
+        For very large tries, ``sample`` limits the walk to a random fraction of
+        the subtries directly below the start node; counts and histograms are
+        then scaled up accordingly while ``max_depth`` is the one observed.
+
+        Args:
+            prefix: Prefix for node to start from, by default starts at root.
+            sample: Fraction of top-level subtries to walk, in ``(0, 1]``.
+            seed: Seed for choosing sampled subtries, for reproducible reports.
+
+        Returns:
+            A :class:`TrieStats` report.
+
+        Raises:
+            KeyError: If ``prefix`` does not match any node.
+            ValueError: If ``sample`` is not in ``(0, 1]``.
+        """
+        if not 0 < sample <= 1:
+            raise ValueError("sample should be in (0, 1]")
+        node, _ = self._get_node(prefix)
+        top = [child for _, child in node.children.items()]
+        walked = top
+        if sample < 1 and top:
+            walked = random.Random(seed).sample(top, max(1, round(len(top) * sample)))
+        scale = len(top) / len(walked) if walked else 1.0
+        walked_ids = {id(child) for child in walked}
+
+        nodes = values = leaves = one_child = many_children = max_depth = 0
+        fanout: dict[int, float] = {}
+        depths: dict[int, float] = {}
+        size = 0
+        stack: list[tuple[_Node[V], int]] = [(node, 0)]
+        while stack:
+            node, depth = stack.pop()
+            weight = 1 if depth == 0 else scale
+            children = node.children
+            count = len(children)
+            nodes += weight
+            values += weight * (node.value is not _SentinelClass._Sentinel)
+            fanout[count] = fanout.get(count, 0) + weight
+            depths[depth] = depths.get(depth, 0) + weight
+            max_depth = max(max_depth, depth)
+            node_size = sys.getsizeof(node)
+            if count == 0:
+                leaves += weight
+            elif count == 1:
+                one_child += weight
+                node_size += sys.getsizeof(children)
+            else:
+                many_children += weight
+                node_size += sys.getsizeof(children) + sys.getsizeof(children.data)  # type: ignore
+            for step, child in children.items():
+                node_size += sys.getsizeof(step)
+                if depth or id(child) in walked_ids:
+                    stack.append((child, depth + 1))
+            size += weight * node_size
+        return TrieStats(
+            nodes=round(nodes),
+            values=round(values),
+            leaves=round(leaves),
+            one_child=round(one_child),
+            many_children=round(many_children),
+            max_depth=max_depth,
+            fanout={k: round(v) for k, v in sorted(fanout.items())},
+            depth={k: round(v) for k, v in sorted(depths.items())},
+            approx_bytes=round(size),
+            sampled=len(walked) / len(top) if top else 1.0,
+        )
+
     __hash__ = None  # type: ignore
 
     HAS_VALUE = 1
     HAS_SUBTRIE = 2
 
+    CONTINUE = _VISIT_CONTINUE
+    SKIP_SUBTREE = _VISIT_SKIP_SUBTREE
+    STOP = _VISIT_STOP
+
     def has_node(self, key: str):
         """Returns whether given node is in the trie.
 
@@ -1742,9 +2056,10 @@ class Trie(Generic[V]):
 
         Note: Unlike iterators, when used on a deep trie, traverse method is
         prone to rising a RuntimeError exception when Python's maximum recursion
-        depth is reached.  This can be addressed by not iterating over children
-        inside of the node_factory.  For example, the below code converts a trie
-        into an undirected graph using adjacency list representation::
+        depth is reached.  This can be addressed by using :func:`Trie.visit`
+        instead or by not iterating over children inside of the node_factory.
+        For example, the below code converts a trie into an undirected graph
+        using adjacency list representation::
 
             def undirected_graph_from_trie(t):
                 '''Converts trie into a graph and returns its nodes.'''
@@ -1793,6 +2108,73 @@ class Trie(Generic[V]):
 
     # traverse.uses_bool_convertible_children = True
 
+    def visit(
+        self,
+        enter: VisitCallback[V] | None = None,
+        leave: VisitCallback[V] | None = None,
+        prefix: str | Literal[_SentinelClass._Sentinel] = _SentinelClass._Sentinel,
+    ) -> bool:
+        """Walks the trie depth-first calling ``enter`` and ``leave`` callbacks.
+
+        Both callbacks accept ``(path_conv, path, value)`` arguments, where
+        path_conv is a lambda converting path representation to key, path is
+        the path to the node and value is the value associated with the path or
+        ``None``.  ``enter`` is called when a node is reached and ``leave`` once
+        all of its children have been visited, so the calls are properly
+        nested just like with :func:`Trie.traverse`.
+
+        The return value of a callback controls the walk:
+
+        * ``None`` or ``Trie.CONTINUE`` goes on as usual;
+        * ``Trie.SKIP_SUBTREE`` (from ``enter`` only) does not go into the
+          children of the node and does not call ``leave`` for it;
+        * ``Trie.STOP`` ends the walk immediately.
+
+        Unlike :func:`Trie.traverse`, the walk uses an explicit stack and no
+        generators, so it runs in constant Python stack depth no matter how
+        deep the trie is, and is noticeably cheaper per node.  For example, the
+        below snippet exports a :class:`tarina.trie.StringTrie` into nested
+        dicts while skipping hidden entries::
+
+            root = {'children': {}}
+            stack = [root]
+
+            def enter(path_conv, path, value):
+                if path and path[-1].startswith('.'):
+                    return Trie.SKIP_SUBTREE
+                node = {'value': value, 'children': {}}
+                stack[-1]['children'][path[-1] if path else ''] = node
+                stack.append(node)
+
+            def leave(path_conv, path, value):
+                stack.pop()
+
+            t.visit(enter, leave)
+
+        Note that ``path`` is a list which is modified in place as the walk
+        goes on; copy it if it needs to outlive the callback.
+
+        Args:
+            enter: Called before the children of a node are visited.
+            leave: Called after the children of a node have been visited.
+            prefix: Prefix for node to start the walk, by default starts at
+                root.
+
+        Returns:
+            ``False`` if a callback returned ``Trie.STOP``, ``True`` otherwise.
+
+        Raises:
+            KeyError: If ``prefix`` does not match any node.
+        """
+        node, _ = self._get_node(prefix)
+        return node.visit(
+            enter,
+            leave,
+            self._key_from_path,
+            list(self.__path_from_key(prefix)),
+            self._items_callback,
+        )
+
 
 class CharTrie(Trie[V]):
     """A variant of a :class:`tarina.trie.Trie` which accepts strings as keys.
@@ -1927,6 +2309,580 @@ class StringTrie(Trie[V]):
         return self._separator.join(path)
 
 
+class PrefixSet(MutableSet[str]):
+    """A set of prefixes.
+
+    :class:`tarina.trie.PrefixSet` works similar to a normal set except it is
+    said to contain a key if the key or its prefix is stored in the set.  For
+    instance, if "foo" is added to the set, the set contains "foo" as well as
+    "foobar".
+
+    The set supports addition of elements but does *not* support removal of
+    elements other than those exactly stored.  This is because removal of
+    elements may require the set to be split into multiple prefixes, e.g.
+    removing "foobar" from a set containing "foo" would require adding every
+    "foo" continuation except "bar".
+
+    Only minimal prefixes are kept: adding a key which already matches is
+    a no-op and adding a prefix of stored keys replaces them.  For example::
+
+        >>> ps = PrefixSet(['foo/bar', 'foo/baz', 'qux'], factory=StringTrie)
+        >>> ps.add('foo')
+        >>> sorted(ps)
+        ['foo', 'qux']
+        >>> 'foo/bar/baz' in ps
+        True
+    """
+
+    def __init__(self, iterable: Iterable[str] = (), factory: Callable[..., Trie[bool]] = Trie, **kwargs):
+        """Initialises the prefix set.
+
+        Args:
+            iterable: A sequence of keys to add to the set.
+            factory: A function used to create a trie used by the
+                :class:`tarina.trie.PrefixSet`.
+            kwargs: Additional keyword arguments passed to the factory function.
+        """
+        super().__init__()
+        self._trie = factory(**kwargs)
+        self._factory = factory
+        self._kwargs = kwargs
+        for key in iterable:
+            self.add(key)
+
+    def copy(self) -> PrefixSet:
+        """Returns a shallow copy of the object."""
+        cpy = self._empty()
+        cpy._trie = self._trie.copy()
+        return cpy
+
+    def _empty(self) -> PrefixSet:
+        return self.__class__(factory=self._factory, **self._kwargs)
+
+    def _from_iterable(self, it: Iterable[str]) -> PrefixSet:
+        """Makes a set of the same kind, used by the operators of MutableSet."""
+        cpy = self._empty()
+        for key in it:
+            cpy.add(key)
+        return cpy
+
+    def clear(self) -> None:
+        """Removes all keys from the set."""
+        self._trie.clear()
+
+    def __contains__(self, key: object) -> bool:
+        """Checks whether set contains key or its prefix.
+
+        This is a single walk down the trie which stops at the first stored
+        prefix, so it never materialises the matched prefix.
+        """
+        node = self._trie._root
+        if node.value is not _SentinelClass._Sentinel:
+            return True
+        for step in self._trie._path_from_key(key):  # type: ignore
+            # pylint: disable=assignment-from-none
+            if (node := node.children.get(step)) is None:  # type: ignore
+                return False
+            if node.value is not _SentinelClass._Sentinel:
+                return True
+        return False
+
+    def contains_many(self, keys: Iterable[str]) -> list[bool]:
+        """Checks membership of many keys at once.
+
+        Returns:
+            A list telling for each key whether it or its prefix is in the set.
+        """
+        return [key in self for key in keys]
+
+    def __iter__(self) -> Iterator[str]:
+        """Return iterator over all prefixes in the set.
+
+        See :func:`PrefixSet.iter` method for more info.
+        """
+        return self._trie.iterkeys()
+
+    def iter(self, prefix: str | Literal[_SentinelClass._Sentinel] = _SentinelClass._Sentinel) -> Iterator[str]:
+        """Iterates over all keys in the set optionally starting with a prefix.
+
+        Since a key does not have to be explicitly added to the set to be an
+        element of the set, this method does not iterate over all possible keys
+        that the set contains, but only over the shortest set of prefixes of all
+        the keys the set contains.
+
+        For example, if "foo" has been added to the set, the set contains also
+        "foobar", but this method will *not* iterate over "foobar".
+
+        If ``prefix`` argument is given, method will iterate over keys with
+        given prefix only.  The keys yielded from the function if prefix is
+        given does not have to be a subset (in mathematical sense) of the keys
+        yielded when there is not prefix.  This happens, if the set contains
+        a prefix of the given prefix.
+
+        For example, if only "foo" has been added to the set, iter method called
+        with no arguments will yield "foo" only.  However, when called with
+        "foobar" argument, it will yield "foobar" only.
+        """
+        if prefix is _SentinelClass._Sentinel:
+            yield from self._trie.iterkeys()
+        elif prefix in self:
+            yield prefix
+        elif self._trie.has_node(prefix):
+            yield from self._trie.iterkeys(prefix)
+
+    def __len__(self) -> int:
+        """Returns number of keys stored in the set.
+
+        Since a key does not have to be explicitly added to the set to be an
+        element of the set, this method does not count over all possible keys
+        that the set contains (since that would be infinity), but only over the
+        shortest set of prefixes of all the keys the set contains.
+        """
+        return len(self._trie)
+
+    def add(self, value: str) -> None:
+        """Adds given value to the set.
+
+        If the set already contains prefix of the value being added, this
+        operation has no effect.  If the value being added is a prefix of some
+        existing values in the set, those values are deleted and replaced by
+        a single entry for the value being added.
+        """
+        self._trie._set_node_if_no_prefix(value)
+
+    def discard(self, value: str) -> None:
+        """Removes a stored prefix from the set if it is exactly there.
+
+        Keys which are only matched through a shorter stored prefix can not be
+        removed, see the class documentation.
+        """
+        if self._trie.has_key(value):
+            self._trie.pop(value)
+
+    def pop(self) -> str:
+        """Pops a prefix from the set.
+
+        Raises:
+            KeyError: If the set is empty.
+        """
+        return self._trie.popitem()[0]
+
+    def __or__(self, other: Iterable[str]) -> PrefixSet:  # type: ignore[override]
+        """Returns a set matching keys matched by either set."""
+        cpy = self.copy()
+        for key in other:
+            cpy.add(key)
+        return cpy
+
+    def __and__(self, other: Iterable[str]) -> PrefixSet:  # type: ignore[override]
+        """Returns a set matching keys matched by both sets.
+
+        A stored prefix of one set is kept if the other set matches it, so
+        ``{'foo'} & {'foo/bar'}`` is ``{'foo/bar'}``.
+        """
+        if not isinstance(other, PrefixSet):
+            other = self._from_iterable(other)
+        return self._from_iterable(
+            [key for key in self if key in other] + [key for key in other if key in self]  # type: ignore
+        )
+
+    union = __or__
+    intersection = __and__
+
+    # The in-place operators of MutableSet add and discard single elements, so
+    # they are routed through the prefix-aware operators above instead.
+
+    def _assign(self, other: PrefixSet) -> Self:
+        self._trie = other._trie
+        return self
+
+    def __ior__(self, other: Iterable[str]) -> Self:  # type: ignore[override]
+        """Adds keys of other to the set, see :func:`PrefixSet.__or__`."""
+        for key in other:
+            self.add(key)
+        return self
+
+    def __iand__(self, other: Iterable[str]) -> Self:  # type: ignore[override]
+        """Keeps only keys matched by both sets, see :func:`PrefixSet.__and__`."""
+        return self._assign(self & other)
+
+    def __isub__(self, other: Iterable[str]) -> Self:  # type: ignore[override]
+        """Removes stored prefixes matched by other, like ``self - other``."""
+        return self._assign(self - other)  # type: ignore[operator]
+
+    def __ixor__(self, other: Iterable[str]) -> Self:  # type: ignore[override]
+        """Keeps stored prefixes matched by only one set, like ``self ^ other``."""
+        return self._assign(self ^ other)  # type: ignore[operator]
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self)!r})"
+
+
+class _ShardMissing:
+    """Marks a missing value in shard answers.
+
+    The class itself is used as the marker since, unlike the trie sentinel, it
+    keeps its identity when pickled.
+    """
+
+
+def _shard_get_many(trie: Trie[V], paths: list[tuple[str, ...]]) -> list[Any]:
+    result = []
+    for path in paths:
+        try:
+            node, _ = trie._get_node(path)  # type: ignore
+        except KeyError:
+            result.append(_ShardMissing)
+            continue
+        result.append(_ShardMissing if node.value is _SentinelClass._Sentinel else node.value)
+    return result
+
+
+def _shard_set_many(trie: Trie[V], items: list[tuple[tuple[str, ...], V]]) -> None:
+    for path, value in items:
+        trie._set_node(path, value)  # type: ignore
+
+
+def _shard_pop_many(trie: Trie[V], paths: list[tuple[str, ...]]) -> list[Any]:
+    result = []
+    for path in paths:
+        try:
+            _, trace = trie._get_node(path)  # type: ignore
+        except KeyError:
+            result.append(_ShardMissing)
+            continue
+        value = trie._pop_value(trace)
+        result.append(_ShardMissing if value is _SentinelClass._Sentinel else value)
+    return result
+
+
+def _shard_longest_prefix_many(trie: Trie[V], paths: list[tuple[str, ...]]) -> list[tuple[int, V] | None]:
+    result: list[tuple[int, V] | None] = []
+    for path in paths:
+        node = trie._root
+        found = None if node.value is _SentinelClass._Sentinel else (0, node.value)
+        for depth, step in enumerate(path, 1):
+            if (node := node.children.get(step)) is None:  # type: ignore
+                break
+            if node.value is not _SentinelClass._Sentinel:
+                found = (depth, node.value)
+        result.append(found)
+    return result
+
+
+def _shard_items(trie: Trie[V], prefix: tuple[str, ...], shallow: bool) -> list[tuple[tuple[str, ...], V]] | None:
+    try:
+        node, _ = trie._get_node(prefix)  # type: ignore
+    except KeyError:
+        return None
+    return [(tuple(path), value) for path, value in node.iterate(list(prefix), shallow, trie._items_callback)]
+
+
+_SHARD_OPS: dict[str, Callable[..., Any]] = {
+    "get_many": _shard_get_many,
+    "set_many": _shard_set_many,
+    "pop_many": _shard_pop_many,
+    "longest_prefix_many": _shard_longest_prefix_many,
+    "items": _shard_items,
+    "clear": lambda trie: trie.clear(),
+}
+
+
+def _shard_worker(conn) -> None:
+    """Serves requests for a single shard until the pipe is closed.
+
+    Every request is an ``(op, args)`` tuple and is answered with an
+    ``(ok, result)`` tuple, where ``result`` is the raised exception if ``ok``
+    is false.  Keys travel as tuples of steps so the worker does not need to
+    know how the owning :class:`ShardedTrie` converts keys into paths.
+    """
+    trie: Trie[Any] = Trie()
+    while True:
+        try:
+            op, args = conn.recv()
+        except EOFError:
+            break
+        if op == "close":
+            break
+        try:
+            result = _SHARD_OPS[op](trie, *args)
+        except Exception as e:  # pragma: no cover
+            conn.send((False, e))
+        else:
+            conn.send((True, result))
+    conn.close()
+
+
+class ShardedTrie(Generic[V]):
+    """A trie partitioned by leading steps across worker processes.
+
+    Keys are converted into paths the same way ``template`` does it, and the
+    first ``depth`` steps of the path choose the shard (keys shorter than
+    ``depth`` are routed by all of their steps).  Each shard is a plain
+    :class:`Trie` living in its own process, so the dictionary may exceed the
+    memory of a single process and lookups run in parallel.
+
+    Batched methods (:func:`ShardedTrie.get_many`, :func:`ShardedTrie.set_many`,
+    :func:`ShardedTrie.pop_many` and :func:`ShardedTrie.longest_prefix_many`)
+    group the keys by shard, send one request to every involved shard before
+    waiting for any answer, and merge the answers back into input order.
+    Queries whose prefix is shorter than ``depth`` are fanned out to all
+    shards that may hold a matching key.
+
+    For example::
+
+        >>> with ShardedTrie(StringTrie(separator='.'), shards=2) as t:
+        ...     t.set_many([('foo.bar', 1), ('foo', 0), ('baz.qux', 2)])
+        ...     t.longest_prefix_many(['foo.bar.baz', 'qux'])
+        [('foo.bar', 1), None]
+
+    Workers are started on construction and stopped by :func:`ShardedTrie.close`
+    (or on leaving the ``with`` block).
+    """
+
+    def __init__(
+        self,
+        template: Trie[Any] | None = None,
+        /,
+        shards: int | None = None,
+        depth: int = 1,
+        context: Any = None,
+    ):
+        """Starts the shard workers.
+
+        Args:
+            template: Trie whose key conversion is used, e.g. a
+                :class:`StringTrie` with the desired separator.  A plain
+                :class:`Trie` is used if not given.  Its content is loaded into
+                the shards.
+            shards: Number of worker processes, ``os.cpu_count()`` by default.
+            depth: Number of leading steps used to choose the shard.
+            context: :mod:`multiprocessing` context used to start workers.
+
+        Raises:
+            ValueError: If ``shards`` or ``depth`` is not positive.
+        """
+        if shards is None:
+            shards = os.cpu_count() or 1
+        if shards < 1:
+            raise ValueError("shards should be a positive number")
+        if depth < 1:
+            raise ValueError("depth should be a positive number")
+        self._template: Trie[Any] = Trie() if template is None else template.__class__.__new__(template.__class__)
+        if template is not None:
+            self._template.__dict__ = template.__dict__.copy()
+            self._template._root = _Node()
+        self._depth = depth
+        ctx = context or multiprocessing.get_context()
+        self._conns = []
+        self._procs = []
+        for _ in range(shards):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=_shard_worker, args=(child,), daemon=True)
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+        if template:
+            self.set_many(template.iteritems())
+
+    @property
+    def shards(self) -> int:
+        """Number of shards."""
+        return len(self._conns)
+
+    def _path(self, key: str) -> tuple[str, ...]:
+        return tuple(self._template._path_from_key(key))
+
+    def _route(self, path: tuple[str, ...]) -> int:
+        return hash(path[: self._depth]) % len(self._conns)
+
+    def _call(self, requests: dict[int, tuple[str, tuple]]) -> dict[int, Any]:
+        """Sends one request per shard, then collects all the answers."""
+        if not self._conns:
+            raise ValueError("operation on closed ShardedTrie")
+        for index, request in requests.items():
+            self._conns[index].send(request)
+        results = {}
+        error = None
+        for index in requests:
+            ok, result = self._conns[index].recv()
+            if ok:
+                results[index] = result
+            elif error is None:
+                error = result
+        if error is not None:
+            raise error
+        return results
+
+    def _batch(self, op: str, keys: Iterable[str], default: Any) -> list[Any]:
+        paths = [self._path(key) for key in keys]
+        groups: dict[int, list[int]] = {}
+        for i, path in enumerate(paths):
+            groups.setdefault(self._route(path), []).append(i)
+        if not groups:
+            return []
+        results = self._call({shard: (op, ([paths[i] for i in idx],)) for shard, idx in groups.items()})
+        out: list[Any] = [default] * len(paths)
+        for shard, idx in groups.items():
+            for i, value in zip(idx, results[shard]):
+                if value is not _ShardMissing:
+                    out[i] = value
+        return out
+
+    def set_many(self, items: Iterable[tuple[str, V]]) -> None:
+        """Sets many ``(key, value)`` pairs with one request per shard."""
+        groups: dict[int, list[tuple[tuple[str, ...], V]]] = {}
+        for key, value in items:
+            path = self._path(key)
+            groups.setdefault(self._route(path), []).append((path, value))
+        if groups:
+            self._call({shard: ("set_many", (group,)) for shard, group in groups.items()})
+
+    def get_many(self, keys: Iterable[str], default: Any = None) -> list[V | Any]:
+        """Returns values of given keys, in order, or ``default`` for missing ones."""
+        return self._batch("get_many", keys, default)
+
+    def pop_many(self, keys: Iterable[str], default: Any = None) -> list[V | Any]:
+        """Removes given keys and returns their values, or ``default`` for missing ones."""
+        return self._batch("pop_many", keys, default)
+
+    def longest_prefix_many(self, keys: Iterable[str]) -> list[tuple[str, V] | None]:
+        """Finds the longest prefix with a value for each of given keys.
+
+        Prefixes shorter than ``depth`` steps may live on other shards than the
+        key itself, so every shard that can hold a prefix of the key is asked.
+
+        Returns:
+            A list with a ``(key, value)`` pair or ``None`` for every key.
+        """
+        paths = [self._path(key) for key in keys]
+        groups: dict[int, list[int]] = {}
+        for i, path in enumerate(paths):
+            for shard in {self._route(path[:k]) for k in range(min(len(path), self._depth) + 1)}:
+                groups.setdefault(shard, []).append(i)
+        if not groups:
+            return []
+        results = self._call(
+            {shard: ("longest_prefix_many", ([paths[i] for i in idx],)) for shard, idx in groups.items()}
+        )
+        best: list[tuple[int, V] | None] = [None] * len(paths)
+        for shard, idx in groups.items():
+            for i, found in zip(idx, results[shard]):
+                if found is not None and (best[i] is None or found[0] > best[i][0]):  # type: ignore
+                    best[i] = found
+        return [
+            None if found is None else (self._template._key_from_path(path[: found[0]]), found[1])
+            for path, found in zip(paths, best)
+        ]
+
+    def longest_prefix(self, key: str) -> tuple[str, V] | None:
+        """Finds the longest prefix of a key with a value.
+
+        Returns:
+            A ``(key, value)`` pair, or ``None`` if no prefix is found.
+        """
+        return self.longest_prefix_many([key])[0]
+
+    def iteritems(
+        self, prefix: str | Literal[_SentinelClass._Sentinel] = _SentinelClass._Sentinel, shallow: bool = False
+    ) -> Iterator[tuple[str, V]]:
+        """Yields all items with given prefix, see :func:`Trie.iteritems`.
+
+        Raises:
+            KeyError: If ``prefix`` does not match any node on any shard.
+        """
+        path = () if prefix is _SentinelClass._Sentinel else self._path(prefix)
+        if len(path) >= self._depth:
+            requests = {self._route(path): ("items", (path, shallow))}
+        else:
+            requests = dict.fromkeys(range(len(self._conns)), ("items", (path, shallow)))
+        results = [result for result in self._call(requests).values() if result is not None]
+        if not results:
+            raise KeyError(prefix)
+        for result in results:
+            for item_path, value in result:
+                yield self._template._key_from_path(item_path), value
+
+    def items(self, prefix: str | Literal[_SentinelClass._Sentinel] = _SentinelClass._Sentinel, shallow: bool = False):
+        """Returns a list of ``(key, value)`` pairs in given subtrie."""
+        return list(self.iteritems(prefix, shallow))
+
+    def keys(self, prefix: str | Literal[_SentinelClass._Sentinel] = _SentinelClass._Sentinel, shallow: bool = False):
+        """Returns a list of all the keys, with given prefix."""
+        return [key for key, _ in self.iteritems(prefix, shallow)]
+
+    def values(self, prefix: str | Literal[_SentinelClass._Sentinel] = _SentinelClass._Sentinel, shallow: bool = False):
+        """Returns a list of values in given subtrie."""
+        return [value for _, value in self.iteritems(prefix, shallow)]
+
+    def clear(self) -> None:
+        """Removes all the values from every shard."""
+        self._call(dict.fromkeys(range(len(self._conns)), ("clear", ())))
+
+    def close(self) -> None:
+        """Stops the shard workers.  The trie can not be used afterwards."""
+        conns, procs = self._conns, self._procs
+        self._conns, self._procs = [], []
+        for conn in conns:
+            try:
+                conn.send(("close", ()))
+            except OSError:  # pragma: no cover
+                pass
+            conn.close()
+        for proc in procs:
+            proc.join()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __iter__(self):
+        return (key for key, _ in self.iteritems())
+
+    def __len__(self):
+        """Returns number of values in all shards.
+
+        Note that this method is expensive as it transfers every item.
+        """
+        try:
+            return sum(1 for _ in self.iteritems())
+        except KeyError:
+            return 0
+
+    def __contains__(self, key: str) -> bool:
+        return self.get_many([key], _ShardMissing)[0] is not _ShardMissing
+
+    def get(self, key: str, default: Any = None) -> V | Any:
+        return self.get_many([key], default)[0]
+
+    def __getitem__(self, key: str) -> V:
+        value = self.get_many([key], _ShardMissing)[0]
+        if value is _ShardMissing:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: V) -> None:
+        self.set_many([(key, value)])
+
+    def __delitem__(self, key: str) -> None:
+        if self.pop_many([key], _ShardMissing)[0] is _ShardMissing:
+            raise KeyError(key)
+
+    def pop(self, key: str, default: Any = _SentinelClass._Sentinel) -> V | Any:
+        value = self.pop_many([key], _ShardMissing)[0]
+        if value is _ShardMissing:
+            if default is _SentinelClass._Sentinel:
+                raise KeyError(key)
+            return default
+        return value
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(shards={self.shards}, depth={self._depth})"
+
+
 if __name__ == "__main__":
     trie = CharTrie[int]()
     trie["foo"] = 1
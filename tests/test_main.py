@@ -152,6 +152,98 @@ def test_split():
     ]
 
 
+def test_split_stream():
+    """测试增量分割, 结果与整体分割相同"""
+    import io
+
+    from tarina import iter_split, split
+    from tarina.string import Tokenizer
+
+    text = """123 '45 6' "789 1" '12\'34' "56\"78" '90\\12' "34\\56" 'end test  \n"a b" "c d  """
+    for size in (1, 2, 3, 7, len(text)):
+        tokenizer = Tokenizer(" ")
+        tokens = []
+        for i in range(0, len(text), size):
+            tokenizer.feed(text[i : i + size])
+            tokens.extend(tokenizer.tokens())
+        assert tokens + tokenizer.close() == split(text, " ")
+    assert list(iter_split(io.StringIO(text), " ", chunk_size=4)) == split(text, " ")
+    assert list(iter_split(io.StringIO("a,b\nc"), ",", crlf=False)) == ["a", "b\nc"]
+    assert list(iter_split(io.StringIO("  "), " ")) == []
+
+    tokenizer = Tokenizer(" ")
+    tokenizer.feed('ab "cd ')
+    # the quote may still be closed, so only "ab" is complete
+    assert tokenizer.tokens() == ["ab"]
+    tokenizer.feed('ef" g')
+    assert tokenizer.tokens() == ["cd ef"]
+    assert tokenizer.close() == ["g"]
+    with pytest.raises(ValueError, match="close"):
+        tokenizer.feed("h")
+
+
+def test_split_many():
+    """测试批量分割, 结果与逐个分割相同"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from tarina import split, split_many
+
+    texts = ["123 '45 6' \"789 1\"", "", "  a\\ b 'c", "x\ny", "'end test  "] * 3
+    expected = [split(text, " ") for text in texts]
+    assert split_many(texts, " ") == expected
+    assert split_many(iter(texts), " ", crlf=False) == [split(text, " ", False) for text in texts]
+    assert split_many(texts, " ", workers=1) == expected
+    with ThreadPoolExecutor(2) as pool:
+        assert split_many(texts, " ", workers=pool, chunk_size=4) == expected
+    assert split_many(texts, " ", workers=2, chunk_size=4) == expected
+    with pytest.raises(ValueError, match="Workers"):
+        split_many(texts, " ", workers=0)
+
+
+def test_split_backends():
+    """测试 C 扩展与纯 Python 的切分结果一致, 包括多字符的切割符"""
+    import random
+
+    from tarina import _string_py
+
+    _string_c = pytest.importorskip("tarina._string_c")
+
+    assert _string_c.split_once(",b", " ,") == _string_py.split_once(",b", " ,") == ("", "b")
+    rnd = random.Random(0)
+    for _ in range(5000):
+        text = "".join(rnd.choice("ab ,'\"\\\n\t") for _ in range(rnd.randint(0, 10)))
+        separator = rnd.choice([" ", " ,", ", ", "ab", " \t"])
+        crlf = rnd.random() < 0.5
+        for name in ("split", "split_once", "split_once_without_escape"):
+            expected = getattr(_string_py, name)(text, separator, crlf)
+            assert getattr(_string_c, name)(text, separator, crlf) == expected, (name, text, separator)
+
+
+def test_split_spans():
+    """测试只返回位置的分割"""
+    from tarina import split, split_spans
+
+    text = """  123 '45 6' "789 1" '12\'34' "56\"78" '90\\12' "34\\56" a"b c"  \n"""
+    spans = split_spans(text, " ")
+    assert len(spans) == len(split(text, " ")) * 3
+    parts = [(text[spans[i] : spans[i + 1]], spans[i + 2]) for i in range(0, len(spans), 3)]
+    assert parts == [
+        ("123", 0),
+        ("45 6", 1),
+        ("789 1", 1),
+        ("12'34", 1),
+        ('56"78', 1),
+        ("90\\12", 1),
+        ("34\\56", 1),
+        ('a"b', 0),
+        ('c"', 0),
+    ]
+    # an unclosed quote is kept when it contains separators
+    spans = split_spans("'end test", " ")
+    assert list(spans) == [0, 4, 0, 5, 9, 0]
+    assert list(split_spans(" \n ", " ")) == []
+
+
 def test_string():
     from tarina import String
 
@@ -263,3 +355,931 @@ def test_safe_eval():
             c = 123
 
     assert safe_eval("A.B.c", {"A": A}) == 123
+
+
+def test_sharded_trie():
+    from tarina.trie import ShardedTrie, StringTrie
+
+    with ShardedTrie(StringTrie([("a.x", 9)], separator="."), shards=3, depth=2) as trie:
+        trie.set_many([("foo.bar", 1), ("foo", 0), ("baz.qux", 2), ("foo.bar.baz.q", 3)])
+        assert trie.get_many(["foo", "a.x", "none"], -1) == [0, 9, -1]
+        assert trie.longest_prefix_many(["foo.bar.baz", "qux", "foo.bar.baz.q.r", "foo.zz"]) == [
+            ("foo.bar", 1),
+            None,
+            ("foo.bar.baz.q", 3),
+            ("foo", 0),
+        ]
+        assert sorted(trie.items("foo")) == [("foo", 0), ("foo.bar", 1), ("foo.bar.baz.q", 3)]
+        assert len(trie) == 5
+        assert trie.pop_many(["foo", "none"]) == [0, None]
+        assert "foo" not in trie
+        with pytest.raises(KeyError):
+            trie.items("none")
+    with pytest.raises(ValueError, match="shards"):
+        ShardedTrie(shards=0)
+
+
+def test_trie_visit():
+    from tarina.trie import CharTrie, StringTrie, Trie
+
+    trie = StringTrie(separator="/")
+    trie["a"] = 0
+    trie["a/b"] = 1
+    trie["a/.hidden/x"] = 2
+    trie["c"] = 3
+    trie.enable_sorting()
+
+    events = []
+
+    def enter(path_conv, path, value):
+        if path and path[-1].startswith("."):
+            return Trie.SKIP_SUBTREE
+        events.append(("enter", path_conv(path), value))
+
+    def leave(path_conv, path, value):
+        events.append(("leave", path_conv(path), value))
+
+    assert trie.visit(enter, leave)
+    assert events == [
+        ("enter", "", None),
+        ("enter", "a", 0),
+        ("enter", "a/b", 1),
+        ("leave", "a/b", 1),
+        ("leave", "a", 0),
+        ("enter", "c", 3),
+        ("leave", "c", 3),
+        ("leave", "", None),
+    ]
+
+    deep = CharTrie()
+    deep["x" * 5000] = 1
+    found = []
+    assert deep.visit(lambda path_conv, path, value: found.append(len(path)) if value else None)
+    assert found == [5000]
+    assert not deep.visit(lambda path_conv, path, value: Trie.STOP if len(path) == 10 else None)
+
+
+def test_trie_stats():
+    from tarina.trie import CharTrie
+
+    trie = CharTrie()
+    for word in ("foo", "foobar", "fob", "bar", "baz", "qux"):
+        trie[word] = True
+    stats = trie.stats()
+    assert stats.nodes == 15
+    assert stats.values == 6
+    assert stats.leaves == 5
+    assert (stats.one_child, stats.many_children) == (7, 3)
+    assert stats.max_depth == 6
+    assert stats.fanout == {0: 5, 1: 7, 2: 2, 3: 1}
+    assert sum(stats.depth.values()) == stats.nodes
+    assert stats.approx_bytes > 0
+    assert stats.sampled == 1.0
+    assert trie.stats("foo").values == 2
+    assert 0 < trie.stats(sample=0.5, seed=0).sampled < 1
+
+
+def test_prefix_set():
+    from tarina.trie import PrefixSet, StringTrie
+
+    paths = PrefixSet(["foo/bar", "foo/baz", "qux"], factory=StringTrie)
+    assert sorted(paths) == ["foo/bar", "foo/baz", "qux"]
+    paths.add("foo")
+    assert sorted(paths) == ["foo", "qux"]
+    assert "foo/bar/baz" in paths
+    assert "fo" not in paths
+    assert paths.contains_many(["qux/a", "q", "foo"]) == [True, False, True]
+    assert list(paths.iter("foo/bar")) == ["foo/bar"]
+
+    a = PrefixSet(["ab", "cd"])
+    b = PrefixSet(["a", "cde"])
+    assert sorted(a | b) == ["a", "cd"]
+    assert sorted(a & b) == sorted(b & a) == ["ab", "cde"]
+    # the in-place forms agree with the operators
+    for op, iop in ((a.__or__, "__ior__"), (a.__and__, "__iand__"), (a.__sub__, "__isub__"), (a.__xor__, "__ixor__")):
+        c = a.copy()
+        assert sorted(getattr(c, iop)(b)) == sorted(op(b))
+    c = a.copy()
+    c &= b
+    assert sorted(c) == ["ab", "cde"]
+    c = a.copy()
+    c -= PrefixSet(["a"])
+    assert list(c) == ["cd"]
+    a.discard("ab")
+    assert list(a) == ["cd"]
+
+
+def test_trie_merge_all():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from tarina.trie import StringTrie
+
+    def make():
+        return StringTrie([("a/b", 1), ("x", 0)]), [
+            StringTrie([("a/b", 1), ("a/c", 2)]),
+            StringTrie([("a/b", 9), ("q/r", 3), ("x", 5)]),
+            StringTrie([("a/c", 3)]),
+        ]
+
+    trie, others = make()
+    assert sorted(trie.merge_all(others)) == ["a/b", "a/c", "x"]
+    assert sorted(trie.items()) == [("a/b", 1), ("a/c", 2), ("q/r", 3), ("x", 0)]
+    assert not any(others)
+
+    trie, others = make()
+    with ThreadPoolExecutor(2) as executor:
+        trie.merge_all(others, overwrite=True, executor=executor)
+    assert sorted(trie.items()) == [("a/b", 9), ("a/c", 3), ("q/r", 3), ("x", 5)]
+
+
+def test_lru_ttl():
+    import time
+
+    from tarina import LRU
+
+    evicted = []
+    cache: LRU[str, int] = LRU(2, ttl=0.05)
+    cache.set_callback(lambda k, v, reason: evicted.append((k, reason)), reason=True)
+    cache["a"] = 1
+    cache.set("b", 2, ttl=10)
+    assert cache.get_ttl() == 0.05
+    assert "a" in cache
+    cache["c"] = 3
+    assert evicted == [("a", "capacity")]
+    time.sleep(0.06)
+    assert "c" not in cache
+    assert cache.get("c") is None
+    assert evicted[-1] == ("c", "expired")
+    assert cache["b"] == 2
+    cache["d"] = 4
+    time.sleep(0.06)
+    assert cache.expire() == 1
+    assert cache.keys() == ["b"]
+    with pytest.raises(ValueError, match="TTL"):
+        cache.set("e", 5, ttl=-1)
+
+
+def test_lru_weight():
+    """测试 LRU 权重上限"""
+    from tarina import LRU
+
+    evicted = []
+    cache = LRU(100, lambda k, v: evicted.append(k), max_weight=10, weigher=lambda k, v: len(v))
+    assert cache.get_max_weight() == 10
+    cache["a"] = "aaaa"
+    cache["b"] = "bbbb"
+    assert cache.get_weight() == 8
+    assert cache["a"] == "aaaa"
+    cache["c"] = "cccc"
+    assert evicted == ["b"]
+    assert cache.keys() == ["c", "a"]
+    assert cache.get_weight() == 8
+    cache["a"] = "a"
+    assert cache.get_weight() == 5
+    with pytest.raises(ValueError, match="exceeds"):
+        cache["d"] = "d" * 11
+    assert "d" not in cache
+    del cache["c"]
+    assert cache.get_weight() == 1
+    cache.update({"e": "eeee", "f": "ffff"})
+    cache.set_max_weight(5)
+    assert cache.keys() == ["f"]
+    assert cache.get_weight() == 4
+    cache.set_max_weight(None)
+    assert cache.get_max_weight() is None
+    assert cache.get_weight() == 0
+    cache.clear()
+    sized = LRU(10, max_weight=1000)
+    sized["x"] = "x" * 100
+    assert sized.get_weight() >= 100
+
+
+def test_lru_stats():
+    """测试 LRU 统计计数"""
+    from tarina import LRU
+
+    cache: LRU[str, int] = LRU(2)
+    assert cache.get_stats() == (0, 0, 0, 0, 0)
+    cache["a"] = 1
+    cache["b"] = 2
+    cache["a"] = 3
+    assert cache["a"] == 3
+    assert cache.get("c") is None
+    with pytest.raises(KeyError):
+        cache["c"]
+    cache.setdefault("c", 4)
+    assert cache.pop("a") == 3
+    assert cache.pop("x", 5) == 5
+    assert cache.pop("x") is None
+    stats = cache.get_stats()
+    assert isinstance(stats, tuple)
+    assert stats == (1, 3, 3, 1, 1)
+    assert (stats.hits, stats.misses, stats.inserts, stats.updates, stats.evictions) == stats
+    cache.clear()
+    assert cache.get_stats().inserts == 3
+    cache.reset_stats()
+    assert cache.get_stats() == (0, 0, 0, 0, 0)
+
+
+def test_sharded_lru():
+    """测试分片 LRU"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from tarina import ShardedLRU
+
+    cache: ShardedLRU[int, int] = ShardedLRU(64, shards=4)
+    assert cache.get_shards() == 4
+    calls = []
+
+    def factory(key: int):
+        def _():
+            calls.append(key)
+            return key * 2
+
+        return _
+
+    def worker(offset: int):
+        for i in range(32):
+            assert cache.get_or_set((i + offset) % 32, factory((i + offset) % 32)) == (i + offset) % 32 * 2
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(worker, range(8)))
+    assert sorted(calls) == list(range(32))
+    assert len(cache) == 32
+    assert sorted(cache.keys()) == list(range(32))
+    assert cache[3] == 6
+    assert cache.pop(3) == 6
+    assert 3 not in cache
+    stats = cache.get_stats()
+    assert stats.inserts == 32
+    assert stats.hits == 8 * 32 - 32 + 1
+    cache.set_size(4)
+    assert len(cache) <= 4
+    cache.set_size(17)
+    for i in range(64):
+        cache[i] = i
+    assert len(cache) == cache.get_size() == 17
+    with pytest.raises(ValueError, match="shards"):
+        cache.set_size(3)
+    cache.clear()
+    cache.reset_stats()
+    assert cache.get_stats() == (0, 0, 0, 0, 0)
+
+
+def test_async_cached():
+    """测试异步缓存装饰器"""
+    import asyncio
+
+    from tarina import async_cached
+
+    calls = []
+    evicted = []
+
+    @async_cached(2, callback=lambda k, v: evicted.append(k))
+    async def fetch(x: int, scale: int = 1):
+        calls.append(x)
+        await asyncio.sleep(0.01)
+        if x < 0:
+            raise ValueError(x)
+        return x * scale
+
+    async def main():
+        assert await asyncio.gather(*(fetch(1) for _ in range(5))) == [1] * 5
+        assert calls == [1]
+        assert await fetch(1) == 1
+        assert await fetch(1, scale=3) == 3
+        assert calls == [1, 1]
+        await fetch(2)
+        assert evicted == [1]
+        with pytest.raises(ValueError, match="-1"):
+            await asyncio.gather(fetch(-1), fetch(-1))
+        assert calls.count(-1) == 1
+        with pytest.raises(ValueError, match="-1"):
+            await fetch(-1)
+        assert calls.count(-1) == 2
+        assert fetch.invalidate(2)
+        assert not fetch.invalidate(2)
+        await fetch(2)
+        assert calls.count(2) == 2
+        task = asyncio.ensure_future(fetch(5))
+        await asyncio.sleep(0)
+        assert fetch.invalidate(5)
+        assert await task == 5
+        assert 5 not in fetch.cache
+        fetch.cache_clear()
+        assert len(fetch.cache) == 0
+
+    asyncio.run(main())
+    with pytest.raises(TypeError):
+        async_cached(2)(lambda: None)
+
+
+def test_cache_policies():
+    """测试其他淘汰策略"""
+    from tarina import LRU
+    from tarina.policy import ARC, S3FIFO, TinyLFU, TwoQueue
+
+    for policy in (S3FIFO, TwoQueue, ARC, TinyLFU):
+        evicted = []
+        cache = policy(4, lambda k, v: evicted.append(k))
+        for i in range(10):
+            cache[i] = str(i)
+        assert len(cache) == 4
+        assert len(evicted) == 6
+        items = cache.items()
+        assert cache.peek_first_item() == items[0]
+        assert cache.peek_last_item() == items[-1]
+        key, value = items[0]
+        assert cache[key] == value
+        assert cache.get(100) is None
+        assert cache.setdefault(100, "x") == cache.get(100, "x")
+        assert cache.pop(100, None) in ("x", None)
+        assert sorted(cache.keys()) == sorted(k for k, _ in cache.items())
+        kept = set(cache.keys())
+        cache.set_size(2)
+        assert len(cache) == 2
+        assert set(cache.keys()) <= kept
+        assert cache.get_stats().evictions == len(evicted)
+        cache.clear()
+        assert len(cache) == 0
+
+        # a one-off scan must not flush the hot set as it does with LRU
+        def hit_ratio(cache):
+            def access(key):
+                if cache.get(key) is None:
+                    cache[key] = key
+
+            for r in range(20):
+                for i in range(50):
+                    access(i)
+                for i in range(30):
+                    access((r, i))
+            cache.reset_stats()
+            for i in range(1000, 1200):
+                access(i)
+            for i in range(50):
+                access(i)
+            stats = cache.get_stats()
+            return stats.hits / (stats.hits + stats.misses)
+
+        assert hit_ratio(policy(100)) > hit_ratio(LRU(100)), policy
+
+
+def test_lru_batch():
+    """测试 LRU 批量操作"""
+    from tarina import LRU
+
+    evicted = []
+    cache: LRU[str, int] = LRU(3, lambda k, v: evicted.append(k))
+    cache.set_many({"a": 1, "b": 2})
+    cache.set_many([("c", 3), ("d", 4)])
+    assert evicted == ["a"]
+    assert cache.get_many(["b", "a", "d"]) == [2, None, 4]
+    assert cache.get_many(iter(["x"]), 0) == [0]
+    assert cache.keys() == ["d", "b", "c"]
+    stats = cache.get_stats()
+    assert (stats.hits, stats.misses, stats.inserts) == (2, 2, 4)
+    assert cache.pop_many(["b", "x", "c"]) == {"b": 2, "c": 3}
+    assert cache.keys() == ["d"]
+    with pytest.raises(ValueError, match="pairs"):
+        cache.set_many([("e", 5, 6)])
+    # unhashable keys are reported as missing, as get() does
+    assert cache.get(["unhashable"]) is None  # type: ignore
+    assert cache.get_many([["unhashable"], "d"], 0) == [0, 4]  # type: ignore
+    assert cache.get_stats().misses == 2
+
+
+def test_lru_iter_views():
+    """测试 LRU 惰性迭代"""
+    from tarina import LRU
+
+    cache: LRU[int, str] = LRU(5)
+    assert cache.peek_first_item() is None
+    assert list(cache.iterkeys()) == []
+    for i in range(5):
+        cache[i] = str(i)
+    assert cache.peek_first_item() == (4, "4")
+    assert cache.peek_last_item() == (0, "0")
+    assert list(cache.iterkeys()) == cache.keys() == [4, 3, 2, 1, 0]
+    assert list(cache.itervalues(reverse=True)) == ["0", "1", "2", "3", "4"]
+    assert list(cache.iteritems()) == cache.items()
+    it = cache.iteritems(reverse=True)
+    assert next(it) == (0, "0")
+    cache.get(2)
+    with pytest.raises(RuntimeError, match="mutated during iteration"):
+        next(it)
+    it = cache.iterkeys()
+    next(it)
+    cache[9] = "9"
+    with pytest.raises(RuntimeError, match="mutated during iteration"):
+        list(it)
+    cache.set(7, "7", priority=3)
+    it = cache.iterkeys()
+    assert next(it) == 7
+    # the change is in a lower class the iterator has not reached yet
+    cache[8] = "8"
+    with pytest.raises(RuntimeError, match="mutated during iteration"):
+        next(it)
+
+
+def _shared_lru_worker(cache, n: int):
+    for i in range(100):
+        cache[(n, i % 2)] = i
+        cache.get((n, i % 2))
+
+
+def test_shared_lru():
+    """测试共享内存 LRU"""
+    import multiprocessing
+
+    from tarina.shared_lru import SharedLRU
+
+    evicted = []
+    with SharedLRU(3, 64, lambda k, v: evicted.append(k)) as cache:
+        cache["a"] = 1
+        cache["b"] = [2]
+        cache["c"] = 3
+        assert cache["a"] == 1
+        cache["d"] = 4
+        assert evicted == ["b"]
+        assert cache.keys() == ["d", "a", "c"]
+        assert cache.peek_last_item() == ("c", 3)
+        assert cache.setdefault("a", 0) == 1
+        assert cache.pop("c") == 3
+        assert "c" not in cache
+        assert len(cache) == 2
+        with pytest.raises(ValueError, match="slot size"):
+            cache["e"] = "e" * 100
+        with pytest.raises(KeyError):
+            cache["x"]
+        assert cache.get_stats() == (2, 1, 4, 0, 1)
+
+        cache.clear()
+        cache.reset_stats()
+        if "fork" in multiprocessing.get_all_start_methods():
+            ctx = multiprocessing.get_context("fork")
+            workers = [ctx.Process(target=_shared_lru_worker, args=(cache, n)) for n in range(3)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            assert len(cache) == 3
+            assert cache.get_stats().inserts >= 3
+            assert cache.get_stats().hits == 300
+
+
+def test_tiered_lru(tmp_path):
+    """测试带磁盘层的两级 LRU"""
+    import time
+
+    from tarina.tiered_lru import TieredLRU
+
+    path = str(tmp_path / "cache.db")
+    with TieredLRU(2, 3, path, batch_size=2) as cache:
+        for i in range(6):
+            cache[i] = str(i)
+        assert cache.memory_len() == 2
+        assert len(cache) == 5
+        assert 0 not in cache
+        assert cache[1] == "1"
+        assert cache.memory_len() == 2
+        cache[2] = "two"
+        assert cache.get(2) == "two"
+        assert cache.pop(3) == "3"
+        assert 3 not in cache
+        assert cache.get(0) is None
+        stats = cache.get_stats()
+        assert stats.disk_hits == 1
+        assert stats.spills == 6
+        assert stats.disk_evictions == 1
+    with TieredLRU(2, 3, path) as cache:
+        # entries only kept in memory are not persisted
+        assert cache.memory_len() == 0
+        assert len(cache) == 2
+        assert cache.get(4) == "4"
+        cache.clear()
+        assert len(cache) == 0
+    with TieredLRU(1, 10, ttl=0.1) as cache:
+        cache["a"] = 1
+        cache["b"] = 2
+        time.sleep(0.3)
+        # expired entries are neither spilled nor read back from disk
+        assert cache.get("a") is None
+        assert cache.get("b") is None
+        assert len(cache) == 0
+    with TieredLRU(1, 10, ttl=0.5) as cache:
+        cache["a"] = 1
+        time.sleep(0.3)
+        cache["b"] = 2
+        assert cache.get("a") == 1
+        # promoted with the remaining ttl instead of a fresh one
+        time.sleep(0.3)
+        assert "a" not in cache
+        assert cache.get("b") == 2
+
+
+def test_adaptive_lru():
+    """测试自动调整容量的 LRU"""
+    from tarina.adaptive_lru import AdaptiveLRU, memory_usage
+
+    usage = [0]
+    cache: AdaptiveLRU[int, int] = AdaptiveLRU(
+        4, 2, 8, step=0.5, min_gain=0.2, memory_limit=100, interval=12, memory=lambda: usage[0]
+    )
+    # a working set of 6 keys thrashes a cache of 4, the ghost list sees the misses
+    for _ in range(3):
+        for i in range(6):
+            if cache.get(i) is None:
+                cache[i] = i
+    assert cache.get_size() == 6
+    assert cache.get_stats().grows == 1
+    for _ in range(4):
+        for i in range(6):
+            assert cache.setdefault(i, -1) == i
+    # all hits, no reason to grow further
+    assert cache.get_size() == 6
+    usage[0] = 200
+    for _ in range(24):
+        cache.get(0)
+    assert cache.get_size() == 2
+    assert cache.get_stats().shrinks == 2
+    assert len(cache) == 2
+    assert cache.tune() == 2
+    with pytest.raises(ValueError, match="Size"):
+        AdaptiveLRU(10, max_size=5)
+    # at min_size an over-limit process must not grow on ghost hits either
+    pressed: AdaptiveLRU[int, int] = AdaptiveLRU(
+        4, min_size=4, max_size=16, step=0.5, min_gain=0.2, memory_limit=1, interval=12, memory=lambda: 10**9
+    )
+    for _ in range(3):
+        for i in range(6):
+            if pressed.get(i) is None:
+                pressed[i] = i
+    assert pressed.get_stats().ghost_hits > 0
+    assert pressed.get_size() == 4
+    assert pressed.get_stats().grows == pressed.get_stats().shrinks == 0
+    usage = memory_usage()
+    assert usage is None or usage > 0
+
+
+def test_lru_snapshot(tmp_path):
+    """测试 LRU 快照与恢复"""
+    import io
+    import json
+    import time
+
+    from tarina import LRU
+    from tarina.lru import PeriodicSnapshot
+
+    cache: LRU[str, int] = LRU(5)
+    for i, key in enumerate("abcd"):
+        cache[key] = i
+    cache.get("a")
+    path = tmp_path / "cache.snapshot"
+    assert cache.dump(path) == 4
+    restored = LRU.load(path)
+    assert restored.get_size() == 5
+    assert restored.items() == cache.items()
+
+    assert cache.dump(path, hottest=2) == 2
+    assert LRU.load(path, size=10).keys() == ["a", "d"]
+
+    buffer = io.BytesIO()
+    cache.dump(buffer, codec=json)
+    buffer.seek(0)
+    assert LRU.load(buffer, codec=json, ttl=60).items() == cache.items()
+    with pytest.raises(ValueError, match="snapshot"):
+        LRU.load(io.BytesIO(b"garbage"))
+
+    expiring: LRU[str, int] = LRU(4, ttl=0.1)
+    expiring["a"] = 1
+    expiring.set("b", 2, ttl=100)
+    expiring.set("c", 3, ttl=100)
+    expiring.pin("c")
+    time.sleep(0.2)
+    # expired entries are dropped, live ones keep their remaining ttl
+    assert expiring.dump(path) == 2
+    restored = LRU.load(path)
+    assert restored.keys() == ["c", "b"]
+    assert 99 < restored.peek_ttl("b") <= 100
+    assert restored.peek_ttl("c") is None
+    with pytest.raises(KeyError):
+        expiring.peek_ttl("a")
+    assert expiring.dump(path, hottest=1) == 1
+    assert LRU.load(path).keys() == ["c"]
+
+    snapshot = PeriodicSnapshot(cache, tmp_path / "periodic", 0.01)
+    with snapshot:
+        cache["e"] = 4
+    assert LRU.load(tmp_path / "periodic").keys() == cache.keys()
+
+
+def test_lru_threads():
+    """测试多线程并发访问 C 扩展"""
+    import random
+    import threading
+
+    from tarina import LRU, split
+
+    if LRU.__module__ != "_lru_c":
+        pytest.skip("the pure Python LRU is not thread-safe")
+
+    cache: LRU[int, int] = LRU(64, callback=lambda k, v: None)
+    popped = [0] * 8
+    errors = []
+    barrier = threading.Barrier(8)
+    text = 'a "b c" d\\ e f ' * 20
+    expected = split(text, " ")
+
+    def worker(n: int):
+        rand = random.Random(n)
+        barrier.wait()
+        try:
+            for _ in range(5000):
+                key = rand.randrange(256)
+                op = rand.random()
+                if op < 0.5:
+                    cache[key] = key
+                elif op < 0.8:
+                    assert cache.get(key, key) == key
+                elif op < 0.9:
+                    if cache.pop(key, None) is not None:
+                        popped[n] += 1
+                else:
+                    try:
+                        assert len(list(cache.iteritems())) <= 64
+                    except RuntimeError:
+                        pass
+                    assert split(text, " ") == expected
+        except BaseException as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    stats = cache.get_stats()
+    assert len(cache) == len(cache.keys()) <= 64
+    assert stats.inserts - stats.evictions - sum(popped) == len(cache)
+
+
+def test_lru_cached():
+    """测试函数缓存装饰器"""
+    import pickle
+
+    from tarina import cached, is_coroutinefunction
+    from tarina.lru import make_key
+
+    calls = []
+    evicted = []
+
+    @cached(2, callback=lambda k, v: evicted.append(k))
+    def square(x, y=1):
+        """square x"""
+        calls.append(x)
+        return x * x * y
+
+    assert square.__name__ == "square"
+    assert square.__doc__ == "square x"
+    assert square(2) == 4
+    assert square(2) == 4
+    assert square(3, y=2) == 18
+    assert calls == [2, 3]
+    assert square.peek(2) == 4
+    assert square.peek(4) is None
+    square(4)
+    assert evicted == [2]
+    assert square.invalidate(4)
+    assert not square.invalidate(4)
+    square.cache.set_size(1)
+    assert len(square.cache) == 1
+    assert square.cache.get_stats().hits == 1
+    square.cache_clear()
+    assert len(square.cache) == 0
+    assert pickle.loads(pickle.dumps(is_coroutinefunction)) is is_coroutinefunction
+
+    assert make_key((1,), {}) == 1
+    assert make_key((1, 2), None) == (1, 2)
+    assert make_key((1,), {"a": 2}) != make_key((1, "a", 2), {})
+    assert make_key((1,), typed=True) != make_key((1.0,), typed=True)
+
+    class A:
+        @cached(8, typed=True)
+        def twice(self, x):
+            return (self, x * 2)
+
+    a = A()
+    assert a.twice(1) == (a, 2)
+    assert a.twice(1) is a.twice(1)
+    assert A.twice(a, 1.0) == (a, 2.0)
+    assert len(A.twice.cache) == 2
+
+
+def test_lru_get_or_compute():
+    """测试 LRU 的 get_or_compute 与 aget_or_compute"""
+    import asyncio
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from tarina import LRU
+
+    cache: LRU[str, int] = LRU(2)
+    calls = []
+
+    def build():
+        calls.append(1)
+        return 1
+
+    assert cache.get_or_compute("a", build) == 1
+    assert cache.get_or_compute("a", build) == 1
+    assert calls == [1]
+    assert cache.get_stats()[:3] == (1, 1, 1)
+    with pytest.raises(ZeroDivisionError):
+        cache.get_or_compute("b", lambda: 1 / 0)
+    assert "b" not in cache
+
+    # callers racing on a miss all get the value stored first, never a second copy
+    racing: LRU[str, object] = LRU(2)
+    barrier = threading.Barrier(4)
+
+    def slow_build():
+        time.sleep(0.05)
+        return object()
+
+    def race():
+        barrier.wait()
+        return racing.get_or_compute("k", slow_build)
+
+    with ThreadPoolExecutor(4) as pool:
+        values = list(pool.map(lambda _: race(), range(4)))
+    assert all(value is racing["k"] for value in values)
+    assert racing.get_stats().updates == 0
+
+    async def main():
+        started = []
+
+        async def fetch():
+            started.append(1)
+            await asyncio.sleep(0.01)
+            return 2
+
+        results = await asyncio.gather(*(cache.aget_or_compute("c", fetch) for _ in range(5)))
+        assert results == [2] * 5
+        assert started == [1]
+        assert cache["c"] == 2
+        assert await cache.aget_or_compute("c", fetch) == 2
+        assert started == [1]
+
+        async def fail():
+            raise LookupError
+
+        with pytest.raises(LookupError):
+            await cache.aget_or_compute("d", fail)
+        assert "d" not in cache
+
+    asyncio.run(main())
+
+    # computations in flight are shared within a loop only, never across loops in other threads
+    shared: LRU[str, int] = LRU(2)
+    barrier = threading.Barrier(2)
+    results = []
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return 3
+
+    async def worker():
+        barrier.wait()
+        results.append(await shared.aget_or_compute("e", slow))
+
+    threads = [threading.Thread(target=asyncio.run, args=(worker(),)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [3, 3]
+
+
+def test_lru_pin_priority():
+    """测试 LRU 的固定条目与优先级"""
+    import time
+
+    from tarina import LRU
+
+    evicted = []
+    cache: LRU[str, int] = LRU(3, lambda k, v: evicted.append(k))
+    cache.set("high", 1, priority=2)
+    cache.set("mid", 2, priority=1)
+    cache["low1"] = 3
+    cache["low2"] = 4
+    assert evicted == ["low1"]
+    assert cache.keys() == ["high", "mid", "low2"]
+    cache["high"]
+    cache["low3"] = 5
+    assert evicted == ["low1", "low2"]
+    # the new item is the first to go when its class is the lowest
+    cache.set("low4", 6)
+    assert evicted == ["low1", "low2", "low3"]
+    assert cache.peek_last_item() == ("low4", 6)
+    with pytest.raises(ValueError, match="Priority"):
+        cache.set("x", 0, priority=8)
+
+    cache.pin("low4")
+    assert cache.keys() == ["low4", "high", "mid"]
+    for i in range(5):
+        cache[f"n{i}"] = i
+    assert len(cache) == 4
+    assert "low4" in cache
+    assert "mid" in cache
+    assert cache.popitem() == ("n4", 4)
+    cache.set("mid", 7, priority=0)
+    assert cache.keys() == ["low4", "high", "mid"]
+    cache.unpin("low4")
+    assert cache.keys() == ["high", "low4", "mid"]
+    cache["z"] = 8
+    assert "mid" not in cache
+    with pytest.raises(KeyError):
+        cache.pin("missing")
+
+    timed: LRU[str, int] = LRU(2, ttl=0.01)
+    timed["a"] = 1
+    timed["b"] = 2
+    timed.pin("a")
+    time.sleep(0.02)
+    assert timed.expire() == 1
+    assert timed.keys() == ["a"]
+    timed.set("c", 3, priority=7)
+    timed.unpin("a")
+    assert "a" not in timed
+    assert timed.keys() == ["c"]
+
+    heavy: LRU[str, int] = LRU(10, max_weight=3, weigher=lambda k, v: v)
+    heavy["a"] = 2
+    heavy.pin("a")
+    assert heavy.get_weight() == 0
+    heavy["b"] = 2
+    heavy["c"] = 1
+    assert heavy.keys() == ["a", "c", "b"]
+    heavy.unpin("a")
+    assert heavy.keys() == ["a", "c"]
+    assert heavy.get_weight() == 3
+
+
+def test_lru_deferred_callback():
+    """测试 LRU 的批量延迟淘汰回调"""
+    import asyncio
+
+    from tarina import LRU, ShardedLRU
+    from tarina.lru import EvictionDrainer
+
+    batches = []
+    cache: LRU[int, int] = LRU(2)
+    cache.set_callback(batches.append, batch=3)
+    for i in range(6):
+        cache[i] = i
+    assert batches == [[(0, 0), (1, 1), (2, 2)]]
+    assert cache.drain() == 1
+    assert batches[-1] == [(3, 3)]
+    assert cache.drain() == 0
+    assert len(batches) == 2
+    cache[6] = 6
+    # switching the callback hands the buffered evictions to the previous one
+    reasons = []
+    cache.set_callback(reasons.append, True, 10)
+    assert batches[-1] == [(4, 4)]
+    cache[7] = 7
+    cache.drain()
+    assert reasons == [[(5, 5, "capacity")]]
+    with pytest.raises(ValueError, match="Batch"):
+        cache.set_callback(print, batch=0)
+
+    sharded: ShardedLRU[int, int] = ShardedLRU(4, shards=2)
+    drained = []
+    sharded.set_callback(drained.extend, batch=100)
+    for i in range(10):
+        sharded[i] = i
+    assert sharded.drain() == 6
+    assert sorted(drained) == [(i, i) for i in range(10) if i not in sharded]
+
+    collected = []
+    cache.set_callback(collected.extend, batch=100)
+    with EvictionDrainer(cache, 0.01):
+        for i in range(10, 20):
+            cache[i] = i
+    assert [k for k, _ in collected] == [6, 7, *range(10, 18)]
+
+    async def main():
+        task = asyncio.create_task(EvictionDrainer(cache, 0.01).run())
+        cache[20] = 20
+        await asyncio.sleep(0.05)
+        assert collected[-1] == (18, 18)
+        cache[21] = 21
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert collected[-1] == (19, 19)
+
+    asyncio.run(main())